@@ -0,0 +1,101 @@
+"""
+Excel Report benchmark:
+Compares time and peak memory of the streaming xlsxwriter Excel report (report_generator.write_excel_report)
+against the previous pandas DataFrame + ExcelWriter path, for a synthetic list of detailed result rows.
+
+Each writer runs in a fresh interpreter. The peak memory reported is the growth over the memory
+held once the rows are built, i.e. what the writer itself adds.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_excel_report
+    python -m benchmarks.bench_excel_report --rows 200000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_layout_formats import proc_memory_mb
+from src.report_generator import write_excel_report
+
+
+def make_detailed_data(n_rows):
+    """Detailed rows shaped like the ones built by setup.main."""
+    return [
+        {
+            "Rule Name": f"RULE_{i % 500}",
+            "Good Patterns": 4,
+            "Bad Patterns": 2,
+            "Passed Good": 4 - i % 2,
+            "Failed Good": i % 2,
+            "Passed Bad": 2,
+            "Failed Bad": 0,
+            "Rule Comment": f"Comment of rule {i % 500}",
+            "Fail Pattern Location": f"layout_{i % 20}.gds / CELL_{i % 2000}",
+        }
+        for i in range(n_rows)
+    ]
+
+
+def write_with_pandas(excel_report_path, summary_data, detailed_data):
+    # Excel path of generate_reports before the streaming writer
+    import pandas as pd
+    with pd.ExcelWriter(excel_report_path) as writer:
+        df_summary = pd.DataFrame(list(summary_data.items()), columns=["Metric", "Value"])
+        df_summary.to_excel(writer, sheet_name="Summary", index=False)
+        if detailed_data:
+            df_details = pd.DataFrame(detailed_data)
+            df_details.to_excel(writer, sheet_name="Detailed Results", index=False)
+
+
+writers = {
+    'xlsxwriter': write_excel_report,
+    'pandas': write_with_pandas,
+}
+
+
+def measure_write(writer, n_rows, excel_report_path):
+    detailed_data = make_detailed_data(n_rows)
+    summary_data = {"Host Name": "benchmark", "Rows": n_rows}
+    before = proc_memory_mb("VmRSS")
+    start = time.perf_counter()
+    writers[writer](excel_report_path, summary_data, detailed_data)
+    seconds = time.perf_counter() - start
+    after = proc_memory_mb("VmHWM")
+    return {
+        'seconds': seconds,
+        'peak_mb': None if after is None or before is None else after - before,
+        'size_mb': os.path.getsize(excel_report_path) / (1024 * 1024),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the streaming and pandas Excel report writers")
+    parser.add_argument("--rows", type=int, default=1000000, help="Detailed result rows. Default is 1000000")
+    parser.add_argument("--writer", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--output", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.writer:
+        print(json.dumps(measure_write(args.writer, args.rows, args.output)))
+        return
+
+    print(f"{'Writer':<12}{'Rows':>10}{'Time':>12}{'Peak memory':>14}{'File size':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for writer in writers:
+            output = subprocess.check_output(
+                [sys.executable, "-m", "benchmarks.bench_excel_report", "--writer", writer,
+                 "--rows", str(args.rows), "--output", os.path.join(tmp, f"{writer}.xlsx")],
+                text=True,
+            )
+            result = json.loads(output.strip().splitlines()[-1])
+            peak = "n/a" if result['peak_mb'] is None else f"{result['peak_mb']:.1f} MB"
+            print(f"{writer:<12}{args.rows:>10}{result['seconds']:>10.2f} s{peak:>14}{result['size_mb']:>9.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
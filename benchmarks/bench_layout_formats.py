@@ -0,0 +1,131 @@
+"""
+Layout Formats benchmark:
+Compares file size, load time and peak memory of the GDS and OASIS versions of the same testcase,
+through the same load path as the analysis (gds_analyzer.load_layout).
+
+Every load runs in a fresh interpreter, so the peak memory of one format does not hide the other.
+The testcase is either generated (copies of the unit test layout cell with filler design geometry
+on a layer outside the layer map), or an existing GDS file converted to OASIS.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_layout_formats
+    python -m benchmarks.bench_layout_formats --cells 400 --tiles 100 --filler 10000
+    python -m benchmarks.bench_layout_formats --gds ./input_files/gds_testcases/regression.gds
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import gdstk
+
+from src.analysis_runner import peak_memory_mb
+from src.gds_analyzer import load_layout
+from src.utils.create_gds import create_test_layout_cell
+
+
+def build_testcase(n_cells, n_tiles, n_filler):
+    """
+    Library of n_cells cells, each holding n_tiles copies of the test layout cell side by side
+    and n_filler design rectangles on layer 100.
+    """
+    lib = gdstk.Library(unit=1e-6, precision=1e-9)
+    template = create_test_layout_cell()
+    for c in range(n_cells):
+        cell = lib.new_cell(f"CELL_{c}")
+        for t in range(n_tiles):
+            for polygon in template.polygons:
+                cell.add(gdstk.Polygon(polygon.points + (t * 20.0, c * 4.0), layer=polygon.layer, datatype=polygon.datatype))
+            for label in template.labels:
+                cell.add(gdstk.Label(label.text, (label.origin[0] + t * 20.0, label.origin[1] + c * 4.0), layer=label.layer, texttype=label.texttype))
+        for f in range(n_filler):
+            x = (f % 500) * 0.4
+            y = c * 4.0 + (f // 500) * 0.4
+            cell.add(gdstk.rectangle((x, y), (x + 0.2, y + 0.3), layer=100))
+    return lib
+
+
+def proc_memory_mb(field):
+    """
+    VmRSS (current) or VmHWM (peak) resident memory in MB of this process where /proc is available,
+    otherwise the resource module peak. ru_maxrss is not used when /proc is there because Linux
+    carries it over from the parent process across exec.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return peak_memory_mb()
+
+
+def measure_load(layout_path, reader):
+    """Load a layout file in this process and return its load time, peak memory growth and cell count."""
+    before = proc_memory_mb("VmRSS")
+    start = time.perf_counter()
+    cells = load_layout(layout_path, reader=reader)
+    cell_count = 0
+    for cell in cells:
+        cell_count += 1
+    seconds = time.perf_counter() - start
+    after = proc_memory_mb("VmHWM")
+    return {
+        'seconds': seconds,
+        'peak_mb': None if after is None or before is None else after - before,
+        'cells': cell_count,
+    }
+
+
+def measure_in_subprocess(layout_path, reader):
+    output = subprocess.check_output(
+        [sys.executable, "-m", "benchmarks.bench_layout_formats", "--measure", layout_path, "--reader", reader],
+        text=True,
+    )
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare GDS and OASIS layout load time and memory")
+    parser.add_argument("--gds", default=None, help="Existing GDS file to convert to OASIS. Default is a generated testcase")
+    parser.add_argument("--cells", type=int, default=100, help="Cells of the generated testcase")
+    parser.add_argument("--tiles", type=int, default=50, help="Copies of the test layout cell per generated cell")
+    parser.add_argument("--filler", type=int, default=5000, help="Filler rectangles outside the layer map per generated cell")
+    parser.add_argument("--repeat", type=int, default=3, help="Loads per format, the fastest is reported")
+    parser.add_argument("--measure", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--reader", default="gdstk", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure_load(args.measure, args.reader)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        gds_path = os.path.join(tmp, "testcase.gds")
+        oas_path = os.path.join(tmp, "testcase.oas")
+        if args.gds:
+            lib = gdstk.read_gds(args.gds)
+            gds_path = args.gds
+        else:
+            lib = build_testcase(args.cells, args.tiles, args.filler)
+            lib.write_gds(gds_path)
+        lib.write_oas(oas_path)
+        del lib
+
+        runs = [("GDS", gds_path, "gdstk"), ("GDS", gds_path, "stream"), ("OASIS", oas_path, "gdstk")]
+        print(f"{'Format':<8}{'Reader':<8}{'File size':>12}{'Load time':>12}{'Peak memory':>14}{'Cells':>8}")
+        for name, path, reader in runs:
+            results = [measure_in_subprocess(path, reader) for _ in range(args.repeat)]
+            best = min(results, key=lambda r: r['seconds'])
+            peak = "n/a" if best['peak_mb'] is None else f"{best['peak_mb']:.1f} MB"
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+            print(f"{name:<8}{reader:<8}{size_mb:>9.2f} MB{best['seconds']:>10.3f} s{peak:>14}{best['cells']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Scaling benchmark:
+Times each stage of the analysis (SVRF parse, layout load, rule association, validation, HTML and Excel
+reports) on synthetic layouts of growing size, and writes the timings and throughputs to JSON.
+
+The size sweep varies the number of rule groups per cell; the other generator parameters
+(see utils.create_gds.create_synthetic_layout_cell) are fixed by the options.
+A previous JSON output can be given with --baseline to flag stages that became slower.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_scaling
+    python -m benchmarks.bench_scaling --groups 10,100,1000 --files 4 --cells 8 --output scaling.json
+    python -m benchmarks.bench_scaling --baseline scaling_1.1.0.json --tolerance 0.25
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from src import __version__
+from src.analysis_runner import peak_memory_mb
+from src.gds_analyzer import load_layout, CellIndex, associate_rules_to_patterns, default_layer_map
+from src.pattern_validator import validate_patterns, MarkerIndex
+from src.report_generator import build_detailed_data, write_html_report, write_excel_report
+from src.svrf_parser import parse_svrf_rules
+from src.utils.create_gds import write_synthetic_layouts, write_synthetic_svrf
+
+stages = ("svrf_parse", "layout_load", "association", "validation", "html_report", "excel_report")
+
+
+def run_size(work_dir, n_groups, args):
+    """
+    Generate the testcase of one sweep point and time every stage on it, args.repeat times.
+
+    Returns:
+        dict: parameters, element counts, stage seconds and throughputs.
+    """
+    params = {
+        'groups': n_groups,
+        'patterns_per_group': args.patterns,
+        'markers_per_pattern': args.markers,
+        'polygon_vertices': args.vertices,
+        'noise_polygons': args.noise,
+        'cells_per_file': args.cells,
+        'files': args.files,
+    }
+    layout_dir = os.path.join(work_dir, f"groups_{n_groups}")
+    rule_names = [f"RULE_{g}" for g in range(n_groups)]
+    layouts = write_synthetic_layouts(layout_dir, n_files=args.files, cells_per_file=args.cells, n_groups=n_groups,
+                                      patterns_per_group=args.patterns, markers_per_pattern=args.markers,
+                                      polygon_vertices=args.vertices, noise_polygons=args.noise)
+    svrf_path = os.path.join(layout_dir, "rules.svrf")
+    write_synthetic_svrf(svrf_path, rule_names)
+
+    # Keep the fastest time of each stage over the repeats
+    runs = [time_stages(layout_dir, layouts, svrf_path, n_groups, args) for _ in range(max(args.repeat, 1))]
+    timings = {stage: min(run_timings[stage] for run_timings, _ in runs) for stage in stages}
+    counts = runs[0][1]
+
+    def rate(count, seconds):
+        return count / seconds if seconds > 0 else None
+
+    return {
+        'params': params,
+        'counts': counts,
+        'seconds': timings,
+        'throughput': {
+            'cells_per_s': rate(counts['cells'], timings['layout_load'] + timings['association'] + timings['validation']),
+            'patterns_per_s_association': rate(counts['patterns'], timings['association']),
+            'patterns_per_s_validation': rate(counts['patterns'], timings['validation']),
+            'rows_per_s_html': rate(counts['report_rows'], timings['html_report']),
+            'rows_per_s_excel': rate(counts['report_rows'], timings['excel_report']),
+        },
+    }
+
+
+def time_stages(layout_dir, layouts, svrf_path, n_groups, args):
+    """
+    Run every stage once on a generated testcase.
+
+    Returns:
+        tuple: ({stage: seconds}, element counts)
+    """
+    timings = dict.fromkeys(stages, 0.0)
+    counts = {'cells': 0, 'groups': 0, 'patterns': 0, 'markers': 0}
+
+    start = time.perf_counter()
+    rules = parse_svrf_rules(svrf_path)
+    timings['svrf_parse'] = time.perf_counter() - start
+
+    all_results = {}
+    for layout_file in layouts:
+        start = time.perf_counter()
+        cells = load_layout(os.path.join(layout_dir, layout_file), reader=args.reader)
+        cells = list(cells)
+        timings['layout_load'] += time.perf_counter() - start
+
+        for cell in cells:
+            start = time.perf_counter()
+            cell_index = CellIndex(cell)
+            rule_map = associate_rules_to_patterns(cell_index, default_layer_map, {rule['check name'] for rule in rules})
+            timings['association'] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            marker_bucket = cell_index.layer(*default_layer_map['result_marker'])
+            markers = MarkerIndex.from_bucket(marker_bucket)
+            for rule in rules:
+                result = validate_patterns(rule['check name'], rule_map.get(rule['check name'], []), markers, cell_index)
+                rule_entry = all_results.setdefault(rule['check name'], {'comment': rule['comment'], 'files': {}})
+                rule_entry['files'].setdefault(layout_file, {})[cell.name] = result
+            timings['validation'] += time.perf_counter() - start
+
+            counts['cells'] += 1
+            counts['groups'] += len(cell_index.layer(*default_layer_map['rule_group']))
+            counts['patterns'] += sum(len(patterns) for patterns in rule_map.values())
+            counts['markers'] += len(marker_bucket)
+
+    detailed_data = build_detailed_data(all_results)
+    counts['report_rows'] = len(detailed_data)
+    summary_data = {"Benchmark": "scaling", "Groups": n_groups}
+
+    start = time.perf_counter()
+    write_html_report(os.path.join(layout_dir, "report.html"), summary_data, detailed_data)
+    timings['html_report'] = time.perf_counter() - start
+
+    if not args.no_excel:
+        start = time.perf_counter()
+        write_excel_report(os.path.join(layout_dir, "report.xlsx"), summary_data, detailed_data)
+        timings['excel_report'] = time.perf_counter() - start
+
+    return timings, counts
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """
+    Print the stage time ratios against a previous run for the sweep points both runs share.
+
+    Returns:
+        list: (groups, stage, ratio) of the stages slower than the baseline by more than tolerance.
+    """
+    previous = {run['params']['groups']: run for run in baseline['runs']}
+    regressions = []
+    print(f"\nCompared to {baseline.get('version', '?')} ({baseline.get('timestamp', '?')}):")
+    for run in results['runs']:
+        before = previous.get(run['params']['groups'])
+        if before is None or before['params'] != run['params']:
+            continue
+        ratios = []
+        for stage in stages:
+            old, new = before['seconds'].get(stage, 0.0), run['seconds'][stage]
+            if old <= 0 or new <= 0:
+                continue
+            ratio = new / old
+            ratios.append(f"{stage} x{ratio:.2f}")
+            if ratio > 1 + tolerance:
+                regressions.append((run['params']['groups'], stage, ratio))
+        print(f"  groups={run['params']['groups']}: " + ", ".join(ratios))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the analysis stages on synthetic layouts of growing size")
+    parser.add_argument("--groups", default="10,100,1000", help="Comma separated rule groups per cell of the sweep. Default is 10,100,1000")
+    parser.add_argument("--patterns", type=int, default=4, help="Patterns per group. Default is 4")
+    parser.add_argument("--markers", type=int, default=1, help="Markers per failing pattern. Default is 1")
+    parser.add_argument("--vertices", type=int, default=4, help="Vertices of the pattern shapes (4 = squares). Default is 4")
+    parser.add_argument("--noise", type=int, default=1000, help="Background polygons per cell. Default is 1000")
+    parser.add_argument("--cells", type=int, default=4, help="Cells per file. Default is 4")
+    parser.add_argument("--files", type=int, default=2, help="Layout files. Default is 2")
+    parser.add_argument("--reader", default="gdstk", choices=("gdstk", "stream"), help="Layout reader. Default is gdstk")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per sweep point, the fastest time of each stage is kept. Default is 3")
+    parser.add_argument("--no_excel", action="store_true", help="Skip the Excel report stage")
+    parser.add_argument("--output", default=None, help=f"JSON output path. Default is bench_scaling_{__version__}.json")
+    parser.add_argument("--baseline", default=None, help="JSON output of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Slowdown ratio over the baseline reported as a regression. Default is 0.2")
+    args = parser.parse_args()
+
+    results = {
+        'version': __version__,
+        'timestamp': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'runs': [],
+    }
+
+    print(f"{'Groups':>8}{'Cells':>7}{'Patterns':>10}" + "".join(f"{stage:>14}" for stage in stages))
+    with tempfile.TemporaryDirectory() as work_dir:
+        for n_groups in [int(g) for g in args.groups.split(",")]:
+            run = run_size(work_dir, n_groups, args)
+            results['runs'].append(run)
+            counts = run['counts']
+            print(f"{n_groups:>8}{counts['cells']:>7}{counts['patterns']:>10}" +
+                  "".join(f"{run['seconds'][stage]:>13.3f}s" for stage in stages))
+
+    peak_memory = peak_memory_mb()
+    results['peak_memory_mb'] = peak_memory
+    output = args.output or f"bench_scaling_{__version__}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        for groups, stage, ratio in regressions:
+            print(f"Regression: {stage} at groups={groups} is x{ratio:.2f} the baseline time")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
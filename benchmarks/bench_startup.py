@@ -0,0 +1,127 @@
+"""
+Startup benchmark:
+Cold-start cost of the command line entry points, measured with python -X importtime in fresh interpreters.
+
+For each scenario the wall time of the process and the cumulative import time of every top-level module
+are recorded (fastest of --repeat runs), and the heavy modules it loaded are listed. A scenario loading a
+module it must not need (gdstk, numpy, tqdm, xlsxwriter, pandas, openpyxl or pyarrow for "import setup",
+--help and the GUI, the Excel and Arrow writers for an HTML-only report), or "import setup" taking more
+than --budget_ms, fails the benchmark (exit code 1).
+
+Usage (from the repository root):
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --budget_ms 80 --output startup.json
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+heavy_modules = ("gdstk", "numpy", "tqdm", "xlsxwriter", "pandas", "openpyxl", "pyarrow")
+
+_html_report = """
+import tempfile
+import setup
+from src.report_generator import generate_reports
+summary = {"Host Name": "bench", "Input Files": "rules.svrf, a.gds", "Overall Status": "1 Passed and 0 Failed out of 1 patterns"}
+rows = [{"Rule Name": "R", "Good Patterns": 1, "Bad Patterns": 0, "Passed Good": 1, "Failed Good": 0, "Passed Bad": 0,
+         "Failed Bad": 0, "Rule Comment": "", "Fail Pattern Location": "a.gds / TOP"}]
+with tempfile.TemporaryDirectory() as output_dir:
+    generate_reports(summary, rows, output_dir, "html", "bench")
+"""
+
+# name -> (interpreter arguments, modules that must not be imported)
+scenarios = {
+    "import setup": (["-c", "import setup"], heavy_modules),
+    "setup.py --help": (["setup.py", "--help"], heavy_modules),
+    "HTML-only report": (["-c", _html_report], ("xlsxwriter", "pandas", "openpyxl", "pyarrow", "gdstk", "numpy")),
+    "GUI module": (["-c", "import src.gui.main_window"], heavy_modules),
+}
+
+_import_line = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def parse_importtime(stderr):
+    """
+    Parse the -X importtime output of an interpreter.
+
+    Returns:
+        tuple: ({top-level module: cumulative microseconds}, set of every imported module name)
+    """
+    top_level = {}
+    modules = set()
+    for match in _import_line.finditer(stderr):
+        _, cumulative, indent, name = match.groups()
+        modules.add(name)
+        if not indent:
+            top_level[name] = top_level.get(name, 0) + int(cumulative)
+    return top_level, modules
+
+
+def run_scenario(arguments, repeat):
+    """Fastest wall time in seconds and import times of repeat fresh interpreters, with the modules they imported."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", *arguments], cwd=repo_dir,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        wall = time.perf_counter() - start
+        if proc.returncode != 0:
+            raise RuntimeError(f"{' '.join(arguments)} failed:\n{proc.stderr[-2000:]}")
+        top_level, modules = parse_importtime(proc.stderr)
+        if best is None or wall < best[0]:
+            best = (wall, top_level, modules)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the cold-start import cost of the command line entry points")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per scenario, the fastest is kept. Default is 5")
+    parser.add_argument("--budget_ms", type=float, default=100.0, help="Import time budget of 'import setup' in milliseconds. Default is 100")
+    parser.add_argument("--top", type=int, default=5, help="Slowest top-level imports listed per scenario. Default is 5")
+    parser.add_argument("--output", default=None, help="Optional JSON output path")
+    args = parser.parse_args()
+
+    results = {'python': sys.version.split()[0], 'budget_ms': args.budget_ms, 'scenarios': {}}
+    failures = []
+    for name, (arguments, forbidden) in scenarios.items():
+        if name == "GUI module":
+            try:
+                import tkinter  # noqa: F401
+            except ImportError:
+                print(f"{name}: skipped, tkinter is not available")
+                continue
+        wall, top_level, modules = run_scenario(arguments, args.repeat)
+        import_ms = sum(top_level.values()) / 1000
+        loaded = sorted(m for m in forbidden if m in modules)
+        slowest = sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:args.top]
+        results['scenarios'][name] = {'wall_ms': wall * 1000, 'import_ms': import_ms, 'heavy_modules': sorted(m for m in heavy_modules if m in modules),
+                                      'slowest_imports': [{'module': module, 'ms': us / 1000} for module, us in slowest]}
+
+        print(f"{name}: {wall * 1000:.0f} ms wall, {import_ms:.1f} ms importing")
+        for module, us in slowest:
+            print(f"    {us / 1000:8.1f} ms  {module}")
+        if loaded:
+            failures.append(f"{name} imports {', '.join(loaded)}")
+        if name == "import setup" and import_ms > args.budget_ms:
+            failures.append(f"{name} takes {import_ms:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    for failure in failures:
+        print(f"Regression: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
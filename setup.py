@@ -1,128 +1,400 @@
 import argparse
 import os
-from tqdm import tqdm
 import socket
 import datetime
 
-from src.svrf_parser import parse_svrf_rules
-from src.gds_analyzer import load_gds_layout, extract_markers, associate_rules_to_patterns
-from src.pattern_validator import validate_patterns
-from src.report_generator import generate_reports
-
-def main():
-    parser = argparse.ArgumentParser(description="SVRF Layout Analysis Tool")
-    parser.add_argument("--layout_dir", required=True, help="Directory containing GDS files")
-    parser.add_argument("--svrf_file", required=True, help="SVRF rules file path")
-    parser.add_argument("--output_dir", default="output_reports", help="Directory to save reports")
-    parser.add_argument("--report_type", default="both", help="Output report type. Available values: html, excel, both. Default is both")
-    parser.add_argument("--report_name", default="None", help="(optional) Name of the output reports")
-    args = parser.parse_args()
-
-    print("\n")
-    print("\n[1/4] Parsing SVRF rule file...\n")
-    rules = parse_svrf_rules(args.svrf_file)
-    print(f"Parsed {len(rules)} rules.")
-    print("\n")
-
-    print("[2/4] Loading and analyzing layout files...")
-    layouts = [f for f in os.listdir(args.layout_dir) if f.endswith(".gds")]
-
-    all_results = {}
-
-    for layout_file in tqdm(layouts, desc="\nAnalyzing layouts"):
-        layout_path = os.path.join(args.layout_dir, layout_file)
-        cells = load_gds_layout(layout_path)
-        for cell in cells:
-
-            # Extract result markers (layer 0.1)
-            markers = extract_markers(cell).get((0, 1), [])
-
-            # print("checking cell", cell.name)
-
-            # Associate rule groups (polygons on layer 255.1) to rule names (texts on layer 22.22) and collect patterns (polygons on the pattern marking layer 255.0)
-            rule_map = associate_rules_to_patterns(cell)
-
-            # print("rule map of ", cell.name, "is", rule_map)
-
-            for rule in rules:
-                rule_name = rule['check name']
-                if rule_name not in all_results:
-                    all_results[rule_name] = {
-                        'comment': rule['comment'],
-                        'files': {}
-                    }
-
-                patterns_for_rule = rule_map.get(rule_name, [])
-                validation_result = validate_patterns(rule_name, patterns_for_rule, markers)
-
-                # Store result by gds_file and cell name
-                all_results[rule_name]['files'].setdefault(layout_file, {})[cell.name] = validation_result
-
-    print("\n")
-    print("[3/4] Generating reports...")
-
-
-
-
-
-    # Prepare detailed data
-    good_patterns=[]
-    bad_patterns=[]
-    all_patterns=[]
-    detailed_data = []
-    for rule_name, rule_info in all_results.items():
-        comment = rule_info['comment']
-        for layout_file, cell_results in rule_info['files'].items():
-            for cell_name, result in cell_results.items():
-                detailed_data.append({
-                    "Rule Name": rule_name,
-                    "Good Patterns": result['good']['pass'] + result['good']['fail'],
-                    "Bad Patterns": result['bad']['pass'] + result['bad']['fail'],
-                    "Passed Good": result['good']['pass'],
-                    "Failed Good": result['good']['fail'],
-                    "Passed Bad": result['bad']['pass'],
-                    "Failed Bad": result['bad']['fail'],
-                    "Rule Comment": comment,
-                    "Fail Pattern Location": f"{layout_file} / {cell_name}"
-                })
-                good_patterns.append(result['good']['pass'] + result['good']['fail'])
-                bad_patterns.append(result['bad']['pass'] + result['bad']['fail'])
-                all_patterns.append(result['good']['pass'] + result['good']['fail'] + result['bad']['pass'] + result['bad']['fail'])
-
-
-
-
-
-    # Prepare summary data
-    good_patterns_sum = sum(good_patterns)
-    bad_patterns_sum = sum(bad_patterns)
-    all_patterns_sum = sum(all_patterns)
-
+# Only light modules are imported here, so --help, --prune_cache and the GUI start quickly.
+# The layout analysis modules (gdstk, numpy, tqdm) are imported by main once a run needs them,
+# and report_generator imports xlsxwriter and pyarrow only for the reports asking for them.
+from src import profiler
+from src.svrf_parser import parse_svrf_rules, select_rules, read_rule_patterns
+from src.result_cache import ResultCache, prune_cache, parse_size
+from src.report_generator import generate_reports, build_detailed_data, parse_report_types, pyarrow_available, columnar_formats
+
+# Ambiguous rule labels listed in the report summary, all of them are printed
+max_listed_ambiguities = 10
+
+
+def select_deck_rules(args, rules):
+    """
+    Apply the --rules and --rules_file selection to the parsed rules.
+
+    Returns:
+        tuple: (selected rules, number of parsed rules, selection patterns)
+
+    Raises:
+        ValueError: For an invalid pattern, or when no rule matches.
+    """
+    rule_patterns = []
+    if args.rules:
+        rule_patterns += [p.strip() for p in args.rules.split(",") if p.strip()]
+    if args.rules_file:
+        rule_patterns += read_rule_patterns(args.rules_file)
+    parsed_rule_count = len(rules)
+    if args.rules or args.rules_file:
+        rules = select_rules(rules, rule_patterns)
+        if not rules:
+            raise ValueError(f"No rule matches the selection: {', '.join(rule_patterns)}")
+        print(f"Selected {len(rules)} of {parsed_rule_count} rules.")
+    return rules, parsed_rule_count, rule_patterns
+
+
+def print_ambiguities(run_stats):
+    """Print the rule groups holding several rule names, and the rule names carried by several groups."""
+    from src.gds_analyzer import describe_ambiguity
+
+    ambiguities = [f"{a['file']} / {a['cell']}: {describe_ambiguity(a)}" for a in run_stats['ambiguities']]
+    if ambiguities:
+        print(f"\nWarning: {len(ambiguities)} ambiguous rule labels:")
+        for line in ambiguities:
+            print(f"  {line}")
+    return ambiguities
+
+
+def build_summary_data(input_files, detailed_data, settings, run_stats, ambiguities, cache_dir=None, peak_memory=None):
+    """
+    Summary section of the reports.
+
+    Args:
+        input_files (str): SVRF file and layout files of the run.
+        detailed_data (list): Detailed rows, see build_detailed_data.
+        settings (dict): Run settings listed after the overall status (layout reader, rule selection...).
+        run_stats (dict): Stats of analysis_runner.run_analysis.
+        ambiguities (list): Rule label ambiguities as printed by print_ambiguities.
+        cache_dir (str): Result cache directory, when the cache was used.
+        peak_memory (float): Peak memory in MB, if known.
+    """
+    good_patterns_sum = sum(row["Good Patterns"] for row in detailed_data)
+    bad_patterns_sum = sum(row["Bad Patterns"] for row in detailed_data)
+    all_patterns_sum = good_patterns_sum + bad_patterns_sum
 
     # overall_status = "Passed" if all(sts == 0 for sts in failed_good_bad) else "Failed"
     overall_status = f"{good_patterns_sum} Passed and {bad_patterns_sum} Failed out of {all_patterns_sum} patterns"
 
+    listed_ambiguities = ambiguities[:max_listed_ambiguities]
+    if len(ambiguities) > len(listed_ambiguities):
+        listed_ambiguities.append(f"... {len(ambiguities) - len(listed_ambiguities)} more")
+
     summary_data = {
         "Host Name": socket.gethostname(),
         "Timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "Input Files": f"{args.svrf_file}, {', '.join(layouts)}",
-        "Overall Status": overall_status
+        "Input Files": input_files,
+        "Overall Status": overall_status,
     }
+    summary_data.update(settings)
+    summary_data.update({
+        "Layout Load Time": f"{run_stats['load_time']:.2f} s",
+        "Rule Label Ambiguities": "; ".join(listed_ambiguities) if ambiguities else "none",
+        "Reused Cell Results": f"{run_stats['reused_cells']} of {run_stats['cells']} cells were identical to an analyzed cell",
+    })
+    if cache_dir is not None:
+        summary_data["Result Cache"] = f"{run_stats['cache_hits']} hits, {run_stats['cache_misses']} misses ({cache_dir})"
+    if peak_memory is not None:
+        summary_data["Peak Memory"] = f"{peak_memory:.1f} MB"
+    return summary_data
+
+
+def main(argv=None, events=None, cancel=None):
+    """
+    Run the analysis from command line arguments.
+
+    Args:
+        argv (list): Arguments, sys.argv[1:] by default.
+        events: Optional queue (anything with put) receiving the progress of the run as dicts:
+            {'type': 'stage', 'stage': 1..4, 'stages': 4, 'name': ...} when a stage starts,
+            {'type': 'progress', 'unit': 'file' or 'cell', 'name': ..., 'done': ..., 'total': ...}
+            during the analysis (see analysis_runner.run_analysis), and
+            {'type': 'reports', 'html': path, 'excel': path} once the reports are written.
+        cancel: Optional threading.Event stopping the run with analysis_runner.AnalysisCancelled once set.
+    """
+    def emit(**event):
+        if events is not None:
+            events.put(event)
 
+    parser = argparse.ArgumentParser(description="SVRF Layout Analysis Tool")
+    parser.add_argument("--layout_dir", help="Directory containing GDS and OASIS (.oas) files")
+    parser.add_argument("--svrf_file", help="SVRF rules file path")
+    parser.add_argument("--output_dir", default="output_reports", help="Directory to save reports")
+    parser.add_argument("--report_type", default="both", help="Output report type. Available values: html, excel, both, csv, parquet, feather, or a comma separated list such as html,parquet (parquet and feather need pyarrow). Default is both")
+    parser.add_argument("--report_name", default="None", help="(optional) Name of the output reports")
+    parser.add_argument("--jobs", type=int, default=1, help="(optional) Number of layout files analyzed in parallel worker processes. Default is 1 (serial)")
+    parser.add_argument("--granularity", default="file", choices=("file", "cell"), help="(optional) Unit of parallel work with --jobs: whole layout files, or the cells of each layout file. Default is file")
+    parser.add_argument("--rules", default=None, help="(optional) Only analyze the rules whose check name matches one of these comma separated globs (e.g. M.*,L.S.1) or regular expressions prefixed with re: (e.g. re:^M\\.(S|W))")
+    parser.add_argument("--rules_file", default=None, help="(optional) File of rule selection patterns as in --rules, one per line")
+    parser.add_argument("--layer_map", default=None, help="(optional) Layer overrides as role=layer.datatype, comma separated. Roles: rule_name (22.22), rule_group (255.1), pattern (255.0), result_marker (0.1)")
+    parser.add_argument("--no_dedup", action="store_true", help="(optional) Analyze every cell even when an identical cell (same pattern, group, label and marker geometry) was already analyzed")
+    parser.add_argument("--reader", default="gdstk", choices=("gdstk", "stream"), help="(optional) Layout reader. gdstk loads each library in full, stream reads one cell of a GDS file at a time with bounded memory (OASIS files are always loaded in full). Default is gdstk")
+    parser.add_argument("--no_layer_filter", action="store_true", help="(optional) Read every layer of the layout files instead of only the layers of the layer map (gdstk reader only)")
+    parser.add_argument("--cache_dir", default=None, help="(optional) Directory of the incremental result cache and of the parsed SVRF deck cache. Default is .svrf_cache inside the output directory")
+    parser.add_argument("--no_cache", action="store_true", help="(optional) Parse the SVRF file and analyze every layout file without reading or updating the caches")
+    parser.add_argument("--profile", action="store_true", help="(optional) Record wall and CPU time per stage, file and cell, and hot-path geometry counters. Written to <report>_profile.json and shown in the Timing section of the HTML report")
+    parser.add_argument("--prune_cache", default=None, metavar="SIZE", help="(optional) Only prune the result cache to SIZE (e.g. 500M, 2G) by dropping the least recently used entries, then exit")
+    parser.add_argument("--shard", default=None, metavar="I/N", help="(optional) Only analyze shard I of N (numbered from 1) and write its partial results instead of the reports. Combine the partial results with: python setup.py merge")
+    parser.add_argument("--shard_by", default="file", choices=("file", "cell"), help="(optional) Split the shards by whole layout files (balanced by file size) or by the cells of every layout file. Default is file")
+    parser.add_argument("--watch", action="store_true", help="(optional) Keep running: poll the layout directory and the SVRF deck (with its INCLUDE files), analyze only the new or changed layout files and regenerate the reports after each change. Stop with Ctrl+C")
+    parser.add_argument("--watch_interval", type=float, default=1.0, help="(optional) Seconds between two polls of the inputs with --watch. Default is 1")
+    parser.add_argument("--watch_debounce", type=float, default=1.0, help="(optional) Seconds the inputs must stay unchanged before a new analysis with --watch, so files still being written are not read. Default is 1")
+    args = parser.parse_args(argv)
+    cache_dir = args.cache_dir or os.path.join(args.output_dir, ".svrf_cache")
+
+    if args.prune_cache is not None:
+        try:
+            max_bytes = parse_size(args.prune_cache)
+        except ValueError as e:
+            parser.error(str(e))
+        removed, remaining = prune_cache(cache_dir, max_bytes)
+        print(f"Pruned {removed} entries from {cache_dir}, {remaining / (1024 * 1024):.1f} MB remaining.")
+        return
+
+    if not args.layout_dir or not args.svrf_file:
+        parser.error("the following arguments are required: --layout_dir, --svrf_file")
+
+    from src.analysis_runner import run_analysis, combine_file_results, peak_memory_mb, check_cancel
+    from src.gds_analyzer import parse_layer_map, is_layout_file
+    from src.sharding import parse_shard, shard_layouts, CellShard, partial_path, write_partial
+    from src.watcher import layout_stamps, deck_stamps, wait_for_change
+
+    try:
+        layer_map = parse_layer_map(args.layer_map)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        report_formats = parse_report_types(args.report_type)
+    except ValueError as e:
+        parser.error(str(e))
+    if any(f in columnar_formats for f in report_formats) and not pyarrow_available():
+        parser.error("parquet and feather reports need pyarrow: pip install pyarrow")
+    shard = None
+    if args.shard:
+        try:
+            shard, shards = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.watch and shard is not None:
+        parser.error("--watch cannot be combined with --shard")
+
+    rules = None
+    deck_files = []
+    # With --watch: inputs of the last round, deck stamps of the parsed rules,
+    # and layout_file -> (stamp, layout_results, file_stats) of the analyzed files
+    watch_state = None
+    rules_deck = None
+    warm = {}
+    watch_round = 0
+    while True:
+        if args.profile:
+            profiler.enable()
+        if args.watch:
+            if watch_state is None:
+                watch_state = (deck_stamps([args.svrf_file]), layout_stamps(args.layout_dir))
+            watch_round += 1
+            print(f"\n=== Watch round {watch_round} ({datetime.datetime.now().strftime('%H:%M:%S')}) ===")
+
+        print("\n")
+        print("\n[1/4] Parsing SVRF rule file...\n")
+        emit(type="stage", stage=1, stages=4, name="Parsing SVRF rule file")
+        if rules is not None and watch_state[0] == rules_deck:
+            print(f"SVRF deck unchanged, {len(rules)} rules.")
+        else:
+            deck_files = []
+            try:
+                with profiler.timed("svrf_parse"):
+                    parsed_rules = parse_svrf_rules(args.svrf_file, cache_dir=None if args.no_cache else cache_dir, included_files=deck_files)
+                print(f"Parsed {len(parsed_rules)} rules.")
+                selected_rules, parsed_rule_count, rule_patterns = select_deck_rules(args, parsed_rules)
+            except (OSError, ValueError) as e:
+                if rules is None:
+                    parser.error(str(e))
+                # Keep watching the deck as far as it was read, the next edit may fix it
+                print(f"Error: {e}\nKeeping the previous rules.")
+                deck_files = deck_files or [args.svrf_file]
+                selected_rules = rules
+            if selected_rules != rules:
+                # Results depend on the rules, the layouts are analyzed again (or served by the result cache)
+                rules = selected_rules
+                warm.clear()
+            if args.watch:
+                rules_deck = deck_stamps(deck_files)
+                watch_state = (rules_deck, watch_state[1])
+        print("\n")
+
+        check_cancel(cancel)
+        print("[2/4] Loading and analyzing layout files...")
+        emit(type="stage", stage=2, stages=4, name="Loading and analyzing layout files")
+        layouts = [f for f in os.listdir(args.layout_dir) if is_layout_file(f)]
+        run_layouts = layouts
+        cell_filter = None
+        if shard is not None and args.shard_by == "file":
+            run_layouts = shard_layouts(args.layout_dir, layouts, shard, shards)
+            print(f"Shard {shard} of {shards}: {len(run_layouts)} of {len(layouts)} layout files.")
+        elif shard is not None:
+            cell_filter = CellShard(shard, shards)
+            print(f"Shard {shard} of {shards}: cells of {len(layouts)} layout files.")
+        elif args.watch:
+            stamps = watch_state[1]
+            run_layouts = [f for f in layouts if f not in warm or warm[f][0] != stamps.get(f)]
+            print(f"{len(run_layouts)} of {len(layouts)} layout files new or changed.")
+
+        # The cache holds whole files, so it cannot serve or store the results of a cell shard
+        use_cache = not args.no_cache and cell_filter is None
+        cache = ResultCache(cache_dir, rules, layer_map) if use_cache else None
+
+        run_stats = {}
+        file_results = {}
+
+        def analyze(layout_files):
+            return run_analysis(args.layout_dir, layout_files, rules, jobs=args.jobs, granularity=args.granularity,
+                                layer_map=layer_map, layer_filter=not args.no_layer_filter, dedup=not args.no_dedup,
+                                cache=cache, stats=run_stats, reader=args.reader, cancel=cancel, cell_filter=cell_filter,
+                                file_results=file_results if shard is not None or args.watch else None,
+                                progress=lambda unit, name, done, total: emit(type="progress", unit=unit, name=name, done=done, total=total))
+
+        unreadable = []
+        with profiler.timed("analysis"):
+            if not args.watch:
+                all_results = analyze(run_layouts)
+            else:
+                try:
+                    analyze(run_layouts)
+                except (OSError, RuntimeError, ValueError) as e:
+                    # E.g. a layout file caught while still being written: leave it out until it changes again
+                    print(f"Error: {e}\nAnalyzing the layout files one by one.")
+                    for layout_file in run_layouts:
+                        if layout_file in file_results:
+                            continue
+                        try:
+                            analyze([layout_file])
+                        except (OSError, RuntimeError, ValueError) as e:
+                            print(f"  Skipping {layout_file}: {e}")
+                            unreadable.append(layout_file)
+
+        if args.watch:
+            # Combine the new results with the results kept from the previous rounds
+            for layout_file in run_layouts:
+                if layout_file in file_results:
+                    warm[layout_file] = (watch_state[1].get(layout_file), *file_results[layout_file])
+            for layout_file in set(warm) - (set(layouts) - set(unreadable)):
+                del warm[layout_file]
+            layouts = [f for f in layouts if f in warm]
+            run_stats = {'cache_hits': cache.hits, 'cache_misses': cache.misses} if cache is not None else {}
+            all_results = combine_file_results(layouts, rules, {f: warm[f][1:] for f in layouts}, run_stats)
+
+        ambiguities = print_ambiguities(run_stats)
+        settings = {
+            "Layout Reader": args.reader,
+            "Rule Selection": f"{len(rules)} of {parsed_rule_count} rules ({', '.join(rule_patterns)})" if args.rules or args.rules_file else "all rules",
+            "Layer Filter": "off" if args.no_layer_filter and args.reader == "gdstk" else ", ".join(f"{layer}.{datatype}" for layer, datatype in sorted(set(layer_map.values()))),
+        }
+        if args.watch:
+            settings["Watch"] = f"round {watch_round}, {len(run_layouts) - len(unreadable)} of {len(layouts)} layout files analyzed"
+            if unreadable:
+                settings["Watch"] += f", unreadable: {', '.join(unreadable)}"
+
+        if shard is not None:
+            print("\n")
+            print("[3/4] Writing partial results...")
+            emit(type="stage", stage=3, stages=4, name="Writing partial results")
+            run = {
+                'shard': shard,
+                'shards': shards,
+                'shard_by': args.shard_by,
+                'svrf_file': args.svrf_file,
+                'layouts': layouts,
+                'settings': settings,
+                'cache_dir': cache_dir if use_cache else None,
+                'cache_hits': run_stats.get('cache_hits'),
+                'cache_misses': run_stats.get('cache_misses'),
+                'peak_memory': peak_memory_mb(),
+            }
+            path = partial_path(args.output_dir, args.report_name, shard, shards)
+            write_partial(path, run, rules, layer_map, file_results)
+            print(f"- Partial results: {path}")
+            print("\n[4/4] Done\n")
+            emit(type="stage", stage=4, stages=4, name="Done")
+            return
+
+        print("\n")
+        print("[3/4] Generating reports...")
+        emit(type="stage", stage=3, stages=4, name="Generating reports")
+
+        detailed_data = build_detailed_data(all_results)
+        summary_data = build_summary_data(f"{args.svrf_file}, {', '.join(layouts)}", detailed_data, settings, run_stats, ambiguities,
+                                          cache_dir if cache is not None else None, peak_memory_mb())
+
+        # Watch rounds overwrite the same reports
+        report_name = "report" if args.watch and args.report_name == "None" else args.report_name
+        # The HTML Timing section covers the stages up to the analysis, the JSON profile also has the reports
+        profile = profiler.build_profile() if args.profile else None
+        with profiler.timed("reports"):
+            html_report_path, excel_report_path = generate_reports(summary_data, detailed_data, args.output_dir, args.report_type, report_name, profile)
+        if args.profile:
+            profile_path = os.path.splitext(html_report_path)[0] + "_profile.json"
+            profiler.write_profile(profile_path, profiler.build_profile())
+            print(f"- Profile: {profile_path}\n")
+
+        print("\n")
+        print("\n[4/4] Done\n")
+        emit(type="stage", stage=4, stages=4, name="Done")
+        emit(type="reports", html=html_report_path, excel=excel_report_path)
+        print("\n")
+
+        if not args.watch:
+            return
+        print(f"Watching {args.layout_dir} and {len(deck_files)} SVRF deck files for changes (Ctrl+C to stop)...")
+        try:
+            watch_state = wait_for_change(lambda: (deck_stamps(deck_files), layout_stamps(args.layout_dir)), watch_state,
+                                          args.watch_interval, args.watch_debounce, stop=cancel)
+        except KeyboardInterrupt:
+            watch_state = None
+        if watch_state is None:
+            print("\nStopped watching.")
+            return
+
+
+def merge_main(argv=None):
+    """
+    Combine the partial results written by the shards of a run (see --shard) into the usual reports,
+    without reading any layout file.
+
+    Args:
+        argv (list): Arguments after "merge", sys.argv[2:] by default.
+    """
+    parser = argparse.ArgumentParser(prog="setup.py merge", description="Merge the partial results of sharded SVRF layout analysis runs")
+    parser.add_argument("partials", nargs="+", help="Partial result files (*_shard_I_of_N.json.gz) of every shard")
+    parser.add_argument("--output_dir", default="output_reports", help="Directory to save reports")
+    parser.add_argument("--report_type", default="both", help="Output report type, as for the analysis. Default is both")
+    parser.add_argument("--report_name", default="None", help="(optional) Name of the output reports")
+    args = parser.parse_args(argv)
+    try:
+        report_formats = parse_report_types(args.report_type)
+    except ValueError as e:
+        parser.error(str(e))
+    if any(f in columnar_formats for f in report_formats) and not pyarrow_available():
+        parser.error("parquet and feather reports need pyarrow: pip install pyarrow")
+
+    from src.sharding import read_partial, merge_partials
+
+    print(f"\nMerging {len(args.partials)} partial results...\n")
+    try:
+        all_results, run_stats, run = merge_partials([read_partial(path) for path in args.partials])
+    except ValueError as e:
+        parser.error(str(e))
+
+    ambiguities = print_ambiguities(run_stats)
+    settings = dict(run['settings'], Shards=f"{run['shards']} shards by {run['shard_by']}")
+    detailed_data = build_detailed_data(all_results)
+    summary_data = build_summary_data(f"{run['svrf_file']}, {', '.join(run['layouts'])}", detailed_data, settings, run_stats, ambiguities,
+                                      run['cache_dir'] if 'cache_hits' in run_stats else None, run_stats['peak_memory'])
     generate_reports(summary_data, detailed_data, args.output_dir, args.report_type, args.report_name)
 
-    print("\n")
-    print("\n[4/4] Done\n")
-    print("\n")
-
-    # print("good patterns",good_patterns, " sum= ", good_patterns_sum, "\n")
-    # print("bad patterns",bad_patterns, " sum ", bad_patterns_sum, "\n")
-    # print("total patterns",all_patterns, " sum ", all_patterns_sum, "\n")
 
 # GUI Mode Integration
 if __name__ == "__main__":
     import sys
-    if "--gui" in sys.argv:
+    if sys.argv[1:2] == ["merge"]:
+        merge_main(sys.argv[2:])
+    elif "--gui" in sys.argv:
         import tkinter as tk
         from src.gui.main_window import SVRFAnalyzerGUI
 
@@ -0,0 +1,582 @@
+"""
+Analysis Runner module:
+Functions to analyze layout files against the parsed rules, either serially or fanned out over a process pool,
+and to merge the per-file results into the rule -> file -> cell structure consumed by the report stage.
+"""
+
+import os
+import sys
+import time
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from tqdm import tqdm
+
+from src import profiler
+from src.gds_analyzer import load_layout, associate_rules_to_patterns, CellIndex, default_layer_map
+from src.pattern_validator import validate_patterns, MarkerIndex
+
+
+class AnalysisCancelled(Exception):
+    """Raised by run_analysis when its cancel event is set."""
+
+
+# Seconds between two checks of the cancel event while waiting for worker processes
+cancel_poll_interval = 0.1
+
+
+def check_cancel(cancel):
+    if cancel is not None and cancel.is_set():
+        raise AnalysisCancelled("Analysis cancelled")
+
+
+def _results_until_cancel(results, cancel):
+    # Results of a Pool.imap_unordered iterator, AnalysisCancelled as soon as cancel is set, even while
+    # every worker is busy on a long task
+    while True:
+        try:
+            result = results.next(timeout=cancel_poll_interval)
+        except multiprocessing.TimeoutError:
+            check_cancel(cancel)
+            continue
+        except StopIteration:
+            return
+        check_cancel(cancel)
+        yield result
+
+
+def _terminate_workers(executor):
+    # Stop the worker processes of a ProcessPoolExecutor in the middle of their tasks
+    # (ProcessPoolExecutor.terminate_workers only exists from Python 3.14)
+    processes = list((executor._processes or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join()
+
+
+def analyze_cell(cell, rules, layer_map=None, dedup=None, ambiguities=None):
+    """
+    Validate every rule against a single cell.
+
+    Args:
+        cell: gdstk Cell object.
+        rules (list): Rules as returned by parse_svrf_rules.
+        layer_map (dict): Layers of the analysis, see gds_analyzer.parse_layer_map. Defaults to default_layer_map.
+        dedup (dict): Optional {content hash: (cell results, ambiguities)} of the cells analyzed so far with the same
+            rules and layer map. A cell whose relevant geometry was already seen reuses those results.
+        ambiguities (list): Optional list to which the rule labelling ambiguities of the cell are appended,
+            see gds_analyzer.associate_rules_to_patterns.
+
+    Returns:
+        dict: {rule_name: validation_result} in rule order.
+    """
+    if layer_map is None:
+        layer_map = default_layer_map
+
+    # Bucket the cell's polygons and labels by layer in a single pass
+    with profiler.timed("cell_index"):
+        cell_index = CellIndex(cell)
+
+    if dedup is not None:
+        content_hash = cell_index.content_hash(layer_map)
+        if content_hash in dedup:
+            cell_results, cell_ambiguities = dedup[content_hash]
+            if ambiguities is not None:
+                ambiguities.extend(cell_ambiguities)
+            return cell_results
+
+    # Associate rule groups (polygons on layer 255.1) to rule names (texts on layer 22.22) and collect patterns (polygons on the pattern marking layer 255.0)
+    # Groups of rules outside the rule set are skipped before any pattern work
+    cell_ambiguities = []
+    with profiler.timed("association"):
+        rule_map = associate_rules_to_patterns(cell_index, layer_map, {rule['check name'] for rule in rules}, cell_ambiguities)
+
+    # Extract result markers (layer 0.1), indexed once and shared by all rules, when there are patterns to check
+    with profiler.timed("marker_index"):
+        if any(rule_map.values()):
+            markers = MarkerIndex.from_bucket(cell_index.layer(*layer_map['result_marker']))
+        else:
+            markers = MarkerIndex([])
+
+    cell_results = {}
+    with profiler.timed("validation"):
+        # Marker overlaps of the patterns of all rules are checked together, so the pairs needing the
+        # boolean engine go through a few batched gdstk.boolean calls per cell (see MarkerIndex.overlaps_many)
+        patterns_by_rule = [rule_map.get(rule['check name'], []) for rule in rules]
+        cell_patterns = [pattern for patterns in patterns_by_rule for pattern in patterns]
+        has_errors = markers.overlaps_many(cell_patterns, [cell_index.bounding_box(p) for p in cell_patterns],
+                                           [cell_index.is_rectangle(p) for p in cell_patterns])
+        start = 0
+        for rule, patterns_for_rule in zip(rules, patterns_by_rule):
+            rule_name = rule['check name']
+            cell_results[rule_name] = validate_patterns(rule_name, patterns_for_rule, markers, cell_index,
+                                                        has_errors[start:start + len(patterns_for_rule)])
+            start += len(patterns_for_rule)
+
+    if dedup is not None:
+        dedup[content_hash] = (cell_results, cell_ambiguities)
+    if ambiguities is not None:
+        ambiguities.extend(cell_ambiguities)
+    return cell_results
+
+
+def analyze_cells(cells, rules, layer_map=None, dedup=None, file_stats=None, cancel=None, cell_filter=None):
+    """
+    Validate every rule against each of the cells, counting the cells served from dedup in file_stats['reused_cells']
+    and adding the rule labelling ambiguities of each cell to file_stats['ambiguities'] (see cell_ambiguities).
+    When profiling, the time of each cell is added to file_stats['profile'] (see profile_cell).
+    The cancel event (see run_analysis) is checked before each cell.
+    Cells whose name cell_filter rejects are not analyzed, their results are None.
+
+    Returns:
+        list: [(cell_name, {rule_name: validation_result}), ...] in cell order.
+    """
+    layout_results = []
+    for cell in cells:
+        check_cancel(cancel)
+        if cell_filter is not None and not cell_filter(cell.name):
+            layout_results.append((cell.name, None))
+            continue
+        known = len(dedup) if dedup is not None else 0
+        ambiguities = []
+        if profiler.enabled and file_stats is not None:
+            cell_results, cell_profile = profile_cell(cell, rules, layer_map, dedup, ambiguities)
+            file_stats['profile']['cells'].append(cell_profile)
+        else:
+            cell_results = analyze_cell(cell, rules, layer_map, dedup, ambiguities)
+        layout_results.append((cell.name, cell_results))
+        if file_stats is not None:
+            file_stats['ambiguities'] += cell_ambiguities(cell.name, ambiguities)
+            if dedup is not None and len(dedup) == known:
+                file_stats['reused_cells'] += 1
+    return layout_results
+
+
+def cell_ambiguities(cell_name, ambiguities):
+    """Ambiguities of a cell as kept in file_stats['ambiguities'], each with its 'cell'."""
+    return [dict(ambiguity, cell=cell_name) for ambiguity in ambiguities]
+
+
+def profile_cell(cell, rules, layer_map=None, dedup=None, ambiguities=None):
+    """
+    analyze_cell, timed.
+
+    Returns:
+        tuple: (cell results, {'cell', 'polygons', 'wall', 'cpu'})
+    """
+    wall, cpu = time.perf_counter(), time.process_time()
+    cell_results = analyze_cell(cell, rules, layer_map, dedup, ambiguities)
+    return cell_results, {
+        'cell': cell.name,
+        'polygons': len(cell.polygons),
+        'wall': time.perf_counter() - wall,
+        'cpu': time.process_time() - cpu,
+    }
+
+
+def timed_load(layout_path, file_stats, layer_map=None, layer_filter=True, reader="gdstk"):
+    """
+    Load a layout file, adding its load time in seconds and its number of cells to file_stats.
+
+    Returns:
+        The cells: a list with the gdstk reader, a generator with the stream reader.
+        For the latter the time spent reading is accumulated as the cells are consumed.
+    """
+    start = time.perf_counter()
+    with profiler.timed("layout_load"):
+        cells = load_layout(layout_path, layer_map, layer_filter, reader)
+    file_stats['load_time'] += time.perf_counter() - start
+    if isinstance(cells, list):
+        file_stats['cells'] += len(cells)
+        return cells
+    return _timed_cells(cells, file_stats)
+
+
+def _timed_cells(cells, file_stats):
+    while True:
+        start = time.perf_counter()
+        try:
+            with profiler.timed("layout_load"):
+                cell = next(cells)
+        except StopIteration:
+            return
+        finally:
+            file_stats['load_time'] += time.perf_counter() - start
+        file_stats['cells'] += 1
+        yield cell
+
+
+def peak_memory_mb():
+    """
+    Peak resident memory in MB of this process and of its finished worker processes,
+    or None where the resource module is not available (Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return max(own, children) / scale
+
+
+def new_file_stats():
+    """
+    Per-file counters returned along with the results of a layout file.
+    When profiling, file_stats['profile'] also holds the file and cell timings, see finish_file_profile.
+    """
+    file_stats = {'load_time': 0.0, 'cells': 0, 'reused_cells': 0, 'ambiguities': []}
+    if profiler.enabled:
+        file_stats['profile'] = {'start': (time.perf_counter(), time.process_time()), 'cells': []}
+    return file_stats
+
+
+def finish_file_profile(file_stats, worker_cpu=0.0):
+    """
+    Set the wall and CPU time of a file in file_stats['profile'], counted from new_file_stats.
+    worker_cpu is the CPU time its cells took in other processes.
+    """
+    profile = file_stats['profile']
+    wall, cpu = profile.pop('start')
+    profile['wall'] = time.perf_counter() - wall
+    profile['cpu'] = time.process_time() - cpu + worker_cpu
+
+
+def analyze_layout(layout_path, rules, layer_map=None, layer_filter=True, dedup=None, reader="gdstk", cancel=None, cell_filter=None):
+    """
+    Load a layout file and validate every rule against each of its cells.
+
+    Args:
+        layout_path (str): Path to the GDS file.
+        rules (list): Rules as returned by parse_svrf_rules.
+        layer_map (dict): Layers of the analysis. Defaults to default_layer_map.
+        layer_filter (bool): Read only the layers of the layer map.
+        dedup (dict): Optional content hash -> cell results map shared with other files, see analyze_cell.
+        reader (str): "gdstk" loads the whole library first, "stream" reads and analyzes one cell at a time,
+            see gds_analyzer.load_layout.
+        cancel: Optional threading.Event, see run_analysis.
+        cell_filter: Optional predicate on cell names, see analyze_cells.
+
+    Returns:
+        tuple: ([(cell_name, {rule_name: validation_result}), ...] in library order, file stats)
+    """
+    file_stats = new_file_stats()
+    cells = timed_load(layout_path, file_stats, layer_map, layer_filter, reader)
+    layout_results = analyze_cells(cells, rules, layer_map, dedup, file_stats, cancel, cell_filter)
+    if profiler.enabled:
+        finish_file_profile(file_stats)
+    return layout_results, file_stats
+
+
+# Cell results of a file pool worker process, reused across the files it analyzes
+_worker_dedup = None
+
+
+def _init_file_worker(dedup, profile=False):
+    global _worker_dedup
+    _worker_dedup = {} if dedup else None
+    profiler.enable(profile)
+
+
+def _analyze_layout_in_worker(layout_path, rules, layer_map, layer_filter, reader, cell_filter):
+    layout_results, file_stats = analyze_layout(layout_path, rules, layer_map, layer_filter, _worker_dedup, reader, cell_filter=cell_filter)
+    if profiler.enabled:
+        # Hand the stage timers and counters of this file back to the parent process
+        file_stats['profile']['profiler'] = profiler.take()
+    return layout_results, file_stats
+
+
+# Library shared read-only with forked cell workers. Set only while a cell pool is running,
+# so the cells are inherited through fork instead of being pickled to every worker.
+_shared_cells = None
+_shared_rules = None
+_shared_layer_map = None
+_shared_dedup = None
+
+
+def _analyze_shared_cell(index):
+    cell = _shared_cells[index]
+    known = len(_shared_dedup) if _shared_dedup is not None else 0
+    ambiguities = []
+    cell_profile = None
+    if profiler.enabled:
+        result, cell_profile = profile_cell(cell, _shared_rules, _shared_layer_map, _shared_dedup, ambiguities)
+        cell_profile['profiler'] = profiler.take()
+    else:
+        result = analyze_cell(cell, _shared_rules, _shared_layer_map, _shared_dedup, ambiguities)
+    reused = _shared_dedup is not None and len(_shared_dedup) == known
+    return index, cell.name, result, reused, ambiguities, cell_profile
+
+
+def analyze_layout_cells(layout_path, rules, jobs=1, layer_map=None, layer_filter=True, dedup=None, reader="gdstk", progress=None, cancel=None, cell_filter=None):
+    """
+    Load a layout file once and validate its cells in parallel worker processes.
+
+    The library is shared with the workers through fork. Workers pull one cell at a time from
+    the pool's task queue (largest cells first), so an idle worker always picks up the next
+    pending cell, and the per-cell results are streamed back as they finish.
+    Falls back to a serial loop when fork is not available or there is nothing to parallelize.
+    Each worker starts from a copy of dedup; cells it analyzes are not added back to it.
+    With the stream reader the relevant cell contents are read in full before forking.
+    progress is called with ("cell", cell_name, cells done, cells) as the worker results come in,
+    and the workers are terminated as soon as cancel is set (see run_analysis).
+    Cells whose name cell_filter rejects are not analyzed, their results are None.
+
+    Returns:
+        tuple: ([(cell_name, {rule_name: validation_result}), ...] in library order, file stats)
+    """
+    global _shared_cells, _shared_rules, _shared_layer_map, _shared_dedup
+
+    file_stats = new_file_stats()
+    cells = list(timed_load(layout_path, file_stats, layer_map, layer_filter, reader))
+    selected = [i for i, cell in enumerate(cells) if cell_filter is None or cell_filter(cell.name)]
+    if jobs <= 1 or len(selected) <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        layout_results = analyze_cells(cells, rules, layer_map, dedup, file_stats, cancel, cell_filter)
+        if profiler.enabled:
+            finish_file_profile(file_stats)
+        return layout_results, file_stats
+
+    order = sorted(selected, key=lambda i: len(cells[i].polygons), reverse=True)
+    layout_results = [(cell.name, None) for cell in cells]
+    per_cell_ambiguities = [[] for _ in cells]
+    cell_profiles = [None] * len(cells)
+
+    _shared_cells, _shared_rules, _shared_layer_map, _shared_dedup = cells, rules, layer_map, dedup
+    try:
+        # Forked workers start with a copy of the timers and counters recorded so far, cleared on start
+        with multiprocessing.get_context("fork").Pool(processes=min(jobs, len(order)), initializer=profiler.reset) as pool:
+            cell_results = pool.imap_unordered(_analyze_shared_cell, order, chunksize=1)
+            # Leaving the pool block on cancel terminates the workers
+            cell_results = _results_until_cancel(cell_results, cancel)
+            for done, (index, cell_name, result, reused, found, cell_profile) in enumerate(tqdm(cell_results, total=len(order), desc="Analyzing cells", leave=False), start=1):
+                if progress is not None:
+                    progress("cell", cell_name, done, len(order))
+                layout_results[index] = (cell_name, result)
+                file_stats['reused_cells'] += reused
+                per_cell_ambiguities[index] = cell_ambiguities(cell_name, found)
+                if cell_profile is not None:
+                    profiler.merge(cell_profile.pop('profiler'))
+                    cell_profiles[index] = cell_profile
+    finally:
+        _shared_cells, _shared_rules, _shared_layer_map, _shared_dedup = None, None, None, None
+
+    # Ambiguities in library order, as with a serial run
+    for found in per_cell_ambiguities:
+        file_stats['ambiguities'] += found
+
+    if profiler.enabled:
+        cell_profiles = [cell_profile for cell_profile in cell_profiles if cell_profile is not None]
+        file_stats['profile']['cells'] = cell_profiles
+        finish_file_profile(file_stats, worker_cpu=sum(cell_profile['cpu'] for cell_profile in cell_profiles))
+    return layout_results, file_stats
+
+
+def merge_layout_results(all_results, rules, layout_file, layout_results):
+    """
+    Merge the results of one layout file into all_results.
+
+    all_results has the structure:
+        {
+            'RULE_A': {'comment': '...', 'files': {'a.gds': {'CELL': validation_result}}}
+        }
+    """
+    for cell_name, cell_results in layout_results:
+        if cell_results is None:
+            # Cell left to another shard
+            continue
+        for rule in rules:
+            rule_name = rule['check name']
+            if rule_name not in all_results:
+                all_results[rule_name] = {
+                    'comment': rule['comment'],
+                    'files': {}
+                }
+
+            # Store result by gds_file and cell name
+            all_results[rule_name]['files'].setdefault(layout_file, {})[cell_name] = cell_results[rule_name]
+    return all_results
+
+
+def file_profile(layout_file, file_stats, profile=None):
+    """
+    Entry of a layout file in profiler.files. profile is the file_stats['profile'] of an analyzed file,
+    None for a file served from the result cache.
+    """
+    if profile is None:
+        return {'file': layout_file, 'cached': True, 'wall': 0.0, 'cpu': 0.0, 'load_wall': 0.0, 'cell_count': file_stats['cells'], 'cells': []}
+    if 'profiler' in profile:
+        profiler.merge(profile.pop('profiler'))
+    return {
+        'file': layout_file,
+        'cached': False,
+        'wall': profile['wall'],
+        'cpu': profile['cpu'],
+        'load_wall': file_stats['load_time'],
+        'cell_count': file_stats['cells'],
+        'cells': profile['cells'],
+    }
+
+
+def combine_file_results(layouts, rules, file_results, stats=None):
+    """
+    Merge the results of analyzed layout files in listing order, so the output matches a serial, uncached run.
+
+    Args:
+        layouts (list): Layout file names, in listing order.
+        rules (list): Analyzed rules.
+        file_results (dict): layout_file -> (layout_results, file_stats) of every file of layouts.
+        stats (dict): Optional dict filled with the 'load_time', 'cells', 'reused_cells' and 'ambiguities'
+            of all the files, see run_analysis.
+
+    Returns:
+        dict: all_results as described in merge_layout_results.
+    """
+    all_results = {}
+    for layout_file in layouts:
+        merge_layout_results(all_results, rules, layout_file, file_results[layout_file][0])
+
+    if stats is not None:
+        for key in ('load_time', 'cells', 'reused_cells'):
+            stats[key] = sum(file_results[layout_file][1][key] for layout_file in layouts)
+        stats['ambiguities'] = [dict(ambiguity, file=layout_file) for layout_file in layouts for ambiguity in file_results[layout_file][1]['ambiguities']]
+    return all_results
+
+
+def file_cell_filter(cell_filter, layout_file):
+    """Cell name predicate of one layout file from a (layout_file, cell_name) predicate."""
+    return None if cell_filter is None else functools.partial(cell_filter, layout_file)
+
+
+def order_layouts_by_size(layout_dir, layouts):
+    """
+    Order layout files largest first (longest-processing-time scheduling), so a single
+    huge file does not start last and finish on its own.
+    Files of equal size keep their original relative order.
+    """
+    return sorted(layouts, key=lambda f: os.path.getsize(os.path.join(layout_dir, f)), reverse=True)
+
+
+def run_analysis(layout_dir, layouts, rules, jobs=1, granularity="file", layer_map=None, layer_filter=True, dedup=True, cache=None, stats=None, reader="gdstk", progress=None, cancel=None, cell_filter=None, file_results=None):
+    """
+    Analyze all layout files and collect the results.
+
+    Args:
+        layout_dir (str): Directory containing the layout files.
+        layouts (list): Layout file names inside layout_dir.
+        rules (list): Rules as returned by parse_svrf_rules.
+        jobs (int): Number of worker processes. 1 analyzes the files serially in this process.
+        granularity (str): "file" distributes whole layout files over the workers,
+            "cell" analyzes the files one after the other and distributes their cells.
+        layer_map (dict): Layers of the analysis. Defaults to default_layer_map.
+        layer_filter (bool): Read only the layers of the layer map from the layout files.
+        dedup (bool): Analyze each distinct cell content once and reuse the results for its copies
+            (within a worker process when running in parallel).
+        cache (ResultCache): Optional on-disk result cache. Files it already holds are not analyzed,
+            and the results of the analyzed files are added to it.
+        stats (dict): Optional dict filled with the total layout 'load_time' in seconds,
+            the number of 'cells', the number of 'reused_cells', and the rule labelling 'ambiguities'
+            (see gds_analyzer.associate_rules_to_patterns) of all cells, each with its 'file' and 'cell'.
+            When profiling (see profiler.enable), the timings of every file and cell are added to profiler.files,
+            and the stage timers and counters of worker processes are merged into the profiler.
+        reader (str): Layout reader, "gdstk" or "stream", see gds_analyzer.load_layout.
+        progress: Optional callable, called with ("file", layout_file, files done, files) as each file is done
+            (files served from the cache first, with layout_file None), and with ("cell", cell_name, cells done, cells)
+            for the cells of the current file with granularity "cell".
+        cancel: Optional threading.Event. Once set, no new file or cell is started and AnalysisCancelled is raised.
+            Worker processes are polled every cancel_poll_interval seconds and terminated in the middle of
+            their file or cell; a serial run stops before its next cell. Results of the files done so far
+            are kept in the cache.
+        cell_filter: Optional picklable predicate (layout_file, cell_name) -> bool. Only the cells it accepts are
+            analyzed, the others get None results and are left out of all_results. Not to be combined with a cache.
+        file_results (dict): Optional dict filled with layout_file -> (layout_results, file_stats) of every file,
+            layout_results as returned by analyze_layout.
+
+    Returns:
+        dict: all_results as described in merge_layout_results. The content and ordering
+        are the same whatever the number of jobs and whether results came from the cache.
+
+    Raises:
+        AnalysisCancelled: When cancel is set.
+    """
+    per_file_results = {}
+    per_file_stats = {}
+    dedup_results = {} if dedup else None
+
+    pending = layouts
+    if cache is not None:
+        pending = []
+        for layout_file in layouts:
+            cached = cache.get(os.path.join(layout_dir, layout_file))
+            if cached is None:
+                pending.append(layout_file)
+            else:
+                per_file_results[layout_file], per_file_stats[layout_file] = cached
+
+    file_profiles = {}
+    if progress is not None and len(pending) < len(layouts):
+        progress("file", None, len(layouts) - len(pending), len(layouts))
+
+    def collect(layout_file, layout_results, file_stats):
+        if profiler.enabled:
+            file_profiles[layout_file] = file_stats.pop('profile')
+        per_file_results[layout_file], per_file_stats[layout_file] = layout_results, file_stats
+        if cache is not None:
+            cache.put(os.path.join(layout_dir, layout_file), layout_results, file_stats)
+        if progress is not None:
+            progress("file", layout_file, len(per_file_results), len(layouts))
+
+    try:
+        if granularity == "cell":
+            for layout_file in tqdm(pending, desc="\nAnalyzing layouts"):
+                check_cancel(cancel)
+                layout_path = os.path.join(layout_dir, layout_file)
+                collect(layout_file, *analyze_layout_cells(layout_path, rules, jobs, layer_map, layer_filter, dedup_results, reader, progress, cancel,
+                                                           file_cell_filter(cell_filter, layout_file)))
+
+        elif jobs <= 1 or len(pending) <= 1:
+            for layout_file in tqdm(pending, desc="\nAnalyzing layouts"):
+                check_cancel(cancel)
+                layout_path = os.path.join(layout_dir, layout_file)
+                collect(layout_file, *analyze_layout(layout_path, rules, layer_map, layer_filter, dedup_results, reader, cancel,
+                                                     file_cell_filter(cell_filter, layout_file)))
+
+        else:
+            with ProcessPoolExecutor(max_workers=min(jobs, len(pending)), initializer=_init_file_worker, initargs=(dedup, profiler.enabled)) as executor:
+                futures = {
+                    executor.submit(_analyze_layout_in_worker, os.path.join(layout_dir, layout_file), rules, layer_map, layer_filter, reader,
+                                    file_cell_filter(cell_filter, layout_file)): layout_file
+                    for layout_file in order_layouts_by_size(layout_dir, pending)
+                }
+                running = set(futures)
+                with tqdm(total=len(futures), desc="\nAnalyzing layouts") as bar:
+                    while running:
+                        # Wake up regularly to check the cancel event while the workers are busy
+                        done, running = wait(running, timeout=cancel_poll_interval, return_when=FIRST_COMPLETED)
+                        if cancel is not None and cancel.is_set():
+                            _terminate_workers(executor)
+                            check_cancel(cancel)
+                        for future in done:
+                            collect(futures[future], *future.result())
+                            bar.update()
+    finally:
+        if cache is not None:
+            cache.save()
+
+    if profiler.enabled:
+        for layout_file in layouts:
+            profiler.files.append(file_profile(layout_file, per_file_stats[layout_file], file_profiles.get(layout_file)))
+
+    if file_results is not None:
+        for layout_file in layouts:
+            file_results[layout_file] = (per_file_results[layout_file], per_file_stats[layout_file])
+
+    all_results = combine_file_results(layouts, rules, {f: (per_file_results[f], per_file_stats[f]) for f in layouts}, stats)
+    if stats is not None:
+        if cache is not None:
+            stats['cache_hits'] = cache.hits
+            stats['cache_misses'] = cache.misses
+    return all_results
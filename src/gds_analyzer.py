@@ -3,7 +3,15 @@ GDS Analyzer module:
 Functions to load GDS layout, extract markers, associate rule groups with patterns, and extract rule names (text labels).
 """
 
+import hashlib
+import os
+import math
+import mmap
+import struct
 import gdstk
+import numpy as np
+
+from src import profiler
 
 
 
@@ -14,32 +22,503 @@ rule_grouping_marker_layer=255
 rule_grouping_marker_datatype=1
 pattern_marking_layer=255
 pattern_marking_datatype=0
+result_marker_layer=0
+result_marker_datatype=1
+
+# Layer map of the analysis: role -> (layer, datatype)
+default_layer_map = {
+    'rule_name': (rule_name_layer, rule_name_datatype),
+    'rule_group': (rule_grouping_marker_layer, rule_grouping_marker_datatype),
+    'pattern': (pattern_marking_layer, pattern_marking_datatype),
+    'result_marker': (result_marker_layer, result_marker_datatype),
+}
+
+# File extensions of the supported layout formats
+gds_extensions = (".gds",)
+oasis_extensions = (".oas",)
+layout_extensions = gds_extensions + oasis_extensions
+
+
+def is_layout_file(file_name):
+    """True for the GDS and OASIS files picked up from a layout directory."""
+    return file_name.lower().endswith(layout_extensions)
+
+
+def is_oasis_file(file_name):
+    return file_name.lower().endswith(oasis_extensions)
+
+
+def parse_layer_map(spec):
+    """
+    Parse a layer map override and merge it over default_layer_map.
+
+    Args:
+        spec (str): Comma separated role=layer.datatype entries, e.g. "pattern=255.0,result_marker=0.1".
+            Roles are rule_name, rule_group, pattern and result_marker. None or "" keeps the defaults.
+
+    Returns:
+        dict: {role: (layer, datatype)}
+    """
+    layer_map = dict(default_layer_map)
+    if not spec:
+        return layer_map
+    for entry in spec.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        role, sep, value = entry.partition('=')
+        role = role.strip()
+        if not sep or role not in default_layer_map:
+            raise ValueError(f"Invalid layer map entry '{entry}'. Expected role=layer.datatype with role in {', '.join(default_layer_map)}")
+        layer, _, datatype = value.strip().partition('.')
+        try:
+            layer_map[role] = (int(layer), int(datatype or 0))
+        except ValueError:
+            raise ValueError(f"Invalid layer '{value}' in layer map entry '{entry}'")
+    return layer_map
+
+def pack_polygons(polygons):
+    """
+    Concatenate the vertices of polygons into one (N, 2) array.
+    Returns (vertices, offsets), polygon i owning vertices[offsets[i]:offsets[i + 1]].
+    """
+    points = [p.points for p in polygons]
+    counts = np.fromiter((len(v) for v in points), dtype=np.int64, count=len(points))
+    offsets = np.zeros(len(points) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    vertices = np.concatenate(points) if points else np.empty((0, 2))
+    return vertices, offsets
+
+
+def compute_areas_and_centroids(vertices, offsets):
+    """
+    Signed area and centroid of every polygon of a packed vertex array, in one vectorized pass.
+
+    Each polygon is closed back to its first vertex and shifted to it before applying the
+    shoelace formula, which keeps small polygons far from the origin accurate.
+    Degenerate (zero-area) polygons get the mean of their vertices as centroid instead of
+    dividing by zero.
+
+    Args:
+        vertices (ndarray): (N, 2) vertices as returned by pack_polygons.
+        offsets (ndarray): (n + 1,) start offset of each polygon.
+
+    Returns:
+        tuple: (areas, centroids) with shapes (n,) and (n, 2).
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    n = len(offsets) - 1
+    if n == 0:
+        return np.empty(0), np.empty((0, 2))
+
+    starts = offsets[:-1]
+    counts = np.diff(offsets)
+    origin = np.repeat(vertices[starts], counts, axis=0)
+    x = vertices[:, 0] - origin[:, 0]
+    y = vertices[:, 1] - origin[:, 1]
+
+    # Index of the next vertex, wrapping around to the first vertex of the same polygon
+    following = np.arange(1, len(vertices) + 1)
+    following[offsets[1:] - 1] = starts
+    x_next = x[following]
+    y_next = y[following]
+
+    cross = x * y_next - x_next * y
+    twice_area = np.add.reduceat(cross, starts)
+    cx = np.add.reduceat((x + x_next) * cross, starts)
+    cy = np.add.reduceat((y + y_next) * cross, starts)
+
+    degenerate = np.abs(twice_area) <= 1e-12 * np.add.reduceat(np.abs(cross), starts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cx = np.where(degenerate, np.add.reduceat(x, starts) / counts, cx / (3 * twice_area))
+        cy = np.where(degenerate, np.add.reduceat(y, starts) / counts, cy / (3 * twice_area))
+
+    centroids = np.column_stack((cx, cy)) + vertices[starts]
+    return 0.5 * twice_area, centroids
+
+
+def rectangle_mask(vertices, offsets):
+    """
+    Flag the packed polygons that are axis-aligned rectangles (4 vertices, alternating
+    horizontal and vertical edges). Such a polygon is exactly its bounding box.
+
+    Returns:
+        ndarray: (n,) boolean array.
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    mask = np.diff(offsets) == 4
+    starts = offsets[:-1][mask]
+    if len(starts) == 0:
+        return mask
+    x0, y0 = vertices[starts, 0], vertices[starts, 1]
+    x1, y1 = vertices[starts + 1, 0], vertices[starts + 1, 1]
+    x2, y2 = vertices[starts + 2, 0], vertices[starts + 2, 1]
+    x3, y3 = vertices[starts + 3, 0], vertices[starts + 3, 1]
+    vertical_first = (x0 == x1) & (y1 == y2) & (x2 == x3) & (y3 == y0)
+    horizontal_first = (y0 == y1) & (x1 == x2) & (y2 == y3) & (x3 == x0)
+    mask[mask] = vertical_first | horizontal_first
+    return mask
+
+
+def is_rectangle(points):
+    """
+    Check whether a polygon's vertices describe an axis-aligned rectangle, see rectangle_mask.
+    """
+    if len(points) != 4:
+        return False
+    return bool(rectangle_mask(np.asarray(points, dtype=float), [0, 4])[0])
+
 
 # Calculate the centroid of a polygon
 def compute_centroid(polygon):
     vertices = polygon.points
-    x = vertices[:, 0]
-    y = vertices[:, 1]
-    a = 0.5 * (x[:-1] * y[1:] - x[1:] * y[:-1]).sum()
-    cx = (1 / (6 * a)) * ((x[:-1] + x[1:]) * (x[:-1] * y[1:] - x[1:] * y[:-1])).sum()
-    cy = (1 / (6 * a)) * ((y[:-1] + y[1:]) * (x[:-1] * y[1:] - x[1:] * y[:-1])).sum()
-    return (cx, cy)
+    _, centroids = compute_areas_and_centroids(vertices, [0, len(vertices)])
+    return tuple(centroids[0])
 
 
-def load_gds_layout(gds_path):
+class LayerBucket:
+    """
+    Polygons of one (layer, datatype) pair of a cell.
+    The vertices of all polygons are packed into one array with an offsets array
+    (polygon i owns vertices[offsets[i]:offsets[i + 1]]). The packed arrays, bounding boxes
+    and centroids are built on first use only, so layers nobody queries cost a list append per polygon.
+    """
+
+    def __init__(self, polygons=None):
+        self.polygons = polygons if polygons is not None else []
+        self._vertices = None
+        self._offsets = None
+        self._bboxes = None
+        self._areas = None
+        self._centroids = None
+        self._rectangles = None
+        self._rows = None
+
+    def __len__(self):
+        return len(self.polygons)
+
+    def _pack(self):
+        self._vertices, self._offsets = pack_polygons(self.polygons)
+
+    @property
+    def vertices(self):
+        if self._vertices is None:
+            self._pack()
+        return self._vertices
+
+    @property
+    def offsets(self):
+        if self._offsets is None:
+            self._pack()
+        return self._offsets
+
+    @property
+    def bboxes(self):
+        """Array of shape (n, 2, 2): [[xmin, ymin], [xmax, ymax]] per polygon."""
+        if self._bboxes is None:
+            if len(self.polygons) == 0:
+                self._bboxes = np.empty((0, 2, 2))
+            else:
+                starts = self.offsets[:-1]
+                lower = np.minimum.reduceat(self.vertices, starts, axis=0)
+                upper = np.maximum.reduceat(self.vertices, starts, axis=0)
+                self._bboxes = np.stack((lower, upper), axis=1)
+        return self._bboxes
+
+    @property
+    def areas(self):
+        """Array of shape (n,) with the signed area of each polygon."""
+        if self._areas is None:
+            self._areas, self._centroids = compute_areas_and_centroids(self.vertices, self.offsets)
+        return self._areas
+
+    @property
+    def centroids(self):
+        """Array of shape (n, 2) with the centroid of each polygon."""
+        if self._centroids is None:
+            self._areas, self._centroids = compute_areas_and_centroids(self.vertices, self.offsets)
+        return self._centroids
+
+    @property
+    def rectangles(self):
+        """Array of shape (n,) flagging the axis-aligned rectangles."""
+        if self._rectangles is None:
+            self._rectangles = rectangle_mask(self.vertices, self.offsets)
+        return self._rectangles
+
+    def row(self, polygon):
+        """Return the position of polygon in this bucket."""
+        if self._rows is None:
+            self._rows = {id(p): i for i, p in enumerate(self.polygons)}
+        return self._rows[id(polygon)]
+
+
+class CellIndex:
+    """
+    Single pass over the polygons and labels of a cell, bucketed by (layer, datatype).
+
+    Used in place of the cell by extract_markers, find_text_labels, find_rule_groups,
+    associate_rules_to_patterns and validate_patterns, so a cell's geometry is walked once
+    however many of them run.
+    """
+
+    def __init__(self, cell):
+        self.name = cell.name
+        polygons = {}
+        for poly in cell.polygons:
+            polygons.setdefault((poly.layer, poly.datatype), []).append(poly)
+        self.layers = {key: LayerBucket(polys) for key, polys in polygons.items()}
+
+        self.labels = {}
+        for text in cell.labels:
+            self.labels.setdefault((text.layer, text.texttype), []).append(text)
+
+        if profiler.enabled:
+            profiler.count("polygons_scanned", len(cell.polygons))
+            profiler.count("labels_scanned", len(cell.labels))
+
+    def layer(self, layer, datatype):
+        """Return the LayerBucket of (layer, datatype); an empty bucket if the cell has no such polygons."""
+        return self.layers.get((layer, datatype)) or LayerBucket()
+
+    def labels_on(self, layer, datatype):
+        return self.labels.get((layer, datatype), [])
+
+    def bucket_of(self, polygon):
+        return self.layers[(polygon.layer, polygon.datatype)]
+
+    def centroid(self, polygon):
+        bucket = self.bucket_of(polygon)
+        return tuple(bucket.centroids[bucket.row(polygon)])
+
+    def bounding_box(self, polygon):
+        bucket = self.bucket_of(polygon)
+        return bucket.bboxes[bucket.row(polygon)]
+
+    def is_rectangle(self, polygon):
+        bucket = self.bucket_of(polygon)
+        return bool(bucket.rectangles[bucket.row(polygon)])
+
+    def content_hash(self, layer_map=None):
+        """
+        Hash of the geometry the analysis looks at: the polygons on the pattern, rule group and
+        result marker layers and the labels on the rule name layer of the layer map, in their stored
+        order. Cells with equal hashes give equal validation results, whatever their name.
+        """
+        if layer_map is None:
+            layer_map = default_layer_map
+        h = hashlib.blake2b(digest_size=20)
+        for role in sorted(layer_map):
+            layer, datatype = layer_map[role]
+            h.update(f"{role}={layer}.{datatype};".encode())
+            if role == 'rule_name':
+                for text in self.labels_on(layer, datatype):
+                    h.update(f"{len(text.text)}:{text.text}".encode())
+                    h.update(np.asarray(text.origin, dtype=float).tobytes())
+            else:
+                bucket = self.layer(layer, datatype)
+                h.update(bucket.offsets.tobytes())
+                h.update(np.ascontiguousarray(bucket.vertices, dtype=float).tobytes())
+        return h.hexdigest()
+
+
+def load_gds_layout(gds_path, layer_map=None, layer_filter=True):
     """
     Load a GDS file and return the contained cells.
+
+    With layer_filter, only the polygons on the (layer, datatype) pairs of the layer map are read,
+    so memory and load time follow the marker data rather than the full design geometry.
+    Labels are not filtered by the reader.
     """
-    lib = gdstk.read_gds(gds_path)
+    if layer_map is None:
+        layer_map = default_layer_map
+    lib = gdstk.read_gds(gds_path, filter=set(layer_map.values()) if layer_filter else None)
 
     if len(lib.cells) == 0:
         raise ValueError(f"No cells found in {gds_path}")
     return lib.cells
 
 
+# GDSII record types used by the streaming reader
+GDS_UNITS = 0x03
+GDS_ENDLIB = 0x04
+GDS_BGNSTR = 0x05
+GDS_STRNAME = 0x06
+GDS_ENDSTR = 0x07
+GDS_BOUNDARY = 0x08
+GDS_TEXT = 0x0C
+GDS_LAYER = 0x0D
+GDS_DATATYPE = 0x0E
+GDS_XY = 0x10
+GDS_ENDEL = 0x11
+GDS_TEXTTYPE = 0x16
+GDS_STRING = 0x19
+GDS_BOX = 0x2D
+GDS_BOXTYPE = 0x2E
+
+
+def gds_real_to_float(data):
+    """
+    Convert an 8-byte GDSII excess-64 base-16 real to a float.
+    """
+    value = int.from_bytes(data, "big")
+    mantissa = value & 0x00FFFFFFFFFFFFFF
+    exponent = ((value >> 56) & 0x7F) - 64
+    result = math.ldexp(float(mantissa), 4 * exponent - 56)
+    return -result if value & 0x8000000000000000 else result
+
+
+class StreamCell:
+    """
+    Cell read by iter_gds_cells: its name plus the polygons and labels on the analysis layers.
+    Offers the name, polygons and labels attributes the analysis uses from a gdstk Cell.
+    """
+
+    def __init__(self, name, polygons, labels):
+        self.name = name
+        self.polygons = polygons
+        self.labels = labels
+
+
+def iter_gds_cells(gds_path, layer_map=None):
+    """
+    Stream the cells of a GDS file one at a time, without building a gdstk Library.
+
+    The GDSII records are walked directly from a memory-mapped file. Only boundaries and texts on
+    the (layer, datatype) pairs of the layer map (boxes are read as polygons, as gdstk does) are turned
+    into gdstk Polygon and Label objects; everything else (other layers, paths, references, properties) is skipped. Peak memory is
+    therefore bounded by the largest cell's relevant geometry. Coordinates are converted exactly
+    as gdstk.read_gds does with its default unit, so the analysis results are identical.
+
+    Yields:
+        StreamCell objects in file order.
+    """
+    if layer_map is None:
+        layer_map = default_layer_map
+    wanted = set(layer_map.values())
+
+    with open(gds_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            size = len(data)
+            unpack_header = struct.Struct(">HBB").unpack_from
+            factor = 1.0
+            cell = None
+            element = None
+            layer = datatype = None
+            xy = None
+            text = None
+            pos = 0
+
+            while pos + 4 <= size:
+                length, record, _ = unpack_header(data, pos)
+                if length < 4:
+                    raise ValueError(f"Corrupt GDSII record at offset {pos} in {gds_path}")
+                body = pos + 4
+                pos += length
+
+                if record == GDS_LAYER:
+                    layer = struct.unpack_from(">H", data, body)[0]
+                elif record in (GDS_DATATYPE, GDS_TEXTTYPE, GDS_BOXTYPE):
+                    datatype = struct.unpack_from(">H", data, body)[0]
+                elif record == GDS_XY:
+                    # Decode coordinates only for elements the analysis keeps
+                    if element is not None and (layer, datatype) in wanted:
+                        xy = np.frombuffer(data, dtype=">i4", count=(length - 4) // 4, offset=body).astype(float)
+                elif record == GDS_STRING:
+                    text = bytes(data[body:pos]).rstrip(b"\0").decode("ascii", errors="replace")
+                elif record in (GDS_BOUNDARY, GDS_BOX, GDS_TEXT):
+                    element = record
+                    layer = datatype = xy = text = None
+                elif record == GDS_ENDEL:
+                    if element is not None and xy is not None and cell is not None:
+                        points = xy.reshape(-1, 2) * factor
+                        if element != GDS_TEXT:
+                            # GDSII repeats the first vertex at the end; gdstk stores polygons open
+                            if len(points) > 1 and np.array_equal(points[0], points[-1]):
+                                points = points[:-1]
+                            cell.polygons.append(gdstk.Polygon(points, layer=layer, datatype=datatype))
+                        elif text is not None:
+                            cell.labels.append(gdstk.Label(text, (points[0][0], points[0][1]), layer=layer, texttype=datatype))
+                    element = None
+                    layer = datatype = xy = text = None
+                elif record == GDS_BGNSTR:
+                    cell = StreamCell("", [], [])
+                elif record == GDS_STRNAME:
+                    if cell is not None:
+                        cell.name = bytes(data[body:pos]).rstrip(b"\0").decode("ascii", errors="replace")
+                elif record == GDS_ENDSTR:
+                    if cell is not None:
+                        yield cell
+                    cell = None
+                elif record == GDS_UNITS:
+                    # Database unit in user units, as used by gdstk.read_gds with unit=0
+                    factor = gds_real_to_float(data[body:body + 8])
+                elif record == GDS_ENDLIB:
+                    break
+
+
+def load_oas_layout(oas_path, layer_map=None, layer_filter=True):
+    """
+    Load an OASIS file and return the contained cells.
+
+    gdstk.read_oas has no layer filter, so with layer_filter the polygons outside the layer map are
+    dropped right after loading, before any analysis work. OASIS repetitions of the kept polygons
+    and labels are expanded into individual elements, as they are in a GDS file.
+    """
+    if layer_map is None:
+        layer_map = default_layer_map
+    wanted = set(layer_map.values())
+    lib = gdstk.read_oas(oas_path)
+
+    if len(lib.cells) == 0:
+        raise ValueError(f"No cells found in {oas_path}")
+    for cell in lib.cells:
+        if layer_filter:
+            unused = [p for p in cell.polygons if (p.layer, p.datatype) not in wanted]
+            if unused:
+                cell.remove(*unused)
+        for element in cell.polygons + cell.labels:
+            if element.repetition.size > 1:
+                cell.add(*element.apply_repetition())
+    return lib.cells
+
+
+def load_layout(layout_path, layer_map=None, layer_filter=True, reader="gdstk"):
+    """
+    Return the cells of a layout file for the analysis.
+
+    Args:
+        layout_path (str): Path to the GDS or OASIS file.
+        layer_map (dict): Layers of the analysis. Defaults to default_layer_map.
+        layer_filter (bool): Read only the layers of the layer map (gdstk reader).
+        reader (str): "gdstk" loads the whole library with load_gds_layout and returns a list of cells.
+            "stream" returns a generator over iter_gds_cells, which reads one cell at a time
+            and always keeps only the layers of the layer map.
+            OASIS files are always loaded in full with load_oas_layout.
+    """
+    if reader not in ("gdstk", "stream"):
+        raise ValueError(f"Unknown layout reader '{reader}'. Available readers: gdstk, stream")
+    if is_oasis_file(layout_path):
+        return load_oas_layout(layout_path, layer_map, layer_filter or reader == "stream")
+    if reader == "stream":
+        return _non_empty(iter_gds_cells(layout_path, layer_map), layout_path)
+    return load_gds_layout(layout_path, layer_map, layer_filter)
+
+
+def _non_empty(cells, layout_path):
+    found = False
+    for cell in cells:
+        found = True
+        yield cell
+    if not found:
+        raise ValueError(f"No cells found in {layout_path}")
+
+
 def extract_markers(cell):
     """
-    Extract polygons from a cell grouped by (layer, datatype).
+    Extract polygons from a cell (or CellIndex) grouped by (layer, datatype).
     Returns a dict with keys (layer, datatype) and values list of polygons.
     The output will be like:
         # {
@@ -47,6 +526,9 @@ def extract_markers(cell):
         #     (2, 5): [poly3]
         # }
     """
+    if isinstance(cell, CellIndex):
+        return {key: bucket.polygons for key, bucket in cell.layers.items()}
+
     markers = {}
     for poly in cell.polygons:
         key = (poly.layer, poly.datatype)
@@ -57,7 +539,7 @@ def extract_markers(cell):
 
 def find_text_labels(cell, layer=rule_name_layer, datatype=rule_name_datatype):
     """
-    Extract text labels from cell on the given layer and datatype.
+    Extract text labels from cell (or CellIndex) on the given layer and datatype.
     Returns list of dicts with text and position.
     Example:
         # [
@@ -65,6 +547,9 @@ def find_text_labels(cell, layer=rule_name_layer, datatype=rule_name_datatype):
         #     {'text': 'L.S.1', 'position': (30, 40)}
         # ]
     """
+    if isinstance(cell, CellIndex):
+        return [{'text': text.text, 'position': text.origin} for text in cell.labels_on(layer, datatype)]
+
     labels = []
     for text in cell.labels:
         if text.layer == layer and text.texttype == datatype:
@@ -77,8 +562,12 @@ def find_text_labels(cell, layer=rule_name_layer, datatype=rule_name_datatype):
 def find_rule_groups(cell):
     """
     Extract polygons on layer 255 with datatype 1 (255.1) which represent rule group regions.
+    Accepts a cell or a CellIndex.
     Returns list of polygons.
     """
+    if isinstance(cell, CellIndex):
+        return cell.layer(rule_grouping_marker_layer, rule_grouping_marker_datatype).polygons
+
     rule_group_polys = []
     for poly in cell.polygons:
         if poly.layer == rule_grouping_marker_layer and poly.datatype == rule_grouping_marker_datatype:
@@ -94,59 +583,258 @@ def polygon_contains_point(polygon, coord):
     return polygon.contain(coord)
 
 
-def patterns_in_polygon(patterns, polygon):
+def points_in_polygon(points, polygon, bbox=None, polygon_is_rectangle=None):
+    """
+    Check which of many points lie inside a polygon, in one call.
+    Points on the polygon edges count as inside, as for polygon.contain.
+
+    Points outside the polygon's bounding box are rejected with a vectorized test first. For
+    axis-aligned rectangles that test is exact; other polygons get a single multi-point
+    polygon.contain call on the remaining candidates.
+
+    Args:
+        points (array-like): (m, 2) point coordinates.
+        polygon: gdstk Polygon.
+        bbox: Optional precomputed ((xmin, ymin), (xmax, ymax)) of polygon.
+        polygon_is_rectangle (bool): Optional precomputed rectangle flag of polygon.
+
+    Returns:
+        ndarray: (m,) boolean array.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if bbox is None:
+        bbox = polygon.bounding_box()
+    if polygon_is_rectangle is None:
+        polygon_is_rectangle = is_rectangle(polygon.points)
+
+    (xmin, ymin), (xmax, ymax) = bbox
+    inside = (points[:, 0] >= xmin) & (points[:, 0] <= xmax) & (points[:, 1] >= ymin) & (points[:, 1] <= ymax)
+    if polygon_is_rectangle or not inside.any():
+        return inside
+
+    candidates = np.flatnonzero(inside)
+    # Plain (x, y) sequences: gdstk takes two array rows for a single point
+    inside[candidates] = np.atleast_1d(polygon.contain(*points[candidates].tolist()))
+    return inside
+
+
+class PointIndex:
+    """
+    Uniform grid over points, about one point per bin. The points are stored sorted by bin (column
+    major), so the points of a column of bins are one slice and the points inside a polygon's bounding
+    box are gathered with one slice per column instead of a scan over every point. The point nearest
+    to a location is searched in growing blocks of bins around it.
+    """
+
+    def __init__(self, points):
+        self.points = np.asarray(points, dtype=float).reshape(-1, 2)
+        n = len(self.points)
+        if n == 0:
+            return
+        self.lower = self.points.min(axis=0)
+        width, height = self.points.max(axis=0) - self.lower
+        # Square bins of about one point each, a single row or column for points on a line
+        if width > 0 and height > 0:
+            side = math.sqrt(width * height / n)
+            columns, rows = min(math.ceil(width / side), n), min(math.ceil(height / side), n)
+        else:
+            columns, rows = (n, 1) if width > 0 else (1, n if height > 0 else 1)
+        self.columns, self.rows = columns, rows
+        self.lower = self.lower.tolist()
+        self.bin_size = [width / columns if width > 0 else 1.0, height / rows if height > 0 else 1.0]
+        bins = self._bin(self.points)
+        keys = bins[:, 0] * rows + bins[:, 1]
+        self.bin_order = np.argsort(keys, kind='stable')
+        # Points of bin k are self.bin_order[self.bin_starts[k]:self.bin_starts[k + 1]]
+        self.bin_starts = np.searchsorted(keys[self.bin_order], np.arange(columns * rows + 1))
+
+    def __len__(self):
+        return len(self.points)
+
+    def _bin(self, points):
+        # (column, row) of the bins holding points, clipped to the grid
+        bins = np.floor((np.asarray(points, dtype=float).reshape(-1, 2) - self.lower) / self.bin_size).astype(np.int64)
+        return np.minimum(np.maximum(bins, 0), [self.columns - 1, self.rows - 1])
+
+    def _bin_of(self, x, y):
+        # _bin of a single point, without the array round trip
+        column = math.floor((x - self.lower[0]) / self.bin_size[0])
+        row = math.floor((y - self.lower[1]) / self.bin_size[1])
+        return min(max(column, 0), self.columns - 1), min(max(row, 0), self.rows - 1)
+
+    def _in_bins(self, column0, column1, row0, row1):
+        # Indices of the points in the bins of columns column0..column1 and rows row0..row1
+        columns = np.arange(column0, column1 + 1) * self.rows
+        starts = self.bin_starts[columns + row0]
+        counts = self.bin_starts[columns + row1 + 1] - starts
+        offsets = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+        return self.bin_order[np.repeat(starts, counts) + offsets]
+
+    def in_box(self, bbox):
+        """Return the indices (ascending) of the points inside the closed box ((xmin, ymin), (xmax, ymax))."""
+        (xmin, ymin), (xmax, ymax) = bbox
+        if len(self.points) == 0:
+            return np.empty(0, dtype=np.int64)
+        column0, row0 = self._bin_of(xmin, ymin)
+        column1, row1 = self._bin_of(xmax, ymax)
+        ids = self._in_bins(column0, column1, row0, row1)
+        if profiler.enabled:
+            profiler.count("box_candidates", len(ids))
+        x, y = self.points[ids, 0], self.points[ids, 1]
+        return np.sort(ids[(x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax)])
+
+    def in_polygon(self, polygon, bbox=None, polygon_is_rectangle=None):
+        """Return the indices (ascending) of the points inside polygon, edges included."""
+        if bbox is None:
+            bbox = polygon.bounding_box()
+        ids = self.in_box(bbox)
+        if len(ids) == 0:
+            return ids
+        if polygon_is_rectangle is None:
+            polygon_is_rectangle = is_rectangle(polygon.points)
+        if polygon_is_rectangle:
+            return ids
+        if profiler.enabled:
+            profiler.count("containment_tests", len(ids))
+        return ids[points_in_polygon(self.points[ids], polygon, bbox=bbox, polygon_is_rectangle=False)]
+
+    def nearest(self, point):
+        """
+        Return the index of the point nearest to point (Euclidean distance), the lowest index among
+        equally near points, or None if there are no points.
+
+        The search looks at the block of bins around point and doubles its radius until every bin outside
+        the block is farther away than the nearest point found inside it.
+        """
+        if len(self.points) == 0:
+            return None
+        x, y = point
+        column, row = self._bin_of(x, y)
+        (xmin, ymin), (width, height) = self.lower, self.bin_size
+        # Rounding margin of the bin edges
+        margin = 1e-9 * (width + height)
+        radius = 1
+        while True:
+            column0, column1 = max(column - radius, 0), min(column + radius, self.columns - 1)
+            row0, row1 = max(row - radius, 0), min(row + radius, self.rows - 1)
+            ids = self._in_bins(column0, column1, row0, row1)
+            if profiler.enabled:
+                profiler.count("nearest_candidates", len(ids))
+            if len(ids):
+                dx = self.points[ids, 0] - x
+                dy = self.points[ids, 1] - y
+                dist = dx * dx + dy * dy
+                best = dist.min()
+                # Distance to the nearest edge of the block with bins beyond it
+                gaps = []
+                if column0 > 0:
+                    gaps.append(x - (xmin + column0 * width))
+                if column1 < self.columns - 1:
+                    gaps.append(xmin + (column1 + 1) * width - x)
+                if row0 > 0:
+                    gaps.append(y - (ymin + row0 * height))
+                if row1 < self.rows - 1:
+                    gaps.append(ymin + (row1 + 1) * height - y)
+                gap = min(gaps, default=math.inf) - margin
+                # Strict comparison: a point outside the block at the same distance could have a lower index
+                if gap > 0 and gap * gap > best:
+                    return int(ids[dist == best].min())
+            radius *= 2
+
+
+def patterns_in_polygon(patterns, polygon, centroids=None):
     """
     Return patterns that lie inside polygon.
     Checks centroid of each pattern polygon.
+    Precomputed centroids (one per pattern, e.g. LayerBucket.centroids) can be passed in.
     """
-    contained = []
-    for p in patterns:
-        centroid = compute_centroid(p)
-        if polygon_contains_point(polygon, centroid):
-            contained.append(p)
-    return contained
+    if centroids is None:
+        _, centroids = compute_areas_and_centroids(*pack_polygons(patterns))
 
+    inside = points_in_polygon(centroids, polygon)
+    return [p for p, contained in zip(patterns, inside) if contained]
 
-def associate_rules_to_patterns(cell):
+
+def describe_ambiguity(ambiguity):
+    """One line description of an ambiguity reported by associate_rules_to_patterns."""
+    if ambiguity['type'] == 'labels':
+        (x0, y0), (x1, y1) = ambiguity['bbox']
+        others = ", ".join(ambiguity['labels'][1:])
+        return f"rule group ({x0:g}, {y0:g})-({x1:g}, {y1:g}) holds several rule names, {ambiguity['rule']} used and {others} ignored"
+    return f"{ambiguity['groups']} rule groups are named {ambiguity['rule']}, their patterns are combined"
+
+
+def associate_rules_to_patterns(cell, layer_map=None, rule_names=None, ambiguities=None):
     """
     Associate rule groups (255.1 polygons) with rule names (text on 22.22)
     and collect patterns (255.0 polygons) inside those groups.
+    Accepts a cell or a CellIndex built from it.
+    layer_map overrides the layers used (see parse_layer_map).
+    With rule_names, groups whose rule name is not in it are skipped before collecting their patterns.
+
+    A group takes the name of the first label inside it, or of the nearest label when none is inside.
+    The patterns of groups sharing a rule name are combined, in group order.
+    Ambiguous labelling is appended to the ambiguities list when given, see describe_ambiguity:
+        {'type': 'labels', 'rule': name used, 'labels': [distinct names inside the group], 'bbox': group bounding box}
+        {'type': 'groups', 'rule': name, 'groups': number of groups with that name}
+
     Returns dict {rule_name: [pattern_polygons]}:
         {
             'RULE_A': [pattern_poly1, pattern_poly2],
             'RULE_B': [pattern_poly3]
         }
     """
-    rule_groups = find_rule_groups(cell)   # polygons on layer 255 and datatype 1
-    text_labels = find_text_labels(cell)   # rule names on layer 22 and datatype 22
-    patterns = [p for p in cell.polygons if p.layer == pattern_marking_layer and p.datatype == pattern_marking_datatype]
+    if not isinstance(cell, CellIndex):
+        cell = CellIndex(cell)
+    if layer_map is None:
+        layer_map = default_layer_map
+
+    group_bucket = cell.layer(*layer_map['rule_group'])   # polygons on layer 255 and datatype 1
+    text_labels = find_text_labels(cell, *layer_map['rule_name'])   # rule names on layer 22 and datatype 22
+    pattern_bucket = cell.layer(*layer_map['pattern'])
+    patterns = pattern_bucket.polygons
+    if len(group_bucket) == 0:
+        return {}
+
+    # Points indexed by x once per cell, queried by every group
+    label_points = PointIndex([label['position'] for label in text_labels])
+    pattern_points = PointIndex(pattern_bucket.centroids)
 
     rule_map = {}
+    group_counts = {}
     #Loop over each rule group polygon
-    for group_poly in rule_groups:
-        group_centroid = compute_centroid(group_poly)
+    for group_poly, group_bbox, group_is_rectangle, group_centroid in zip(group_bucket.polygons, group_bucket.bboxes, group_bucket.rectangles, group_bucket.centroids):
         associated_label = None
 
         # Find label inside polygon
-        #Checks if any label's position is inside the current rule polygon
-        for label in text_labels:
-            if polygon_contains_point(group_poly, label['position']):
-                associated_label = label['text']
-                break
+        #Checks if any label's position is inside the current rule polygon (the first one in label order)
+        inside_labels = label_points.in_polygon(group_poly, group_bbox, group_is_rectangle)
+        if len(inside_labels):
+            associated_label = text_labels[inside_labels[0]]['text']
+            if len(inside_labels) > 1 and ambiguities is not None:
+                names = list(dict.fromkeys(text_labels[i]['text'] for i in inside_labels))
+                if len(names) > 1:
+                    ambiguities.append({'type': 'labels', 'rule': associated_label, 'labels': names, 'bbox': group_bbox.tolist()})
 
         # If none found inside, pick nearest label by distance (Euclidean distance.)
         if associated_label is None:
-            min_dist = float('inf')
-            for label in text_labels:
-                dx = label['position'][0] - group_centroid[0]
-                dy = label['position'][1] - group_centroid[1]
-                dist = dx*dx + dy*dy
-                if dist < min_dist:
-                    min_dist = dist
-                    associated_label = label['text']
-
-        contained_patterns = patterns_in_polygon(patterns, group_poly)
-        rule_map[associated_label] = contained_patterns
+            if profiler.enabled:
+                profiler.count("nearest_label_searches")
+            nearest = label_points.nearest(group_centroid)
+            if nearest is not None:
+                associated_label = text_labels[nearest]['text']
+
+        if rule_names is not None and associated_label not in rule_names:
+            continue
+
+        contained_patterns = [patterns[i] for i in pattern_points.in_polygon(group_poly, group_bbox, group_is_rectangle)]
+        rule_map.setdefault(associated_label, []).extend(contained_patterns)
+        group_counts[associated_label] = group_counts.get(associated_label, 0) + 1
+
+    if ambiguities is not None:
+        for name, count in group_counts.items():
+            if count > 1:
+                ambiguities.append({'type': 'groups', 'rule': name, 'groups': count})
 
     return rule_map
 
@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, Toplevel, scrolledtext, ttk
 import threading
+import queue
 import os
 import sys
 import io
@@ -10,25 +11,30 @@ from setup import main as run_analysis
 
 
 class RedirectText(io.TextIOBase):
-    def __init__(self, text_widget, log_file_path=None):
+    """
+    stdout/stderr replacement queueing the text as output events. Safe to write from any thread:
+    the GUI thread inserts the queued text into the console and the log file in batches (see SVRFAnalyzerGUI._poll_events).
+    """
+
+    def __init__(self, events):
         super().__init__()
-        self.text_widget = text_widget
-        self.log_file_path = log_file_path
+        self.events = events
 
     def write(self, s):
-        self.text_widget.config(state=tk.NORMAL)
-        self.text_widget.insert(tk.END, s)
-        self.text_widget.see(tk.END)
-        self.text_widget.config(state=tk.DISABLED)
-        if self.log_file_path:
-            with open(self.log_file_path, 'a', encoding='utf-8') as f:
-                f.write(s)
+        self.events.put({'type': 'output', 'text': s})
+        return len(s)
 
     def flush(self):
         pass
 
 
 class SVRFAnalyzerGUI:
+    # Milliseconds between two drains of the event queue
+    poll_interval = 100
+
+    # Progress bar position (0-100) at the start of each stage of setup.main, the analysis stage fills 5-90
+    stage_progress = {1: 0, 2: 5, 3: 90, 4: 100}
+
     def __init__(self, root):
         self.root = root
         self.root.title("SVRF Layout Analyzer")
@@ -41,11 +47,22 @@ class SVRFAnalyzerGUI:
         self.report_type = tk.StringVar(value="both")
         self.loading_popup = None
         self.progress_bar = None
+        self.status_label = None
+        self.cancel_btn = None
         self.console = None
         self.log_file_path = None
+        self.log_file = None
         self.html_report_path = None
         self.excel_report_path = None
 
+        # Events of the analysis thread (see setup.main and RedirectText), drained on a Tk timer
+        self.events = queue.Queue()
+        self.cancel_event = None
+        self.saved_streams = None
+        self.stage = None
+        self.files_progress = (0, 0)
+        self.cells_progress = (0, 0)
+
         self._build_gui()
 
     def update_type(self, selected_value):
@@ -53,7 +70,7 @@ class SVRFAnalyzerGUI:
         self.report_type_label.config(text=f"Selected Report Type: {self.report_type.get()}")
 
     def _build_gui(self):
-        tk.Label(self.root, text="GDS Layout Directory:").grid(row=0, column=0, sticky='e')
+        tk.Label(self.root, text="GDS/OASIS Layout Directory:").grid(row=0, column=0, sticky='e')
         tk.Entry(self.root, textvariable=self.layout_dir, width=50).grid(row=0, column=1)
         tk.Button(self.root, text="Browse", command=self.browse_layout_dir).grid(row=0, column=2)
 
@@ -90,8 +107,14 @@ class SVRFAnalyzerGUI:
         self.view_excel_btn.grid(row=8, column=2, pady=(5, 15))
 
     def _redirect_stdout(self):
-        sys.stdout = RedirectText(self.console, self.log_file_path)
-        sys.stderr = RedirectText(self.console, self.log_file_path)
+        self.saved_streams = (sys.stdout, sys.stderr)
+        sys.stdout = RedirectText(self.events)
+        sys.stderr = RedirectText(self.events)
+
+    def _restore_stdout(self):
+        if self.saved_streams:
+            sys.stdout, sys.stderr = self.saved_streams
+            self.saved_streams = None
 
     def browse_layout_dir(self):
         selected = filedialog.askdirectory()
@@ -129,6 +152,13 @@ class SVRFAnalyzerGUI:
             self.html_report_path = os.path.join(output_dir, f"{self.report_name.get()}.html")
             self.excel_report_path = os.path.join(output_dir, f"{self.report_name.get()}.xlsx")
 
+        # One buffered handle for the whole run, written once per drain of the event queue
+        self.log_file = open(self.log_file_path, 'a', encoding='utf-8', buffering=64 * 1024)
+        self.events = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.stage = None
+        self.files_progress = (0, 0)
+        self.cells_progress = (0, 0)
         self._redirect_stdout()
 
         self.view_log_btn.config(state=tk.DISABLED)
@@ -136,66 +166,157 @@ class SVRFAnalyzerGUI:
         self.view_excel_btn.config(state=tk.DISABLED)
 
         self._show_loading_popup()
-        threading.Thread(target=self._run_analysis_thread, daemon=True).start()
+        threading.Thread(target=self._run_analysis_thread, args=(self._build_argv(), self.events, self.cancel_event), daemon=True).start()
+        self.root.after(self.poll_interval, self._poll_events)
+
+    def _build_argv(self):
+        rn=""
+        if self.report_name.get() == "":
+            rn="None"
+        else:
+            rn=self.report_name.get()
+
+        return [
+            "--layout_dir", self.layout_dir.get(),
+            "--svrf_file", self.svrf_file.get(),
+            "--output_dir", self.output_dir.get(),
+            "--report_type", self.report_type.get(),
+            "--report_name", rn
+        ]
 
     def _show_loading_popup(self):
         self.loading_popup = Toplevel(self.root)
         self.loading_popup.title("Running Analysis")
-        self.loading_popup.geometry("300x120")
+        self.loading_popup.geometry("360x150")
         self.loading_popup.resizable(False, False)
         self.loading_popup.grab_set()
+        self.loading_popup.protocol("WM_DELETE_WINDOW", self.cancel)
 
-        tk.Label(self.loading_popup, text="Please wait...\nRunning analysis...").pack(pady=(15, 10))
+        self.status_label = tk.Label(self.loading_popup, text="Please wait...\nRunning analysis...")
+        self.status_label.pack(pady=(15, 10))
 
-        self.progress_bar = ttk.Progressbar(self.loading_popup, mode="indeterminate", length=250)
+        self.progress_bar = ttk.Progressbar(self.loading_popup, mode="determinate", maximum=100, length=300)
         self.progress_bar.pack(pady=5)
-        self.progress_bar.start(10)
-        self.loading_popup.update()
+
+        self.cancel_btn = tk.Button(self.loading_popup, text="Cancel", command=self.cancel)
+        self.cancel_btn.pack(pady=5)
 
     def _close_loading_popup(self):
-        if self.progress_bar:
-            self.progress_bar.stop()
         if self.loading_popup:
             self.loading_popup.destroy()
             self.loading_popup = None
 
-    def _run_analysis_thread(self):
-        rn=""
-        if self.report_name.get() == "":
-            rn="None"
-        else:
-            rn=self.report_name.get()
+    def cancel(self):
+        """Ask the analysis thread to stop. No new file or cell is started, see analysis_runner.run_analysis."""
+        if self.cancel_event is not None and not self.cancel_event.is_set():
+            self.cancel_event.set()
+            self.status_label.config(text="Cancelling...\nWaiting for the running work to stop")
+            self.cancel_btn.config(state=tk.DISABLED)
+
+    def _run_analysis_thread(self, argv, events, cancel_event):
+        # Runs outside the Tk thread: everything is reported through the event queue.
+        # The analysis modules load gdstk and numpy, imported here so the window opens without them
+        from src.analysis_runner import AnalysisCancelled
 
         try:
-            sys.argv = [
-                "setup.py",
-                "--layout_dir", self.layout_dir.get(),
-                "--svrf_file", self.svrf_file.get(),
-                "--output_dir", self.output_dir.get(),
-                "--report_type", self.report_type.get(),
-                "--report_name", rn
-            ]
-            run_analysis()
-            self._close_loading_popup()
-            print("\nAnalysis completed successfully.")
-            print(f"Log file saved to: {self.log_file_path}\n")
-            self.view_log_btn.config(state=tk.NORMAL)
+            run_analysis(argv, events, cancel_event)
+            events.put({'type': 'finished'})
+        except AnalysisCancelled:
+            events.put({'type': 'cancelled'})
+        except SystemExit as e:
+            # Argument errors: argparse already printed the message
+            events.put({'type': 'error', 'message': f"Invalid arguments (exit code {e.code})"})
+        except Exception as e:
+            events.put({'type': 'error', 'message': str(e)})
+
+    def _poll_events(self):
+        """Drain the event queue: one console insert and one log write for all the queued text, then the progress."""
+        texts = []
+        final = None
+        while final is None:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if event['type'] == 'output':
+                texts.append(event['text'])
+            elif event['type'] == 'stage':
+                self.stage = event
+                self.cells_progress = (0, 0)
+            elif event['type'] == 'progress':
+                if event['unit'] == 'file':
+                    self.files_progress = (event['done'], event['total'])
+                    self.cells_progress = (0, 0)
+                else:
+                    self.cells_progress = (event['done'], event['total'])
+            elif event['type'] == 'reports':
+                self.html_report_path, self.excel_report_path = event['html'], event['excel']
+            else:
+                final = event
 
+        if texts:
+            self._write_console("".join(texts))
+        if final is None:
+            self._update_progress()
+            self.root.after(self.poll_interval, self._poll_events)
+        else:
+            self._finish(final)
+
+    def _write_console(self, text):
+        self.console.config(state=tk.NORMAL)
+        self.console.insert(tk.END, text)
+        self.console.see(tk.END)
+        self.console.config(state=tk.DISABLED)
+        if self.log_file:
+            self.log_file.write(text)
+
+    def _update_progress(self):
+        if self.stage is None or self.loading_popup is None or self.cancel_event.is_set():
+            return
+        value = self.stage_progress[self.stage['stage']]
+        status = self.stage['name']
+        files_done, files_total = self.files_progress
+        if self.stage['stage'] == 2 and files_total:
+            cells_done, cells_total = self.cells_progress
+            fraction = files_done + (cells_done / cells_total if cells_total and files_done < files_total else 0)
+            value += (self.stage_progress[3] - value) * fraction / files_total
+            status += f"\nFile {files_done} of {files_total}"
+            if cells_total:
+                status += f", cell {cells_done} of {cells_total}"
+        self.progress_bar['value'] = value
+        self.status_label.config(text=status)
+
+    def _finish(self, event):
+        self._restore_stdout()
+        self._close_loading_popup()
+        self.cancel_event = None
+
+        if event['type'] == 'finished':
+            self._write_console("\nAnalysis completed successfully.\n")
+            self._write_console(f"Log file saved to: {self.log_file_path}\n\n")
             if os.path.exists(self.html_report_path):
                 self.view_html_btn.config(state=tk.NORMAL)
             else:
-                print(f"HTML report not found: {self.html_report_path}")
-
+                self._write_console(f"HTML report not found: {self.html_report_path}\n")
             if os.path.exists(self.excel_report_path):
                 self.view_excel_btn.config(state=tk.NORMAL)
             else:
-                print(f"Excel report not found: {self.excel_report_path}")
+                self._write_console(f"Excel report not found: {self.excel_report_path}\n")
+        elif event['type'] == 'cancelled':
+            self._write_console("\nAnalysis cancelled.\n")
+        else:
+            self._write_console(f"\nError occurred: {event['message']}\n")
 
+        self.log_file.close()
+        self.log_file = None
+        self.view_log_btn.config(state=tk.NORMAL)
+
+        if event['type'] == 'finished':
             messagebox.showinfo("Done", f"Analysis complete.\nLog file saved to:\n{self.log_file_path}")
-        except Exception as e:
-            self._close_loading_popup()
-            print(f"\nError occurred: {e}\n")
-            messagebox.showerror("Error", f"An error occurred:\n{e}")
+        elif event['type'] == 'cancelled':
+            messagebox.showinfo("Cancelled", f"Analysis cancelled.\nLog file saved to:\n{self.log_file_path}")
+        else:
+            messagebox.showerror("Error", f"An error occurred:\n{event['message']}")
 
     def _open_file(self, path):
         if path and os.path.exists(path):
@@ -1,18 +1,354 @@
-from src.gds_analyzer import compute_centroid
+from src import profiler
+from src.gds_analyzer import compute_areas_and_centroids, pack_polygons, is_rectangle
+import math
 import gdstk
+import numpy as np
 """
 Pattern Validator module:
 Logic to validate test patterns (good/bad) according to layout analysis specifications.
 """
 
-def validate_patterns(rule_name, patterns, error_markers):
+class MarkerIndex:
+    """
+    Uniform grid over the bounding boxes of the error markers of a cell.
+
+    Built once per cell and queried per pattern, so only the markers whose bounding box
+    touches the pattern's bounding box reach the exact polygons_overlap check.
+    """
+
+    # Markers covering more bins than this are kept out of the grid and always tested by bounding box
+    max_bins_per_marker = 64
+    # Polygons sent to one gdstk.boolean by overlaps_many
+    boolean_batch_size = 1024
+
+    def __init__(self, markers, bin_size=None, bboxes=None, rectangles=None):
+        self.markers = list(markers)
+        self.bins = {}
+        self.large = []
+        if bboxes is None:
+            bboxes = [m.bounding_box() for m in self.markers]
+        self.bboxes = np.asarray(bboxes, dtype=float).reshape(-1, 2, 2)
+        if rectangles is None:
+            rectangles = [is_rectangle(m.points) for m in self.markers]
+        self.rectangles = np.asarray(rectangles, dtype=bool).reshape(-1)
+        # marker index -> manhattan_rectangles of the marker, filled on demand
+        self.manhattan = {}
+
+        if bin_size is None:
+            bin_size = self._default_bin_size()
+        self.bin_size = bin_size
+
+        for i, ((x0, y0), (x1, y1)) in enumerate(self.bboxes):
+            ix0, iy0, ix1, iy1 = self._bin_range(x0, y0, x1, y1)
+            if (ix1 - ix0 + 1) * (iy1 - iy0 + 1) > self.max_bins_per_marker:
+                self.large.append(i)
+                continue
+            for ix in range(ix0, ix1 + 1):
+                for iy in range(iy0, iy1 + 1):
+                    self.bins.setdefault((ix, iy), []).append(i)
+
+    @classmethod
+    def from_bucket(cls, bucket, bin_size=None):
+        """Build the index from a LayerBucket, reusing its packed bounding boxes and rectangle flags."""
+        return cls(bucket.polygons, bin_size=bin_size, bboxes=bucket.bboxes, rectangles=bucket.rectangles)
+
+    def __len__(self):
+        return len(self.markers)
+
+    def _default_bin_size(self):
+        # Bins about the size of a typical marker keep a handful of markers per bin
+        if len(self.markers) == 0:
+            return 1.0
+        sizes = np.maximum(self.bboxes[:, 1, 0] - self.bboxes[:, 0, 0], self.bboxes[:, 1, 1] - self.bboxes[:, 0, 1])
+        bin_size = float(np.median(sizes))
+        if bin_size <= 0:
+            extent = float(np.max(self.bboxes[:, 1, :] - self.bboxes[:, 0, :].min(axis=0)))
+            bin_size = extent / math.sqrt(len(self.markers)) if extent > 0 else 1.0
+        return bin_size
+
+    def _bin_range(self, x0, y0, x1, y1):
+        bs = self.bin_size
+        return math.floor(x0 / bs), math.floor(y0 / bs), math.floor(x1 / bs), math.floor(y1 / bs)
+
+    def candidate_ids(self, bbox):
+        """
+        Return the indices (ascending) of the markers whose bounding box overlaps or touches bbox.
+
+        Args:
+            bbox: ((xmin, ymin), (xmax, ymax)) as returned by Polygon.bounding_box().
+        """
+        if bbox is None or len(self.markers) == 0:
+            return np.empty(0, dtype=np.int64)
+        (x0, y0), (x1, y1) = bbox
+        ix0, iy0, ix1, iy1 = self._bin_range(x0, y0, x1, y1)
+
+        if (ix1 - ix0 + 1) * (iy1 - iy0 + 1) > len(self.bins):
+            # Query larger than the populated grid: test every marker
+            ids = np.arange(len(self.markers))
+        else:
+            found = set(self.large)
+            for ix in range(ix0, ix1 + 1):
+                for iy in range(iy0, iy1 + 1):
+                    found.update(self.bins.get((ix, iy), ()))
+            if not found:
+                return np.empty(0, dtype=np.int64)
+            ids = np.fromiter(sorted(found), dtype=np.int64, count=len(found))
+
+        b = self.bboxes[ids]
+        hit = (b[:, 0, 0] <= x1) & (x0 <= b[:, 1, 0]) & (b[:, 0, 1] <= y1) & (y0 <= b[:, 1, 1])
+        return ids[hit]
+
+    def candidates(self, bbox):
+        """
+        Return the markers whose bounding box overlaps or touches bbox, in their original order.
+
+        Args:
+            bbox: ((xmin, ymin), (xmax, ymax)) as returned by Polygon.bounding_box().
+        """
+        return [self.markers[i] for i in self.candidate_ids(bbox)]
+
+    def boolean_candidates(self, polygon, bbox=None, polygon_is_rectangle=None):
+        """
+        Cheap stage of overlaps: everything short of the gdstk boolean engine.
+
+        Marker bounding boxes are compared in one vectorized step. A rectangle whose bounding box
+        overlaps a rectangular marker is decided from that alone. Manhattan polygons are then compared
+        with the Manhattan markers by rectangle decomposition (see quick_overlap), the polygon being
+        decomposed once for all its candidates.
+
+        Returns:
+            True if polygon is known to overlap a marker, otherwise the list of the indices of the
+            markers left to the boolean engine (empty when no marker can overlap polygon).
+        """
+        if bbox is None:
+            bbox = polygon.bounding_box()
+        if polygon_is_rectangle is None:
+            polygon_is_rectangle = is_rectangle(polygon.points)
+
+        ids = self.candidate_ids(bbox)
+        if len(ids) == 0:
+            return []
+        strict = _strict_overlaps(self.bboxes[ids], bbox)
+        if profiler.enabled:
+            profiler.count("marker_candidates", len(ids))
+            profiler.count("bbox_rejections", len(ids) - int(strict.sum()))
+        if polygon_is_rectangle and np.any(strict & self.rectangles[ids]):
+            if profiler.enabled:
+                profiler.count("rectangle_fast_paths")
+            return True
+        candidates = ids[strict]
+        if len(candidates) == 0:
+            return []
+        candidates = candidates.tolist()
+        manhattan = [i for i in candidates if self.marker_rectangles(i) is not None]
+        polygon_rects = manhattan_rectangles(polygon.points) if manhattan else None
+        if polygon_rects is None:
+            return candidates
+        pending = []
+        for i in candidates:
+            if profiler.enabled:
+                profiler.count("overlap_tests")
+            marker_rects = self.marker_rectangles(i)
+            if marker_rects is None:
+                pending.append(i)
+            elif rectangles_overlap(polygon_rects, marker_rects):
+                return True
+        return pending
+
+    def marker_rectangles(self, i):
+        """manhattan_rectangles of marker i (its bounding box for a rectangle), None for other shapes."""
+        if i not in self.manhattan:
+            if self.rectangles[i]:
+                self.manhattan[i] = self.bboxes[i].reshape(1, 4)
+            else:
+                self.manhattan[i] = manhattan_rectangles(self.markers[i].points)
+        return self.manhattan[i]
+
+    def overlaps(self, polygon, bbox=None, polygon_is_rectangle=None):
+        """
+        Check whether polygon overlaps any marker, with the same semantics as polygons_overlap.
+        The markers left by boolean_candidates are tested one boolean at a time.
+        """
+        pending = self.boolean_candidates(polygon, bbox, polygon_is_rectangle)
+        if pending is True:
+            return True
+        return any(boolean_overlap(polygon, self.markers[i]) for i in pending)
+
+    def overlaps_many(self, polygons, bboxes=None, rectangles=None):
+        """
+        overlaps for a list of polygons, e.g. all the patterns of a cell.
+
+        The cheap stage runs per polygon (see boolean_candidates). The (polygon, marker) pairs left to
+        the boolean engine are then evaluated together, by tiles of boolean_batch_size polygons: one
+        gdstk.boolean with the first pending marker of every polygon, then one with the other markers
+        of the polygons not found yet. Each piece of an intersection is attributed to the polygon whose
+        bounding box it overlaps. Pieces overlapping several polygon bounding boxes (touching or overlapping
+        polygons) leave those polygons to one boolean per pair, so the result is the same as overlaps.
+
+        Args:
+            polygons (list): Polygons to check.
+            bboxes (list): Optional bounding boxes of the polygons (e.g. from CellIndex.bounding_box).
+            rectangles (list): Optional is_rectangle flags of the polygons.
+
+        Returns:
+            list: One bool per polygon.
+        """
+        flags = [False] * len(polygons)
+        pending = {}
+        for i, polygon in enumerate(polygons):
+            found = self.boolean_candidates(polygon, None if bboxes is None else bboxes[i],
+                                            None if rectangles is None else rectangles[i])
+            if found is True:
+                flags[i] = True
+            elif found:
+                pending[i] = found
+        if pending:
+            if bboxes is None:
+                bboxes = [polygon.bounding_box() if i in pending else None for i, polygon in enumerate(polygons)]
+            # Most overlapping polygons overlap their first pending marker: the other markers are only
+            # sent to the boolean engine for the polygons not found yet
+            hits = set()
+            items = list(pending.items())
+            for start in range(0, len(items), self.boolean_batch_size):
+                tile = dict(items[start:start + self.boolean_batch_size])
+                found = self._batched_boolean(polygons, bboxes, {i: ids[:1] for i, ids in tile.items()})
+                rest = {i: ids[1:] for i, ids in tile.items() if len(ids) > 1 and i not in found}
+                if rest:
+                    found |= self._batched_boolean(polygons, bboxes, rest)
+                hits |= found
+            for i in hits:
+                flags[i] = True
+        return flags
+
+    def _batched_boolean(self, polygons, bboxes, pending):
+        # Indices of the polygons of pending ({polygon index: marker indices}) overlapping their markers
+        order = list(pending)
+        marker_ids = sorted(set().union(*pending.values()))
+        if profiler.enabled:
+            profiler.count("boolean_calls")
+            profiler.count("batched_pairs", sum(len(ids) for ids in pending.values()))
+        pieces = gdstk.boolean([polygons[i] for i in order], [self.markers[j] for j in marker_ids], "and")
+
+        polygon_boxes = np.asarray([bboxes[i] for i in order], dtype=float).reshape(-1, 2, 2)
+        piece_boxes = np.asarray([piece.bounding_box() for piece in pieces], dtype=float).reshape(-1, 2, 2)
+        piece_ids, owners = overlapping_box_pairs(piece_boxes, polygon_boxes)
+        single = np.bincount(piece_ids, minlength=len(pieces))[piece_ids] == 1
+        unresolved = {order[owner] for owner in owners[~single].tolist()}
+        piece_owner = np.full(len(pieces), -1)
+        piece_owner[piece_ids[single]] = owners[single]
+
+        # Only the pieces meeting the box of one of their polygon's pending markers count, so a pair the
+        # cheap stage already decided is not decided again by the rounding of the boolean engine
+        marker_pos = {j: pos for pos, j in enumerate(marker_ids)}
+        pair_keys = np.asarray([pos * len(marker_ids) + marker_pos[j] for pos, i in enumerate(order) for j in pending[i]])
+        piece_ids, markers = overlapping_box_pairs(piece_boxes, self.bboxes[marker_ids])
+        owners = piece_owner[piece_ids]
+        owned = owners >= 0
+        owners, markers = owners[owned], markers[owned]
+        found = owners[np.isin(owners * len(marker_ids) + markers, pair_keys)]
+        hits = {order[owner] for owner in np.unique(found).tolist()}
+
+        for i in sorted(unresolved - hits):
+            if profiler.enabled:
+                profiler.count("batch_fallbacks")
+            if any(boolean_overlap(polygons[i], self.markers[j]) for j in pending[i]):
+                hits.add(i)
+        return hits
+
+
+def _box_bins(boxes, bin_size):
+    # (box index, bin x, bin y) of every grid bin touched by each of the (k, 2, 2) boxes
+    lo = np.floor(boxes[:, 0, :] / bin_size).astype(np.int64)
+    hi = np.floor(boxes[:, 1, :] / bin_size).astype(np.int64)
+    nx = hi[:, 0] - lo[:, 0] + 1
+    ny = hi[:, 1] - lo[:, 1] + 1
+    counts = nx * ny
+    ids = np.repeat(np.arange(len(boxes)), counts)
+    offsets = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+    return ids, lo[ids, 0] + offsets // ny[ids], lo[ids, 1] + offsets % ny[ids]
+
+
+def overlapping_box_pairs(queries, boxes, max_bins=64):
+    """
+    All the pairs of a query box and a box sharing a positive area, found with a vectorized uniform grid
+    (bins about the median box size). Boxes or queries covering more than max_bins bins are compared
+    with every box or query instead.
+
+    Args:
+        queries, boxes: (k, 2, 2) arrays of ((xmin, ymin), (xmax, ymax)) boxes.
+
+    Returns:
+        tuple: (query indices, box indices) arrays of the overlapping pairs, sorted by query then box.
+    """
+    empty = np.empty(0, dtype=np.int64)
+    if len(queries) == 0 or len(boxes) == 0:
+        return empty, empty
+    sizes = np.maximum(boxes[:, 1, 0] - boxes[:, 0, 0], boxes[:, 1, 1] - boxes[:, 0, 1])
+    bin_size = float(np.median(sizes))
+    if bin_size <= 0:
+        bin_size = max(float(sizes.max()), 1.0)
+
+    def bin_count(b):
+        n = np.floor(b[:, 1, :] / bin_size) - np.floor(b[:, 0, :] / bin_size) + 1
+        return n[:, 0] * n[:, 1]
+
+    large_boxes = bin_count(boxes) > max_bins
+    large_queries = bin_count(queries) > max_bins
+    box_ids = np.flatnonzero(~large_boxes)
+    query_ids = np.flatnonzero(~large_queries)
+
+    # Join the bins of the queries with the bins of the boxes on their packed (x, y) key
+    pairs = []
+    if len(box_ids) and len(query_ids):
+        b_ids, b_x, b_y = _box_bins(boxes[box_ids], bin_size)
+        q_ids, q_x, q_y = _box_bins(queries[query_ids], bin_size)
+        b_keys = (b_x << 32) | (b_y & 0xFFFFFFFF)
+        q_keys = (q_x << 32) | (q_y & 0xFFFFFFFF)
+        order = np.argsort(b_keys, kind="stable")
+        b_keys = b_keys[order]
+        b_ids = b_ids[order]
+        starts = np.searchsorted(b_keys, q_keys, side="left")
+        counts = np.searchsorted(b_keys, q_keys, side="right") - starts
+        q_rep = np.repeat(q_ids, counts)
+        offsets = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+        pairs.append((query_ids[q_rep], box_ids[b_ids[np.repeat(starts, counts) + offsets]]))
+    # Large boxes against every query, large queries against every small box
+    for i in np.flatnonzero(large_boxes):
+        pairs.append((np.arange(len(queries)), np.full(len(queries), i)))
+    for q in np.flatnonzero(large_queries):
+        pairs.append((np.full(len(box_ids), q), box_ids))
+    if not pairs:
+        return empty, empty
+
+    q_all = np.concatenate([q for q, _ in pairs]).astype(np.int64)
+    b_all = np.concatenate([b for _, b in pairs]).astype(np.int64)
+    qb = queries[q_all]
+    bb = boxes[b_all]
+    strict = (bb[:, 0, 0] < qb[:, 1, 0]) & (qb[:, 0, 0] < bb[:, 1, 0]) & (bb[:, 0, 1] < qb[:, 1, 1]) & (qb[:, 0, 1] < bb[:, 1, 1])
+    # A pair found in several shared bins is kept once
+    keys = np.unique(q_all[strict] * len(boxes) + b_all[strict])
+    return keys // len(boxes), keys % len(boxes)
+
+
+def _strict_overlaps(boxes, bbox):
+    # Which of the (k, 2, 2) boxes share a positive area with bbox
+    (x0, y0), (x1, y1) = bbox
+    return (boxes[:, 0, 0] < x1) & (x0 < boxes[:, 1, 0]) & (boxes[:, 0, 1] < y1) & (y0 < boxes[:, 1, 1])
+
+
+def validate_patterns(rule_name, patterns, error_markers, cell_index=None, has_errors=None):
     """
     Validate patterns for a given rule.
 
     Args:
         rule_name (str): Name of the rule.
         patterns (list): List of pattern polygons on layer 255.0 (pattern marking layer).
-        error_markers (list): List of polygons on layer 0.1 (result marker) indicating errors.
+        error_markers (list or MarkerIndex): Polygons on layer 0.1 (result marker) indicating errors.
+            Pass a MarkerIndex to reuse one index for all the rules of a cell.
+        cell_index (CellIndex): Optional index of the cell the patterns come from. Its cached
+            centroids and bounding boxes are used instead of recomputing them per rule.
+        has_errors (list): Optional marker overlap of each pattern, as returned by MarkerIndex.overlaps_many,
+            when the patterns of several rules were checked together.
 
     Returns:
         dict: {
@@ -26,20 +362,26 @@ def validate_patterns(rule_name, patterns, error_markers):
         'bad': {'pass': 0, 'fail': 0},
     }
 
-    # Check if pattern overlaps any error marker polygon
-    def pattern_has_error(pattern, error_markers):
-        for err in error_markers:
-            if polygons_overlap(pattern, err):
-                return True
-        return False
+    if not isinstance(error_markers, MarkerIndex):
+        error_markers = MarkerIndex(error_markers)
+
+    # Check if pattern overlaps any error marker polygon near it
+    if has_errors is None:
+        if cell_index is None:
+            has_errors = error_markers.overlaps_many(patterns)
+        else:
+            has_errors = error_markers.overlaps_many(patterns, [cell_index.bounding_box(p) for p in patterns],
+                                                     [cell_index.is_rectangle(p) for p in patterns])
+
+    if cell_index is None:
+        _, centroids = compute_areas_and_centroids(*pack_polygons(patterns))
+    else:
+        centroids = [cell_index.centroid(pattern) for pattern in patterns]
 
-    for pattern in patterns:
-        centroid = compute_centroid(pattern)
+    for centroid, has_error in zip(centroids, has_errors):
         # x > 0 good case, else bad case
         is_good = centroid[0] > 0
 
-        has_error = pattern_has_error(pattern, error_markers)
-
         if is_good:
             if not has_error:
                 results['good']['pass'] += 1
@@ -54,25 +396,111 @@ def validate_patterns(rule_name, patterns, error_markers):
     return results
 
 
+def manhattan_rectangles(points):
+    """
+    Split a Manhattan polygon (every edge horizontal or vertical) into rectangles, one
+    horizontal slab between consecutive vertex y coordinates at a time (even-odd rule).
+
+    Args:
+        points: (n, 2) polygon vertices.
+
+    Returns:
+        ndarray: (k, 4) rows of [xmin, ymin, xmax, ymax], or None if the polygon has an edge
+        that is neither horizontal nor vertical.
+    """
+    points = np.asarray(points, dtype=float)
+    following = np.concatenate((points[1:], points[:1]))
+    dx = following[:, 0] - points[:, 0]
+    dy = following[:, 1] - points[:, 1]
+    if np.any((dx != 0) & (dy != 0)):
+        return None
+
+    vertical = dy != 0
+    edge_x = points[vertical, 0]
+    edge_y0 = np.minimum(points[vertical, 1], following[vertical, 1])
+    edge_y1 = np.maximum(points[vertical, 1], following[vertical, 1])
+
+    rectangles = []
+    ys = np.unique(points[:, 1])
+    for y0, y1 in zip(ys[:-1], ys[1:]):
+        middle = 0.5 * (y0 + y1)
+        xs = np.sort(edge_x[(edge_y0 < middle) & (middle < edge_y1)])
+        for xa, xb in zip(xs[0::2], xs[1::2]):
+            if xa < xb:
+                rectangles.append((xa, y0, xb, y1))
+    return np.array(rectangles, dtype=float).reshape(-1, 4)
+
+
+def rectangles_overlap(rects1, rects2):
+    """
+    Check whether any rectangle of rects1 shares a positive area with any rectangle of rects2.
+    Both are (k, 4) arrays of [xmin, ymin, xmax, ymax] rows.
+    """
+    a = rects1[:, None, :]
+    b = rects2[None, :, :]
+    return bool(np.any((a[..., 0] < b[..., 2]) & (b[..., 0] < a[..., 2]) &
+                       (a[..., 1] < b[..., 3]) & (b[..., 1] < a[..., 3])))
+
+
 def polygons_overlap(poly1, poly2):
     """
     Check if two polygons overlap.
     Using bounding box for quick check, then precise check.
 
+    Polygons overlap when their intersection has a positive area: shapes that only share
+    an edge or a corner do not overlap. Rectangles are decided from their bounding boxes
+    and Manhattan polygons from their rectangle decomposition (see quick_overlap); only other
+    shapes go through the gdstk boolean engine, which has the same edge-touching behavior.
+
     Args:
         poly1, poly2: Polygon objects.
 
     Returns:
         bool: True if they overlap.
     """
+    decided = quick_overlap(poly1, poly2)
+    if decided is not None:
+        return decided
+    return boolean_overlap(poly1, poly2)
+
+
+def quick_overlap(poly1, poly2):
+    """
+    The checks of polygons_overlap that do not need the gdstk boolean engine.
+
+    Returns:
+        bool: True or False when decided from the bounding boxes, the rectangles or the Manhattan
+        decomposition of the polygons, None when only the boolean engine can tell.
+    """
+    if profiler.enabled:
+        profiler.count("overlap_tests")
     bbox1 = poly1.bounding_box()
     bbox2 = poly2.bounding_box()
 
     # Quick bbox overlap test
-    if (bbox1[1][0] < bbox2[0][0] or bbox2[1][0] < bbox1[0][0] or
-        bbox1[1][1] < bbox2[0][1] or bbox2[1][1] < bbox1[0][1]):
+    if (bbox1[1][0] <= bbox2[0][0] or bbox2[1][0] <= bbox1[0][0] or
+        bbox1[1][1] <= bbox2[0][1] or bbox2[1][1] <= bbox1[0][1]):
+        if profiler.enabled:
+            profiler.count("bbox_rejections")
         return False
 
+    points1 = poly1.points
+    points2 = poly2.points
+    if is_rectangle(points1) and is_rectangle(points2):
+        return True
+
+    rects1 = manhattan_rectangles(points1)
+    if rects1 is not None:
+        rects2 = manhattan_rectangles(points2)
+        if rects2 is not None:
+            return rectangles_overlap(rects1, rects2)
+    return None
+
+
+def boolean_overlap(poly1, poly2):
+    """Check with the gdstk boolean engine whether two polygons share a positive area."""
     # Returns list of polygons if overlapping
+    if profiler.enabled:
+        profiler.count("boolean_calls")
     intersection = gdstk.boolean(poly1, poly2, operation="and")
     return len(intersection) > 0
@@ -0,0 +1,124 @@
+"""
+Profiler module:
+Opt-in timing and counters for the --profile mode. Stage timers record wall and CPU time, and counters
+record hot-path geometry operations (polygons scanned, containment tests, bounding box rejections,
+gdstk.boolean calls...).
+
+Everything is off unless enable() is called. Hot paths check the module-level flag before counting,
+so a run without --profile only pays for that check:
+
+    if profiler.enabled:
+        profiler.count("boolean_calls")
+
+Timers and counters are per process. Worker processes hand theirs back with take() and the parent
+adds them with merge(). The per-file and per-cell timings of the analysis are collected in files by
+analysis_runner.run_analysis.
+"""
+
+import json
+import time
+
+enabled = False
+
+# Stages listed first in the profile, in run order. The analysis stages under "analysis" are summed
+# over the worker processes, so they can add up to more wall time than "analysis" itself.
+stages = ("svrf_parse", "analysis", "layout_load", "cell_index", "association", "marker_index", "validation", "reports")
+
+# name -> [wall seconds, cpu seconds]
+timers = {}
+
+# name -> count
+counters = {}
+
+# {'file', 'wall', 'cpu', 'load_wall', 'cached', 'cells': [{'cell', 'polygons', 'wall', 'cpu'}, ...]} per layout file
+files = []
+
+
+def enable(on=True):
+    """Turn profiling on (or off) and clear the recorded timers and counters."""
+    global enabled
+    enabled = on
+    reset()
+
+
+def reset():
+    timers.clear()
+    counters.clear()
+    files.clear()
+
+
+def count(name, n=1):
+    counters[name] = counters.get(name, 0) + n
+
+
+def add_time(name, wall, cpu):
+    timer = timers.setdefault(name, [0.0, 0.0])
+    timer[0] += wall
+    timer[1] += cpu
+
+
+class timed:
+    """
+    Context manager adding the wall and CPU time of its block to the timer name. Does nothing when profiling is off.
+
+        with profiler.timed("svrf_parse"):
+            rules = parse_svrf_rules(path)
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        if enabled:
+            self.wall = time.perf_counter()
+            self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        if enabled:
+            add_time(self.name, time.perf_counter() - self.wall, time.process_time() - self.cpu)
+        return False
+
+
+def take():
+    """Return the timers and counters recorded so far in this (worker) process and clear them."""
+    snapshot = {'timers': {name: list(t) for name, t in timers.items()}, 'counters': dict(counters)}
+    reset()
+    return snapshot
+
+
+def merge(snapshot):
+    """Add timers and counters returned by take() in another process."""
+    for name, (wall, cpu) in snapshot['timers'].items():
+        add_time(name, wall, cpu)
+    for name, n in snapshot['counters'].items():
+        count(name, n)
+
+
+def build_profile(stage_order=stages):
+    """
+    Profile of the run as written to the JSON profile file.
+
+    Args:
+        stage_order (tuple): Timer names listed first, in this order. The others follow sorted by name.
+
+    Returns:
+        dict: {'stages': [{'stage', 'wall', 'cpu'}, ...], 'counters': {...}, 'files': [...], 'cells': [...]},
+        the cells of all files in one list, each with its 'file'.
+    """
+    names = [name for name in stage_order if name in timers] + sorted(name for name in timers if name not in stage_order)
+    cells = []
+    for file_entry in files:
+        for cell_entry in file_entry['cells']:
+            cells.append(dict(cell_entry, file=file_entry['file']))
+    return {
+        'stages': [{'stage': name, 'wall': timers[name][0], 'cpu': timers[name][1]} for name in names],
+        'counters': dict(sorted(counters.items())),
+        'files': [{key: value for key, value in file_entry.items() if key != 'cells'} for file_entry in files],
+        'cells': cells,
+    }
+
+
+def write_profile(profile_path, profile):
+    with open(profile_path, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2)
@@ -1,242 +1,502 @@
 import os
+import csv
+import html
+import json
+import importlib.util
 from datetime import datetime
-import pandas as pd
 
+# Rows of the detailed table serialized per write of the HTML data block
+html_chunk_rows = 5000
 
-def generate_reports(summary_data, detailed_data, output_dir, report_type, report_name):
+# Rows per worksheet (header included) allowed by the xlsx format
+excel_max_rows = 1048576
+
+# Report formats accepted in report_type ("both" is html and excel)
+report_formats = ("html", "excel", "csv", "parquet", "feather")
+columnar_formats = ("parquet", "feather")
+
+# Rows per chunk (record batch) of the CSV and columnar exports
+columnar_chunk_rows = 65536
+
+# Slowest files and cells listed in the Timing section of the HTML report
+profile_top_rows = 10
+
+# Detailed columns written as integers by the columnar exports
+integer_columns = ("Good Patterns", "Bad Patterns", "Passed Good", "Failed Good", "Passed Bad", "Failed Bad")
+
+
+def build_detailed_data(all_results):
     """
-    Generate enhanced HTML and Excel reports for the SVRF layout analysis results.
+    Flatten the analysis results (see analysis_runner.merge_layout_results) into the detailed report rows,
+    one per rule, layout file and cell.
 
     Returns:
-        tuple: (html_report_path, excel_report_path)
+        list: [{'Rule Name': ..., 'Good Patterns': ..., ..., 'Fail Pattern Location': 'file / cell'}, ...]
     """
-    os.makedirs(output_dir, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    if report_name=="None":
-        html_report_path = os.path.join(output_dir, f"report_{timestamp}.html")
-        excel_report_path = os.path.join(output_dir, f"report_{timestamp}.xlsx")
-    else:
-        html_report_path = os.path.join(output_dir, f"{report_name}.html")
-        excel_report_path = os.path.join(output_dir, f"{report_name}.xlsx")
+    detailed_data = []
+    for rule_name, rule_info in all_results.items():
+        comment = rule_info['comment']
+        for layout_file, cell_results in rule_info['files'].items():
+            for cell_name, result in cell_results.items():
+                detailed_data.append({
+                    "Rule Name": rule_name,
+                    "Good Patterns": result['good']['pass'] + result['good']['fail'],
+                    "Bad Patterns": result['bad']['pass'] + result['bad']['fail'],
+                    "Passed Good": result['good']['pass'],
+                    "Failed Good": result['good']['fail'],
+                    "Passed Bad": result['bad']['pass'],
+                    "Failed Bad": result['bad']['fail'],
+                    "Rule Comment": comment,
+                    "Fail Pattern Location": f"{layout_file} / {cell_name}"
+                })
+    return detailed_data
 
 
-    # Generate HTML report
-    if report_type=="html" or report_type=="both":
-        with open(html_report_path, "w", encoding="utf-8") as f:
-            f.write("<html><head><title>SVRF Analysis Report</title>\n")
-
-            # CSS & JS
-            f.write("""
-            <link rel="stylesheet" href="https://cdn.datatables.net/1.13.6/css/jquery.dataTables.min.css">
-            <script src="https://code.jquery.com/jquery-3.6.0.min.js"></script>
-            <script src="https://cdn.datatables.net/1.13.6/js/jquery.dataTables.min.js"></script>
-            <script src="https://cdnjs.cloudflare.com/ajax/libs/jspdf/2.5.1/jspdf.umd.min.js"></script>
-            <script src="https://cdnjs.cloudflare.com/ajax/libs/jspdf-autotable/3.5.28/jspdf.plugin.autotable.min.js"></script>
-            <style>
-                body {
-                    font-family: Arial, sans-serif;
-                    margin: 20px;
-                    background-color: white;
-                    color: black;
-                }
-                body.dark-mode {
-                    background-color: #121212;
-                    color: #e0e0e0;
-                }
-                .dark-mode table {
-                    color: #e0e0e0;
-                    border-color: #555;
+def _json_for_script(value):
+    # Compact JSON that cannot close the surrounding <script> element
+    return json.dumps(value, separators=(",", ":")).replace("</", "<\\/")
+
+
+def _write_timing_section(f, profile, top_rows=profile_top_rows):
+    """Timing section of the HTML report: stage times, hot-path counters and the slowest files and cells."""
+    f.write("<h2>Timing</h2>\n")
+    f.write("<table>\n<tr><th>Stage</th><th>Wall (s)</th><th>CPU (s)</th></tr>\n")
+    for stage in profile['stages']:
+        f.write(f"<tr><td>{stage['stage']}</td><td>{stage['wall']:.3f}</td><td>{stage['cpu']:.3f}</td></tr>\n")
+    f.write("</table>\n")
+
+    if profile['counters']:
+        f.write("<table>\n<tr><th>Counter</th><th>Count</th></tr>\n")
+        for name, count in profile['counters'].items():
+            f.write(f"<tr><td>{name}</td><td>{count}</td></tr>\n")
+        f.write("</table>\n")
+
+    files = sorted((entry for entry in profile['files'] if not entry['cached']), key=lambda entry: entry['wall'], reverse=True)
+    if files:
+        f.write("<h3>Slowest Files</h3>\n<table>\n<tr><th>Layout File</th><th>Cells</th><th>Load (s)</th><th>Wall (s)</th><th>CPU (s)</th></tr>\n")
+        for entry in files[:top_rows]:
+            f.write(f"<tr><td>{html.escape(entry['file'])}</td><td>{entry['cell_count']}</td><td>{entry['load_wall']:.3f}</td>"
+                    f"<td>{entry['wall']:.3f}</td><td>{entry['cpu']:.3f}</td></tr>\n")
+        f.write("</table>\n")
+
+    cells = sorted(profile['cells'], key=lambda entry: entry['wall'], reverse=True)
+    if cells:
+        f.write("<h3>Slowest Cells</h3>\n<table>\n<tr><th>Layout File</th><th>Cell Name</th><th>Polygons</th><th>Wall (s)</th><th>CPU (s)</th></tr>\n")
+        for entry in cells[:top_rows]:
+            f.write(f"<tr><td>{html.escape(entry['file'])}</td><td>{html.escape(entry['cell'])}</td><td>{entry['polygons']}</td>"
+                    f"<td>{entry['wall']:.3f}</td><td>{entry['cpu']:.3f}</td></tr>\n")
+        f.write("</table>\n")
+
+
+def write_html_report(html_report_path, summary_data, detailed_data, chunk_rows=html_chunk_rows, profile=None):
+    """
+    Write the HTML report.
+
+    With a profile (see profiler.build_profile), a Timing section follows the summary.
+
+    The detailed rows are not written as a DOM table. They are streamed as JSON arrays into an
+    embedded data block, chunk_rows rows per write, and rendered by DataTables from that data with
+    deferred rendering and the Scroller extension, so only the visible rows are turned into DOM nodes.
+    Row selection is tracked on the data rows, so the PDF and CSV exports include selected rows
+    that are currently scrolled out of view.
+    """
+    with open(html_report_path, "w", encoding="utf-8", buffering=1024 * 1024) as f:
+        f.write("<html><head><title>SVRF Analysis Report</title>\n")
+
+        # CSS & JS
+        f.write("""
+        <link rel="stylesheet" href="https://cdn.datatables.net/1.13.6/css/jquery.dataTables.min.css">
+        <link rel="stylesheet" href="https://cdn.datatables.net/scroller/2.2.0/css/scroller.dataTables.min.css">
+        <script src="https://code.jquery.com/jquery-3.6.0.min.js"></script>
+        <script src="https://cdn.datatables.net/1.13.6/js/jquery.dataTables.min.js"></script>
+        <script src="https://cdn.datatables.net/scroller/2.2.0/js/dataTables.scroller.min.js"></script>
+        <script src="https://cdnjs.cloudflare.com/ajax/libs/jspdf/2.5.1/jspdf.umd.min.js"></script>
+        <script src="https://cdnjs.cloudflare.com/ajax/libs/jspdf-autotable/3.5.28/jspdf.plugin.autotable.min.js"></script>
+        <style>
+            body {
+                font-family: Arial, sans-serif;
+                margin: 20px;
+                background-color: white;
+                color: black;
+            }
+            body.dark-mode {
+                background-color: #121212;
+                color: #e0e0e0;
+            }
+            .dark-mode table {
+                color: #e0e0e0;
+                border-color: #555;
+            }
+            .dark-mode th {
+                background-color: #333;
+            }
+            table {
+                border-collapse: collapse;
+                width: 100%;
+                margin-bottom: 30px;
+            }
+            th, td {
+                border: 1px solid #ccc;
+                padding: 8px;
+                text-align: left;
+            }
+            th {
+                background-color: #f2f2f2;
+            }
+            button, label {
+                margin: 10px 5px;
+                padding: 8px 12px;
+            }
+        </style>
+        """)
+
+        f.write("</head><body>\n")
+        f.write("<h1>SVRF Layout Analysis Report</h1>\n")
+
+        # Summary
+        f.write("<h2>Summary Information</h2>\n")
+        f.write("<table>\n")
+        for key, value in summary_data.items():
+            f.write(f"<tr><th>{key}</th><td>{value}</td></tr>\n")
+        f.write("</table>\n")
+
+        if profile is not None:
+            _write_timing_section(f, profile)
+
+        # Controls
+        f.write("""
+        <h2>Detailed Analysis Results</h2>
+        <button id="exportBtn">Export Selected to PDF</button>
+        <button id="csvBtn">Export Selected to CSV</button>
+        <label><input type="checkbox" id="toggleDark"> Dark Mode</label>
+        """)
+
+        if not detailed_data:
+            f.write("<p>No detailed data available.</p>\n")
+            f.write("</body></html>\n")
+            return
+
+        # Detailed data block: one JSON array per row, written in chunks
+        headers = list(detailed_data[0].keys())
+        f.write('<table id="resultsTable" class="display"></table>\n')
+        f.write(f"<script>\nconst resultsColumns = {_json_for_script(headers)};\nconst resultsData = [\n")
+        for start in range(0, len(detailed_data), chunk_rows):
+            chunk = detailed_data[start:start + chunk_rows]
+            f.write(",\n".join(_json_for_script([row.get(header, '') for header in headers]) for row in chunk))
+            f.write(",\n" if start + chunk_rows < len(detailed_data) else "\n")
+        f.write("];\n</script>\n")
+
+        # JavaScript for interactivity
+        f.write("""
+        <script>
+        $(document).ready(function () {
+            // Indexes of the selected rows in resultsData
+            const selected = new Set();
+
+            const table = $('#resultsTable').DataTable({
+                data: resultsData,
+                columns: resultsColumns.map(function (title) { return { title: title }; }),
+                deferRender: true,
+                scrollY: '60vh',
+                scrollCollapse: true,
+                scroller: true,
+                createdRow: function (row, data, dataIndex) {
+                    $(row).toggleClass('selected', selected.has(dataIndex));
                 }
-                .dark-mode th {
-                    background-color: #333;
+            });
+
+            // Row selection
+            $('#resultsTable tbody').on('click', 'tr', function () {
+                const index = table.row(this).index();
+                if (index === undefined) {
+                    return;
                 }
-                table {
-                    border-collapse: collapse;
-                    width: 100%;
-                    margin-bottom: 30px;
+                if (selected.has(index)) {
+                    selected.delete(index);
+                } else {
+                    selected.add(index);
                 }
-                th, td {
-                    border: 1px solid #ccc;
-                    padding: 8px;
-                    text-align: left;
+                $(this).toggleClass('selected', selected.has(index));
+            });
+
+            function selectedRows() {
+                return Array.from(selected).sort(function (a, b) { return a - b; }).map(function (index) {
+                    return resultsData[index].map(String);
+                });
+            }
+
+            // PDF export
+            $('#exportBtn').click(function () {
+                const { jsPDF } = window.jspdf;
+                const doc = new jsPDF();
+                const rows = selectedRows();
+
+                if (rows.length === 0) {
+                    alert("No rows selected!");
+                    return;
                 }
-                th {
-                    background-color: #f2f2f2;
+
+                doc.autoTable({
+                    head: [resultsColumns],
+                    body: rows
+                });
+
+                doc.save('Selected_Results.pdf');
+            });
+
+            // CSV export
+            $('#csvBtn').click(function () {
+                const quote = function (text) { return '"' + text.replace(/"/g, '""') + '"'; };
+                const rows = selectedRows().map(function (row) { return row.map(quote).join(','); });
+
+                if (rows.length === 0) {
+                    alert("No rows selected!");
+                    return;
                 }
-                button, label {
-                    margin: 10px 5px;
-                    padding: 8px 12px;
+
+                const headers = resultsColumns.map(quote);
+                const csvContent = [headers.join(',')].concat(rows).join('\\n');
+                const blob = new Blob([csvContent], { type: 'text/csv;charset=utf-8;' });
+                const link = document.createElement("a");
+                link.href = URL.createObjectURL(blob);
+                link.download = "Selected_Results.csv";
+                link.click();
+            });
+
+            // Dark mode toggle
+            $('#toggleDark').change(function () {
+                $('body').toggleClass('dark-mode', this.checked);
+            });
+
+            // Failed filter, applied on the data so rows that are not rendered yet are filtered too
+            const failedGood = resultsColumns.indexOf('Failed Good');
+            const failedBad = resultsColumns.indexOf('Failed Bad');
+            $.fn.dataTable.ext.search.push(function (settings, searchData, dataIndex) {
+                if (!$('#filterFailed').is(':checked')) {
+                    return true;
                 }
-            </style>
-            """)
-
-            f.write("</head><body>\n")
-            f.write("<h1>SVRF Layout Analysis Report</h1>\n")
-
-            # Summary
-            f.write("<h2>Summary Information</h2>\n")
-            f.write("<table>\n")
-            for key, value in summary_data.items():
-                f.write(f"<tr><th>{key}</th><td>{value}</td></tr>\n")
-            f.write("</table>\n")
-
-            # Controls
-            f.write("""
-            <h2>Detailed Analysis Results</h2>
-            <button id="exportBtn">Export Selected to PDF</button>
-            <button id="csvBtn">Export Selected to CSV</button>
-            <label><input type="checkbox" id="toggleDark"> Dark Mode</label>
-            """)
-
-            # Detailed table
-            if detailed_data:
-                f.write('<table id="resultsTable">\n<thead><tr>')
-                headers = detailed_data[0].keys()
-                for header in headers:
-                    f.write(f"<th>{header}</th>")
-                f.write("</tr></thead>\n<tbody>\n")
-                for row in detailed_data:
-                    f.write("<tr>")
-                    for header in headers:
-                        f.write(f"<td>{row.get(header, '')}</td>")
-                    f.write("</tr>\n")
-                f.write("</tbody></table>\n")
-            else:
-                f.write("<p>No detailed data available.</p>\n")
-
-            # JavaScript for interactivity
-            f.write("""
-            <script>
-            $(document).ready(function () {
-                const table = $('#resultsTable').DataTable({
-                    paging: true,
-                    select: {
-                        style: 'multi'
-                    }
-                });
-        
-                // Row selection
-                $('#resultsTable tbody').on('click', 'tr', function () {
-                    $(this).toggleClass('selected');
-                });
-        
-                // PDF export
-                $('#exportBtn').click(function () {
-                    const { jsPDF } = window.jspdf;
-                    const doc = new jsPDF();
-                    const selectedRows = [];
-        
-                    $('#resultsTable tbody tr.selected').each(function () {
-                        const rowData = [];
-                        $(this).find('td').each(function () {
-                            rowData.push($(this).text());
-                        });
-                        selectedRows.push(rowData);
-                    });
-        
-                    if (selectedRows.length === 0) {
-                        alert("No rows selected!");
-                        return;
-                    }
-        
-                    const headers = [];
-                    $('#resultsTable thead th').each(function () {
-                        headers.push($(this).text());
-                    });
-        
-                    doc.autoTable({
-                        head: [headers],
-                        body: selectedRows
-                    });
-        
-                    doc.save('Selected_Results.pdf');
-                });
-        
-                // CSV export
-                $('#csvBtn').click(function () {
-                    const selectedRows = [];
-                    $('#resultsTable tbody tr.selected').each(function () {
-                        const rowData = [];
-                        $(this).find('td').each(function () {
-                            rowData.push('"' + $(this).text().replace(/"/g, '""') + '"');
-                        });
-                        selectedRows.push(rowData.join(','));
-                    });
-        
-                    if (selectedRows.length === 0) {
-                        alert("No rows selected!");
-                        return;
-                    }
-        
-                    const headers = [];
-                    $('#resultsTable thead th').each(function () {
-                        headers.push('"' + $(this).text() + '"');
-                    });
-        
-                    const csvContent = [headers.join(',')].concat(selectedRows).join('\\n');
-                    const blob = new Blob([csvContent], { type: 'text/csv;charset=utf-8;' });
-                    const link = document.createElement("a");
-                    link.href = URL.createObjectURL(blob);
-                    link.download = "Selected_Results.csv";
-                    link.click();
-                });
-        
-                // Dark mode toggle
-                $('#toggleDark').change(function () {
-                    $('body').toggleClass('dark-mode', this.checked);
-                });
-        
-                // Failed filter
-                $('#filterFailed').change(function () {
-                    if (this.checked) {
-                        table.rows().every(function () {
-                            const failedGood = parseInt($(this.node()).find('td:eq(5)').text() || 0);
-                            const failedBad = parseInt($(this.node()).find('td:eq(7)').text() || 0);
-                            if (failedGood === 0 && failedBad === 0) {
-                                $(this.node()).hide();
-                            } else {
-                                $(this.node()).show();
-                            }
-                        });
-                    } else {
-                        table.rows().every(function () {
-                            $(this.node()).show();
-                        });
-                    }
-                });
+                const row = resultsData[dataIndex];
+                return (parseInt(row[failedGood]) || 0) !== 0 || (parseInt(row[failedBad]) || 0) !== 0;
             });
-            </script>
-            """)
-            f.write("</body></html>\n")
+            $('#filterFailed').change(function () {
+                table.draw();
+            });
+        });
+        </script>
+        """)
+        f.write("</body></html>\n")
+
+
+def write_excel_report(excel_report_path, summary_data, detailed_data, max_rows=excel_max_rows):
+    """
+    Write the Excel report with xlsxwriter in constant_memory mode.
+
+    Rows are flushed to disk as they are written, so memory does not grow with the number of rows.
+    Detailed rows beyond the max_rows limit of a sheet continue on "Detailed Results 2", "Detailed Results 3", ...
+    each with its own header row.
+    """
+    # Imported here so runs without an Excel report do not load xlsxwriter
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(excel_report_path, {'constant_memory': True})
+    try:
+        header_format = workbook.add_format({'bold': True, 'border': 1})
+
+        summary_sheet = workbook.add_worksheet("Summary")
+        summary_sheet.write_row(0, 0, ["Metric", "Value"], header_format)
+        for row_number, (key, value) in enumerate(summary_data.items(), start=1):
+            summary_sheet.write_row(row_number, 0, [key, str(value) if isinstance(value, (list, tuple, dict)) else value])
+
+        if detailed_data:
+            headers = list(detailed_data[0].keys())
+            sheet = None
+            sheet_number = 0
+            row_number = max_rows
+            for row in detailed_data:
+                if row_number >= max_rows:
+                    sheet_number += 1
+                    sheet = workbook.add_worksheet("Detailed Results" if sheet_number == 1 else f"Detailed Results {sheet_number}")
+                    sheet.write_row(0, 0, headers, header_format)
+                    row_number = 1
+                sheet.write_row(row_number, 0, [row.get(header, '') for header in headers])
+                row_number += 1
+    finally:
+        workbook.close()
+
+
+def parse_report_types(report_type):
+    """
+    Parse a report type such as "both", "html" or "html,parquet" into the list of report formats.
+
+    Raises:
+        ValueError: For an unknown report format.
+    """
+    formats = []
+    for name in report_type.split(","):
+        name = name.strip().lower()
+        expanded = ["html", "excel"] if name == "both" else [name]
+        for report_format in expanded:
+            if report_format not in report_formats:
+                raise ValueError(f"Unknown report type '{name}'. Available values: both, {', '.join(report_formats)}")
+            if report_format not in formats:
+                formats.append(report_format)
+    return formats
+
+
+def pyarrow_available():
+    """True when pyarrow is installed, which the parquet and feather reports need."""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _columnar_chunks(detailed_data, chunk_rows):
+    """
+    Split the detailed rows in chunks of columns for the machine-readable exports.
+    "Fail Pattern Location" ("file / cell") is split into "Layout File" and "Cell Name".
+
+    Yields:
+        tuple: (column names, list of column value lists)
+    """
+    if not detailed_data:
+        return
+    headers = [h for h in detailed_data[0].keys() if h != "Fail Pattern Location"]
+    split_location = "Fail Pattern Location" in detailed_data[0]
+    names = headers + (["Layout File", "Cell Name"] if split_location else [])
+    for start in range(0, len(detailed_data), chunk_rows):
+        chunk = detailed_data[start:start + chunk_rows]
+        columns = [[row.get(header, '') for row in chunk] for header in headers]
+        if split_location:
+            locations = [row.get("Fail Pattern Location", '').rpartition(" / ") for row in chunk]
+            columns.append([layout_file for layout_file, _, _ in locations])
+            columns.append([cell_name for _, _, cell_name in locations])
+        yield names, columns
+
+
+def write_csv_report(csv_report_path, detailed_data, chunk_rows=columnar_chunk_rows):
+    """
+    Write the detailed rows as CSV, chunk_rows rows per write.
+    The location is split into "Layout File" and "Cell Name" columns.
+    """
+    with open(csv_report_path, "w", encoding="utf-8", newline="", buffering=1024 * 1024) as f:
+        writer = csv.writer(f)
+        for number, (names, columns) in enumerate(_columnar_chunks(detailed_data, chunk_rows)):
+            if number == 0:
+                writer.writerow(names)
+            writer.writerows(zip(*columns))
+
+
+def write_columnar_report(report_path, summary_data, detailed_data, report_format="parquet", chunk_rows=columnar_chunk_rows):
+    """
+    Write the detailed rows as a Parquet or Feather (Arrow IPC) file with pyarrow, one record batch
+    of chunk_rows rows at a time.
+
+    Pass/fail counts are int32 columns. Rule name, comment, layout file and cell name are
+    dictionary-encoded; the dictionaries grow from batch to batch and are written as deltas.
+    The summary is stored in the schema metadata.
+
+    Raises:
+        ImportError: When pyarrow is not installed.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc as ipc
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(f"pyarrow is required for {report_format} reports: pip install pyarrow") from e
+
+    writer = None
+    schema = None
+    dictionaries = {}
+    try:
+        for names, columns in _columnar_chunks(detailed_data, chunk_rows):
+            if schema is None:
+                fields = []
+                for name in names:
+                    if name in integer_columns:
+                        fields.append(pa.field(name, pa.int32()))
+                    else:
+                        fields.append(pa.field(name, pa.dictionary(pa.int32(), pa.string())))
+                metadata = {str(key): str(value) for key, value in summary_data.items()}
+                schema = pa.schema(fields, metadata=metadata)
+                dictionaries = {name: {} for name in names if name not in integer_columns}
+                if report_format == "parquet":
+                    writer = pq.ParquetWriter(report_path, schema)
+                else:
+                    writer = ipc.new_file(report_path, schema, options=ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+
+            arrays = []
+            for name, values in zip(names, columns):
+                if name in integer_columns:
+                    arrays.append(pa.array(values, type=pa.int32()))
+                else:
+                    # Codes into a dictionary shared by all batches
+                    codes = dictionaries[name]
+                    indices = [codes.setdefault(str(value), len(codes)) for value in values]
+                    arrays.append(pa.DictionaryArray.from_arrays(pa.array(indices, type=pa.int32()), pa.array(list(codes), type=pa.string())))
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def generate_reports(summary_data, detailed_data, output_dir, report_type, report_name, profile=None):
+    """
+    Generate enhanced HTML and Excel reports for the SVRF layout analysis results,
+    and the machine-readable CSV, Parquet and Feather exports of the detailed rows.
+
+    report_type is one of html, excel, both, csv, parquet, feather, or a comma separated list of them.
+    profile (see profiler.build_profile) adds a Timing section to the HTML report.
+
+    Returns:
+        tuple: (html_report_path, excel_report_path)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if report_name=="None":
+        report_base = os.path.join(output_dir, f"report_{timestamp}")
     else:
-        pass
+        report_base = os.path.join(output_dir, report_name)
+    html_report_path = f"{report_base}.html"
+    excel_report_path = f"{report_base}.xlsx"
+
+    try:
+        formats = parse_report_types(report_type)
+    except ValueError:
+        formats = []
+
+    # Generate HTML report
+    if "html" in formats:
+        write_html_report(html_report_path, summary_data, detailed_data, profile=profile)
 
         
 
     print(f"\nReports generated:\n")
 
-    if report_type == "html" or report_type == "both":
+    if "html" in formats:
         print(f"- HTML report: {html_report_path}\n")
     else:
         pass
 
     # Generate Excel report
-    if report_type=="excel" or report_type=="both":
-        with pd.ExcelWriter(excel_report_path) as writer:
-            df_summary = pd.DataFrame(list(summary_data.items()), columns=["Metric", "Value"])
-            df_summary.to_excel(writer, sheet_name="Summary", index=False)
-
-            if detailed_data:
-                df_details = pd.DataFrame(detailed_data)
-                df_details.to_excel(writer, sheet_name="Detailed Results", index=False)
+    if "excel" in formats:
+        write_excel_report(excel_report_path, summary_data, detailed_data)
 
         print(f"- Excel report: {excel_report_path}\n")
     else:
         pass
 
-    if report_type not in ("html", "excel", "both"):
+    # Generate machine-readable exports
+    if "csv" in formats:
+        write_csv_report(f"{report_base}.csv", detailed_data)
+        print(f"- CSV export: {report_base}.csv\n")
+
+    for report_format in columnar_formats:
+        if report_format in formats:
+            write_columnar_report(f"{report_base}.{report_format}", summary_data, detailed_data, report_format)
+            print(f"- {report_format.capitalize()} export: {report_base}.{report_format}\n")
+
+    if not formats:
         print("No reports generated")
-        print("Report type should be 'html', 'excel', or 'both'.")
+        print(f"Report type should be 'both' or a comma separated list of {', '.join(repr(f) for f in report_formats)}.")
     else:
         pass
 
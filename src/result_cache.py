@@ -0,0 +1,162 @@
+"""
+Result Cache module:
+On-disk cache of per-file validation results. Entries are keyed by the content fingerprint of the layout file,
+the parsed rules, the layer map and the tool version, so unchanged layouts are served from the cache
+and only new or modified ones are analyzed.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+from src import __version__
+
+# Bump when the layout of the cache entries changes
+CACHE_FORMAT = 2
+
+
+def write_json_atomic(path, data):
+    # Write next to the target then rename, so a concurrent reader never sees a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def file_fingerprint(path, chunk_size=1 << 20):
+    """
+    Content fingerprint (hex digest) of a file.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def parse_size(text):
+    """
+    Parse a size such as "500M", "2G", "64k" or "1048576" into bytes.
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([kKmMgGtT]?)[bB]?\s*", text)
+    if not match:
+        raise ValueError(f"Invalid size '{text}'. Expected a number with an optional K, M, G or T suffix")
+    number, unit = match.groups()
+    return int(float(number) * 1024 ** " KMGT".index(unit.upper() or " "))
+
+
+class ResultCache:
+    """
+    Per-file validation results stored as one JSON file per (layout content, run configuration).
+
+    Layout fingerprints are memoized by path, size and modification time, so unchanged files are
+    not hashed again on every run.
+    """
+
+    def __init__(self, cache_dir, rules, layer_map):
+        self.cache_dir = cache_dir
+        self.results_dir = os.path.join(cache_dir, "results")
+        os.makedirs(self.results_dir, exist_ok=True)
+
+        run_config = {
+            'format': CACHE_FORMAT,
+            'version': __version__,
+            'rules': rules,
+            'layer_map': sorted((role, list(key)) for role, key in layer_map.items()),
+        }
+        self.run_key = hashlib.blake2b(json.dumps(run_config, sort_keys=True).encode(), digest_size=20).hexdigest()
+
+        self.fingerprints_path = os.path.join(cache_dir, "fingerprints.json")
+        try:
+            with open(self.fingerprints_path, "r", encoding="utf-8") as f:
+                self.fingerprints = json.load(f)
+        except (OSError, ValueError):
+            self.fingerprints = {}
+        self.hits = 0
+        self.misses = 0
+
+    def fingerprint(self, layout_path):
+        path = os.path.realpath(layout_path)
+        st = os.stat(path)
+        stamp = [st.st_size, st.st_mtime_ns]
+        known = self.fingerprints.get(path)
+        if known is not None and known[:2] == stamp:
+            return known[2]
+        digest = file_fingerprint(path)
+        self.fingerprints[path] = stamp + [digest]
+        return digest
+
+    def _entry_path(self, layout_path):
+        key = hashlib.blake2b(f"{self.run_key}:{self.fingerprint(layout_path)}".encode(), digest_size=20).hexdigest()
+        return os.path.join(self.results_dir, f"{key}.json")
+
+    def get(self, layout_path):
+        """
+        Return (layout_results, file_stats) of a layout file as analyze_layout would, or None on a miss.
+        """
+        entry_path = self._entry_path(layout_path)
+        try:
+            with open(entry_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        # Refresh the modification time so pruning drops the least recently used entries first
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        self.hits += 1
+        layout_results = [(cell_name, cell_results) for cell_name, cell_results in entry['cells']]
+        file_stats = {'load_time': 0.0, 'cells': len(layout_results), 'reused_cells': 0, 'ambiguities': entry['ambiguities']}
+        return layout_results, file_stats
+
+    def put(self, layout_path, layout_results, file_stats):
+        entry = {
+            'layout': os.path.basename(layout_path),
+            'cells': [[cell_name, cell_results] for cell_name, cell_results in layout_results],
+            'ambiguities': file_stats['ambiguities'],
+        }
+        write_json_atomic(self._entry_path(layout_path), entry)
+
+    def save(self):
+        """Persist the fingerprint memo."""
+        write_json_atomic(self.fingerprints_path, self.fingerprints)
+
+
+def prune_cache(cache_dir, max_bytes):
+    """
+    Delete the least recently used result entries until the cache holds at most max_bytes.
+
+    Returns:
+        tuple: (number of entries removed, bytes remaining)
+    """
+    results_dir = os.path.join(cache_dir, "results")
+    if not os.path.isdir(results_dir):
+        return 0, 0
+
+    entries = []
+    for name in os.listdir(results_dir):
+        path = os.path.join(results_dir, name)
+        if os.path.isfile(path):
+            st = os.stat(path)
+            entries.append((st.st_mtime_ns, st.st_size, path))
+    entries.sort()
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        os.remove(path)
+        total -= size
+        removed += 1
+    return removed, total
@@ -0,0 +1,246 @@
+"""
+Sharding module:
+Split one analysis over N independent jobs (e.g. a cluster job array) and merge their results afterwards.
+
+Every shard lists the same layout directory and picks its part deterministically, without talking to the
+other shards: whole layout files (balanced by file size), or the cells of every file (by a stable hash of
+the file and cell names). Each shard writes a compact partial result file, and merge_partials combines any
+number of them into the rule -> file -> cell results of a single run, without reading any layout file.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+
+from src import __version__
+from src.analysis_runner import merge_layout_results
+
+# Bump when the layout of the partial result files changes
+PARTIAL_FORMAT = 1
+
+# Validation result counters in the order they are stored in partial result files
+_result_counts = (('good', 'pass'), ('good', 'fail'), ('bad', 'pass'), ('bad', 'fail'))
+
+
+def parse_shard(text):
+    """
+    Parse a shard option such as "2/8" (shard 2 of 8, shards numbered from 1).
+
+    Returns:
+        tuple: (shard, shards)
+
+    Raises:
+        ValueError: For a malformed option or a shard outside 1..shards.
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", text)
+    if not match:
+        raise ValueError(f"Invalid shard '{text}'. Expected i/N, e.g. 1/4")
+    shard, shards = int(match.group(1)), int(match.group(2))
+    if not 1 <= shard <= shards:
+        raise ValueError(f"Invalid shard '{text}'. The shard number must be between 1 and {shards}")
+    return shard, shards
+
+
+def stable_hash(text):
+    """Hash of a string that is the same in every process and on every host (unlike hash())."""
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "big")
+
+
+def assign_shards(layout_dir, layouts, shards):
+    """
+    Assign every layout file to a shard, balancing the total file size of the shards.
+
+    Files are taken largest first and each goes to the shard with the smallest total so far
+    (longest-processing-time scheduling). Files of equal size are ordered by the stable hash of
+    their name, so the assignment does not depend on the directory listing order.
+
+    Returns:
+        dict: layout_file -> shard (1..shards)
+    """
+    sizes = {f: os.path.getsize(os.path.join(layout_dir, f)) for f in layouts}
+    loads = [0] * shards
+    assignment = {}
+    for layout_file in sorted(layouts, key=lambda f: (-sizes[f], stable_hash(f), f)):
+        target = min(range(shards), key=lambda s: (loads[s], s))
+        # Empty files still cost a load
+        loads[target] += max(sizes[layout_file], 1)
+        assignment[layout_file] = target + 1
+    return assignment
+
+
+def shard_layouts(layout_dir, layouts, shard, shards):
+    """The layout files of one shard (see assign_shards), in their original order."""
+    assignment = assign_shards(layout_dir, layouts, shards)
+    return [f for f in layouts if assignment[f] == shard]
+
+
+class CellShard:
+    """
+    Cell predicate (layout_file, cell_name) -> bool of one shard, for analysis_runner.run_analysis.
+
+    A cell belongs to shard stable_hash("layout_file/cell_name") % shards + 1. Being a plain class
+    rather than a closure, it can be sent to worker processes.
+    """
+
+    def __init__(self, shard, shards):
+        self.shard = shard
+        self.shards = shards
+
+    def __call__(self, layout_file, cell_name):
+        return stable_hash(f"{layout_file}/{cell_name}") % self.shards + 1 == self.shard
+
+
+def partial_path(output_dir, report_name, shard, shards):
+    """Path of the partial result file of a shard, named after the reports of the run."""
+    base = "partial" if report_name == "None" else report_name
+    return os.path.join(output_dir, f"{base}_shard_{shard}_of_{shards}.json.gz")
+
+
+def _pack_results(cell_results, rules):
+    # {rule_name: validation_result} -> [[good pass, good fail, bad pass, bad fail], ...] in rule order
+    if cell_results is None:
+        return None
+    return [[cell_results[rule['check name']][kind][outcome] for kind, outcome in _result_counts] for rule in rules]
+
+
+def _unpack_results(packed, rules):
+    if packed is None:
+        return None
+    cell_results = {}
+    for rule, counts in zip(rules, packed):
+        result = {'good': {}, 'bad': {}}
+        for (kind, outcome), n in zip(_result_counts, counts):
+            result[kind][outcome] = n
+        cell_results[rule['check name']] = result
+    return cell_results
+
+
+def write_partial(path, run, rules, layer_map, file_results):
+    """
+    Write the results of a shard as gzip compressed JSON.
+
+    Args:
+        path (str): Partial result file, see partial_path.
+        run (dict): Description of the run: {'shard', 'shards', 'shard_by', 'svrf_file', 'layouts' (every
+            layout file of the run, in listing order), 'settings' (run settings of the report summary),
+            'cache_dir', 'cache_hits' and 'cache_misses' (None without cache), 'peak_memory' (MB or None)}.
+        rules (list): Analyzed rules.
+        layer_map (dict): Layer map of the run.
+        file_results (dict): layout_file -> (layout_results, file_stats) of the files of the shard,
+            as filled by analysis_runner.run_analysis.
+    """
+    partial = dict(run, **{
+        'format': PARTIAL_FORMAT,
+        'version': __version__,
+        'rules': rules,
+        'layer_map': sorted((role, list(key)) for role, key in layer_map.items()),
+        'files': [
+            {
+                'file': layout_file,
+                'load_time': file_stats['load_time'],
+                'reused_cells': file_stats['reused_cells'],
+                'ambiguities': file_stats['ambiguities'],
+                'cells': [[cell_name, _pack_results(cell_results, rules)] for cell_name, cell_results in layout_results],
+            }
+            for layout_file, (layout_results, file_stats) in file_results.items()
+        ],
+    })
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(partial, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def read_partial(path):
+    """
+    Read a partial result file written by write_partial.
+
+    Raises:
+        ValueError: If the file is not a partial result file of this format.
+    """
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            partial = json.load(f)
+    except (OSError, EOFError, ValueError) as e:
+        raise ValueError(f"{path} is not a partial result file: {e}")
+    if not isinstance(partial, dict) or partial.get('format') != PARTIAL_FORMAT:
+        raise ValueError(f"{path} is not a partial result file of format {PARTIAL_FORMAT}")
+    return partial
+
+
+def merge_partials(partials):
+    """
+    Combine the partial results of all the shards of a run.
+
+    The shards must come from the same run: same tool version, rules, layer map, layout files and number
+    of shards, each shard exactly once. Files and cells are merged in the order of an unsharded run, so
+    the reports are the same as those of a single job.
+
+    Args:
+        partials (list): Partial results as returned by read_partial, in any order.
+
+    Returns:
+        tuple: (all_results, run_stats, run) with all_results as in analysis_runner.merge_layout_results,
+        run_stats as the stats of analysis_runner.run_analysis (plus 'peak_memory', the largest of the
+        shards, and 'cache_hits' / 'cache_misses' when every shard used the cache), and run the
+        description of the run written by the first shard (see write_partial).
+
+    Raises:
+        ValueError: If the partials do not make up one complete run.
+    """
+    if not partials:
+        raise ValueError("No partial results to merge")
+    run = partials[0]
+    for key in ('version', 'rules', 'layer_map', 'svrf_file', 'layouts', 'shards', 'shard_by'):
+        for partial in partials[1:]:
+            if partial[key] != run[key]:
+                raise ValueError(f"Partial results of different runs ({key} differs between shards "
+                                 f"{run['shard']} and {partial['shard']})")
+    seen = sorted(partial['shard'] for partial in partials)
+    duplicates = sorted({shard for shard in seen if seen.count(shard) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate partial results of shard {', '.join(map(str, duplicates))}")
+    missing = [shard for shard in range(1, run['shards'] + 1) if shard not in seen]
+    if missing:
+        raise ValueError(f"Missing partial results of shard {', '.join(map(str, missing))} of {run['shards']}")
+
+    rules = run['rules']
+    per_file = {}
+    for partial in sorted(partials, key=lambda p: p['shard']):
+        for file_entry in partial['files']:
+            per_file.setdefault(file_entry['file'], []).append(file_entry)
+
+    run_stats = {'load_time': 0.0, 'cells': 0, 'reused_cells': 0, 'ambiguities': []}
+    all_results = {}
+    for layout_file in run['layouts']:
+        entries = per_file.get(layout_file)
+        if not entries:
+            raise ValueError(f"No shard has the results of {layout_file}")
+        if run['shard_by'] == "file" and len(entries) > 1:
+            raise ValueError(f"Several shards have the results of {layout_file}")
+
+        # With cell shards every shard lists all the cells of the file, with results for its own cells only
+        cells = entries[0]['cells']
+        layout_results = []
+        for position, (cell_name, _) in enumerate(cells):
+            packed = next((entry['cells'][position][1] for entry in entries if entry['cells'][position][1] is not None), None)
+            layout_results.append((cell_name, _unpack_results(packed, rules)))
+        merge_layout_results(all_results, rules, layout_file, layout_results)
+
+        cell_order = {cell_name: position for position, (cell_name, _) in enumerate(cells)}
+        ambiguities = [a for entry in entries for a in entry['ambiguities']]
+        ambiguities.sort(key=lambda a: cell_order.get(a['cell'], len(cells)))
+        run_stats['ambiguities'] += [dict(a, file=layout_file) for a in ambiguities]
+        run_stats['load_time'] += sum(entry['load_time'] for entry in entries)
+        run_stats['reused_cells'] += sum(entry['reused_cells'] for entry in entries)
+        run_stats['cells'] += len(cells)
+
+    memory = [partial['peak_memory'] for partial in partials if partial.get('peak_memory') is not None]
+    run_stats['peak_memory'] = max(memory) if memory else None
+    if all(partial['cache_dir'] for partial in partials):
+        run_stats['cache_hits'] = sum(partial['cache_hits'] for partial in partials)
+        run_stats['cache_misses'] = sum(partial['cache_misses'] for partial in partials)
+    return all_results, run_stats, run
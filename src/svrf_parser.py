@@ -1,13 +1,215 @@
+import os
 import re
+import json
+import fnmatch
+import hashlib
 
-def parse_svrf_rules(file_path):
+from src.result_cache import file_fingerprint, write_json_atomic
+
+# Bump when the layout of the parsed deck cache changes
+DECK_CACHE_FORMAT = 2
+
+# Lines without any of these characters cannot open, close or comment anything
+_special_chars = re.compile(r'[{}"/*]')
+
+# Tokens of a code line: strings, comment markers, braces and words
+_tokens = re.compile(r'"[^"]*"?|//|/\*|\*/|[{}]|[^\s{}"/*]+|[/*]')
+
+_include = re.compile(r'^\s*INCLUDE\s+(?:"([^"]+)"|(\S+))', re.IGNORECASE)
+
+
+def _resolve_include(name, including_file):
+    """
+    Path of an INCLUDE target. Environment variables are expanded, and relative paths are looked up
+    next to the including file first, then in the current directory.
+    """
+    name = os.path.expanduser(os.path.expandvars(name))
+    if os.path.isabs(name):
+        return name
+    beside = os.path.join(os.path.dirname(including_file), name)
+    if os.path.exists(beside) or not os.path.exists(name):
+        return beside
+    return name
+
+
+def iter_svrf_rules(file_path, included_files=None, includes=None):
+    """
+    Tokenize an SVRF file line by line and yield its rules as soon as each rule block is closed.
+
+    INCLUDE statements outside rule blocks are followed, in place, relative to the including file.
+    Brace depth is tracked so braces nested in a rule body do not end the rule; braces inside
+    strings, @ comment lines, // line comments and /* */ block comments are ignored.
+    Only rules starting with @ comment lines are yielded, their consecutive @ lines combined
+    into a single string separated by a single space (see parse_svrf_rules).
+
+    Args:
+        file_path (str): Path to the SVRF file.
+        included_files (list): Optional list to which the path of every file read is appended,
+            the top-level file first.
+        includes (list): Optional list to which [index of the including file, INCLUDE argument as
+            written] is appended for every file read after the top-level one, in the same order.
+
+    Yields:
+        dict: {'check name': ..., 'comment': ...}
+    """
+    yield from _iter_file_rules(file_path, included_files, [], [], includes)
+
+
+def _iter_file_rules(file_path, included_files, include_stack, files, includes):
+    real_path = os.path.realpath(file_path)
+    if real_path in include_stack:
+        raise ValueError(f"Recursive INCLUDE of {file_path}")
+    if included_files is not None:
+        included_files.append(file_path)
+    file_index = len(files)
+    files.append(file_path)
+    include_stack.append(real_path)
+
+    depth = 0
+    name = None           # name of the open rule block
+    pending_name = None   # last word seen outside a rule block
+    comment_lines = []
+    in_comments = False   # still in the leading @ lines of the open rule
+    in_block_comment = False
+
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        for line_number, line in enumerate(f, start=1):
+            stripped = line.strip()
+
+            if depth > 0 and not in_block_comment:
+                if stripped.startswith('@'):
+                    if in_comments:
+                        comment_lines.append(stripped[1:].strip())  # Remove '@' and extra spaces
+                    continue
+                if in_comments:
+                    if stripped.startswith('//'):
+                        continue
+                    if stripped or comment_lines:
+                        in_comments = False
+                if not _special_chars.search(line):
+                    continue
+            elif depth == 0 and not in_block_comment:
+                include = _include.match(line)
+                if include:
+                    argument = include.group(1) or include.group(2)
+                    target = _resolve_include(argument, file_path)
+                    if not os.path.exists(target):
+                        raise FileNotFoundError(f"INCLUDE file not found: {target} ({file_path}, line {line_number})")
+                    if includes is not None:
+                        includes.append([file_index, argument])
+                    yield from _iter_file_rules(target, included_files, include_stack, files, includes)
+                    pending_name = None
+                    continue
+
+            for match in _tokens.finditer(line):
+                token = match.group()
+                if in_block_comment:
+                    if token == '*/':
+                        in_block_comment = False
+                    continue
+                if token == '//':
+                    break
+                if token == '/*':
+                    in_block_comment = True
+                elif token == '{':
+                    depth += 1
+                    if depth == 1:
+                        name, pending_name = pending_name, None
+                        comment_lines = []
+                        in_comments = True
+                        # The comment may start on the line of the opening brace
+                        rest = line[match.end():].strip()
+                        if rest.startswith('@'):
+                            comment_lines.append(rest[1:].strip())
+                            break
+                        if rest and not rest.startswith('//'):
+                            in_comments = False
+                elif token == '}':
+                    if depth == 0:
+                        continue
+                    depth -= 1
+                    if depth == 0:
+                        if name and comment_lines:
+                            yield {
+                                'check name': name,
+                                'comment': ' '.join(comment_lines)
+                            }
+                        name = None
+                        in_comments = False
+                elif depth == 0:
+                    pending_name = token
+
+    include_stack.pop()
+
+
+def deck_fingerprint(file_path):
+    """
+    [size, modification time, content hash] of a deck file.
+    """
+    st = os.stat(file_path)
+    return [st.st_size, st.st_mtime_ns, file_fingerprint(file_path)]
+
+
+def _deck_cache_path(cache_dir, file_path):
+    key = hashlib.blake2b(os.path.realpath(file_path).encode(), digest_size=20).hexdigest()
+    return os.path.join(cache_dir, "decks", f"{key}.json")
+
+
+def _load_cached_deck(cache_path, file_path):
+    """Cache entry of a deck if none of its files changed and its INCLUDEs still resolve to them, otherwise None."""
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if entry.get('format') != DECK_CACHE_FORMAT:
+        return None
+
+    # An INCLUDE target depends on the environment variables, the home directory and the current
+    # directory as well as on the deck: resolve them again, in the order they were read
+    resolved = [file_path]
+    for (parent, argument), file_entry in zip(entry['includes'], entry['files'][1:]):
+        target = _resolve_include(argument, resolved[parent])
+        if os.path.realpath(target) != file_entry[0]:
+            return None
+        resolved.append(target)
+
+    touched = False
+    for file_entry in entry['files']:
+        path, size, mtime_ns, digest = file_entry
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if [st.st_size, st.st_mtime_ns] == [size, mtime_ns]:
+            continue
+        # Touched but possibly unchanged: compare the content
+        fingerprint = deck_fingerprint(path)
+        if fingerprint[2] != digest:
+            return None
+        file_entry[1:] = fingerprint
+        touched = True
+
+    if touched:
+        # Remember the new modification times so the content is not hashed again
+        write_json_atomic(cache_path, entry)
+    return entry
+
+
+def parse_svrf_rules(file_path, cache_dir=None, included_files=None):
     """
     Parses an SVRF file to extract rule names and their comments.
 
-    Consecutive comment lines (@) at each rule block are combined into a single string separated by a single space
+    Consecutive comment lines (@) at each rule block are combined into a single string separated by a single space.
+    INCLUDE statements are followed, see iter_svrf_rules.
 
     Args:
         file_path (str): Path to the source file.
+        cache_dir (str): Optional directory of the parsed deck cache. The rules are stored along with the
+            size, modification time and content hash of every file of the deck, and are reused as long as
+            none of those files changed and every INCLUDE still resolves to the same file.
+        included_files (list): Optional list to which the path of every file of the deck is appended,
+            the top-level file first (real paths when served from the cache), see iter_svrf_rules.
 
     Returns:
         List[dict]: A list of dictionaries with 'check name' and 'comment' keys.
@@ -30,30 +232,66 @@ def parse_svrf_rules(file_path):
             ]
 
     """
-    with open(file_path, 'r') as f:
-        text = f.read()
+    if cache_dir is None:
+        return list(iter_svrf_rules(file_path, included_files))
 
-    # Match rule blocks: identifier followed by { ... }
-    blocks = re.findall(r'([A-Za-z0-9_.]+)\s*\{([^}]*)\}', text, re.DOTALL)
+    cache_path = _deck_cache_path(cache_dir, file_path)
+    entry = _load_cached_deck(cache_path, file_path)
+    if entry is not None:
+        if included_files is not None:
+            included_files.extend(file_entry[0] for file_entry in entry['files'])
+        return entry['rules']
 
-    rules = []
+    deck_files = []
+    includes = []
+    rules = list(iter_svrf_rules(file_path, deck_files, includes))
+    if included_files is not None:
+        included_files.extend(deck_files)
 
-    for name, content in blocks:
-        lines = content.strip().splitlines()
-        comment_lines = []
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    entry = {
+        'format': DECK_CACHE_FORMAT,
+        'files': [[os.path.realpath(path)] + deck_fingerprint(path) for path in deck_files],
+        'includes': includes,
+        'rules': rules,
+    }
+    write_json_atomic(cache_path, entry)
+    return rules
 
-        for line in lines:
-            stripped = line.strip()
-            if stripped.startswith('@'):
-                comment_lines.append(stripped[1:].strip())  # Remove '@' and extra spaces
-            else:
-                break
-
-        if comment_lines:
-            comment = ' '.join(comment_lines)
-            rules.append({
-                'check name': name,
-                'comment': comment
-            })
 
-    return rules
+def read_rule_patterns(file_path):
+    """
+    Read rule selection patterns from a file, one per line. Blank lines and lines starting with # are ignored.
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+
+
+def compile_rule_patterns(patterns):
+    """
+    Compile rule selection patterns into a predicate on check names.
+
+    A pattern starting with "re:" is a regular expression searched in the check name,
+    any other pattern is a glob matched against the whole check name (e.g. "M.*", "L.S.?").
+
+    Raises:
+        ValueError: For an invalid regular expression.
+    """
+    compiled = []
+    for pattern in patterns:
+        if pattern.startswith("re:"):
+            try:
+                compiled.append(re.compile(pattern[3:]).search)
+            except re.error as e:
+                raise ValueError(f"Invalid rule pattern '{pattern}': {e}")
+        else:
+            compiled.append(re.compile(fnmatch.translate(pattern)).match)
+    return lambda name: any(match(name) for match in compiled)
+
+
+def select_rules(rules, patterns):
+    """
+    Keep the rules whose check name matches any of the patterns (see compile_rule_patterns), in deck order.
+    """
+    matches = compile_rule_patterns(patterns)
+    return [rule for rule in rules if matches(rule['check name'])]
@@ -1,3 +1,6 @@
+import math
+import os
+import random
 import gdstk
 
 def create_test_layout_cell():
@@ -83,3 +86,104 @@ def create_test_layout_cell():
     # lib.write_gds("test.gds")
 
     # print("GDSII file 'test.gds' created successfully.")
+
+
+def _pattern_polygon(cx, cy, side, vertices, layer, datatype=0):
+    # Square of the fixture for 4 vertices, otherwise a regular polygon inscribed in that square
+    if vertices <= 4:
+        return gdstk.rectangle((cx - side / 2, cy - side / 2), (cx + side / 2, cy + side / 2), layer=layer, datatype=datatype)
+    points = [(cx + side / 2 * math.cos(2 * math.pi * k / vertices), cy + side / 2 * math.sin(2 * math.pi * k / vertices))
+              for k in range(vertices)]
+    return gdstk.Polygon(points, layer=layer, datatype=datatype)
+
+
+def create_synthetic_layout_cell(name="SYNTHETIC", n_groups=1, patterns_per_group=4, markers_per_pattern=1,
+                                 polygon_vertices=4, noise_polygons=0, rule_names=None, seed=0):
+    """
+    Parametric version of create_test_layout_cell for scaling tests and benchmarks.
+
+    Each rule group is a row laid out like the test cell: patterns_per_group patterns (layer 100 design
+    shape, 255.0 pattern marker and 0.0 error location) centered on x = 0, so half of them are good (x > 0)
+    and half bad, a 255.1 group polygon around them and a 22.22 rule name label. Every other pattern
+    (the first, third, ... from the left) gets markers_per_pattern result markers on 0.1 inside it.
+
+    Args:
+        name (str): Cell name.
+        n_groups (int): Rule groups (rows) in the cell.
+        patterns_per_group (int): Patterns in each group.
+        markers_per_pattern (int): Result markers on each pattern with a result.
+        polygon_vertices (int): Vertices of the pattern shapes. 4 gives the squares of the test cell,
+            more gives regular polygons that do not take the rectangle fast paths.
+        noise_polygons (int): Random rectangles on the background design layer 100, outside the analysis layers.
+        rule_names (list): Rule names of the groups, used in turn. Defaults to RULE_0, RULE_1, ...
+        seed (int): Seed of the background noise.
+
+    Returns:
+        gdstk.Cell
+    """
+    cell = gdstk.Cell(name)
+    pattern_side = 1
+    error_side = 0.5
+    pitch_x = 4
+    pitch_y = 4
+    half_width = pitch_x * (patterns_per_group + 1) / 2
+
+    for g in range(n_groups):
+        cy = g * pitch_y
+        xs = [pitch_x * (i - (patterns_per_group - 1) / 2) for i in range(patterns_per_group)]
+        for i, cx in enumerate(xs):
+            cell.add(_pattern_polygon(cx, cy, pattern_side, polygon_vertices, layer=100))
+            cell.add(_pattern_polygon(cx, cy, pattern_side, polygon_vertices, layer=255))
+            cell.add(_pattern_polygon(cx, cy, pattern_side, polygon_vertices, layer=0))
+            if i % 2 == 0:
+                for m in range(markers_per_pattern):
+                    # Markers spread along the pattern, all inside it
+                    offset = (m + 1) / (markers_per_pattern + 1) * error_side - error_side / 2
+                    cell.add(gdstk.rectangle((cx + offset - error_side / 4, cy - error_side / 4),
+                                             (cx + offset + error_side / 4, cy + error_side / 4), layer=0, datatype=1))
+        cell.add(gdstk.rectangle((-half_width, cy - 1), (half_width, cy + 1), layer=255, datatype=1))
+        rule_name = rule_names[g % len(rule_names)] if rule_names else f"RULE_{g}"
+        cell.add(gdstk.Label(rule_name, origin=(0, cy - 0.5), layer=22, texttype=22))
+
+    rng = random.Random(seed)
+    height = max(n_groups, 1) * pitch_y
+    for _ in range(noise_polygons):
+        x = rng.uniform(-half_width, half_width)
+        y = rng.uniform(-pitch_y / 2, height)
+        cell.add(gdstk.rectangle((x, y), (x + rng.uniform(0.05, 0.5), y + rng.uniform(0.05, 0.5)), layer=100))
+    return cell
+
+
+def write_synthetic_layouts(output_dir, n_files=1, cells_per_file=1, extension=".gds", **cell_args):
+    """
+    Write n_files layout files of cells_per_file synthetic cells each (see create_synthetic_layout_cell).
+    Cells differ only by the seed of their layer 100 background noise: they are identical on the analysis
+    layers and the content hash dedup of the analysis reuses the results of the first for the others.
+
+    Returns:
+        list: The layout file names.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    file_names = []
+    seed = cell_args.pop("seed", 0)
+    for f in range(n_files):
+        lib = gdstk.Library(unit=1e-6, precision=1e-9)
+        for c in range(cells_per_file):
+            lib.add(create_synthetic_layout_cell(f"CELL_{f}_{c}", seed=seed + f * cells_per_file + c, **cell_args))
+        file_name = f"synthetic_{f}{extension}"
+        if extension == ".oas":
+            lib.write_oas(os.path.join(output_dir, file_name))
+        else:
+            lib.write_gds(os.path.join(output_dir, file_name))
+        file_names.append(file_name)
+    return file_names
+
+
+def write_synthetic_svrf(svrf_path, rule_names):
+    """
+    Write an SVRF deck with one commented rule per name, matching the rule names of the synthetic cells.
+    """
+    with open(svrf_path, "w") as f:
+        f.write("LAYER L 5\n\n")
+        for rule_name in rule_names:
+            f.write(f"{rule_name} {{\n    @ Synthetic rule {rule_name}\n    EXT L < 0.1\n}}\n")
@@ -0,0 +1,80 @@
+"""
+Watcher module:
+Polling of the inputs of a run for the --watch mode. Inputs are compared by size and modification time,
+and a change is only reported once the inputs stopped changing for a while, so a file still being written
+(or a burst of files being copied) triggers a single new analysis once complete.
+"""
+
+import os
+import time
+
+from src.gds_analyzer import is_layout_file
+
+
+def file_stamp(path):
+    """[size, modification time in ns] of a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def layout_stamps(layout_dir):
+    """
+    Stamps (see file_stamp) of the layout files of a directory.
+
+    Returns:
+        dict: layout file name -> [size, modification time in ns]
+    """
+    stamps = {}
+    with os.scandir(layout_dir) as entries:
+        for entry in entries:
+            if is_layout_file(entry.name) and entry.is_file():
+                st = entry.stat()
+                stamps[entry.name] = [st.st_size, st.st_mtime_ns]
+    return stamps
+
+
+def deck_stamps(deck_files):
+    """Stamps of the files of an SVRF deck (see svrf_parser.parse_svrf_rules included_files), None for missing files."""
+    return {path: file_stamp(path) for path in deck_files}
+
+
+def _sleep(seconds, stop):
+    # True when stop was set while sleeping
+    if stop is None:
+        time.sleep(seconds)
+        return False
+    return stop.wait(seconds)
+
+
+def wait_for_change(read_state, state, interval=1.0, debounce=1.0, stop=None):
+    """
+    Poll read_state() every interval seconds until it differs from state, then until it stayed
+    the same for debounce seconds.
+
+    Args:
+        read_state: Callable returning the current state of the inputs (anything comparable with ==).
+        state: State the inputs were analyzed in.
+        interval (float): Seconds between two polls.
+        debounce (float): Seconds the inputs must stay unchanged before the change is reported.
+        stop: Optional threading.Event ending the wait.
+
+    Returns:
+        The new state, or None when stop was set.
+    """
+    current = state
+    while current == state:
+        if _sleep(interval, stop):
+            return None
+        current = read_state()
+
+    quiet_since = time.monotonic()
+    while time.monotonic() - quiet_since < debounce:
+        if _sleep(min(interval, debounce), stop):
+            return None
+        latest = read_state()
+        if latest != current:
+            current, quiet_since = latest, time.monotonic()
+    return current
@@ -0,0 +1,225 @@
+"""
+Unit tests for analysis_runner.
+
+This file uses Python's built-in unittest framework to test the functionality of the analysis_runner module.
+Each test case ensures that individual functions and components behave as expected.
+
+Usage:
+    python -m unittest test_analysis_runner.py
+"""
+
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+import gdstk
+from src import profiler
+from src import analysis_runner
+from src.analysis_runner import run_analysis, order_layouts_by_size, AnalysisCancelled
+from src.utils.create_gds import create_test_layout_cell, write_synthetic_layouts, write_synthetic_svrf
+from src.svrf_parser import parse_svrf_rules
+from src.result_cache import ResultCache
+from src.gds_analyzer import default_layer_map
+
+
+class TestAnalysisRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.layout_dir = tempfile.mkdtemp()
+        self.rules = [
+            {'check name': 'check_name', 'comment': 'Test rule'},
+            {'check name': 'other_rule', 'comment': 'Rule without patterns'},
+        ]
+        # Files of different sizes: more copies of the test cell make a bigger file
+        for file_name, n_cells in [("small.gds", 1), ("large.gds", 3), ("medium.gds", 2)]:
+            lib = gdstk.Library(unit=1e-6, precision=1e-9)
+            for i in range(n_cells):
+                cell = create_test_layout_cell()
+                cell.name = f"SQUARES_{i}"
+                lib.add(cell)
+            lib.write_gds(os.path.join(self.layout_dir, file_name))
+        self.layouts = ["small.gds", "large.gds", "medium.gds"]
+
+    def test_order_layouts_by_size(self):
+        ordered = order_layouts_by_size(self.layout_dir, self.layouts)
+        self.assertEqual(ordered, ["large.gds", "medium.gds", "small.gds"])
+
+    def test_serial_results(self):
+        all_results = run_analysis(self.layout_dir, self.layouts, self.rules)
+        self.assertEqual(list(all_results), ['check_name', 'other_rule'])
+        self.assertEqual(list(all_results['check_name']['files']), self.layouts)
+        result = all_results['check_name']['files']['large.gds']['SQUARES_2']
+        self.assertEqual(result, {'good': {'pass': 1, 'fail': 1}, 'bad': {'pass': 1, 'fail': 1}})
+        empty = all_results['other_rule']['files']['small.gds']['SQUARES_0']
+        self.assertEqual(empty, {'good': {'pass': 0, 'fail': 0}, 'bad': {'pass': 0, 'fail': 0}})
+
+    def test_load_stats(self):
+        stats = {}
+        run_analysis(self.layout_dir, self.layouts, self.rules, stats=stats)
+        self.assertGreater(stats['load_time'], 0)
+        # Every cell is a copy of the same test cell
+        self.assertEqual(stats['cells'], 6)
+        self.assertEqual(stats['reused_cells'], 5)
+
+    def test_dedup_matches_full_analysis(self):
+        stats = {}
+        full = run_analysis(self.layout_dir, self.layouts, self.rules, dedup=False, stats=stats)
+        self.assertEqual(stats['reused_cells'], 0)
+        self.assertEqual(run_analysis(self.layout_dir, self.layouts, self.rules), full)
+
+    def test_parallel_matches_serial(self):
+        serial = run_analysis(self.layout_dir, self.layouts, self.rules, jobs=1)
+        parallel = run_analysis(self.layout_dir, self.layouts, self.rules, jobs=3)
+        self.assertEqual(repr(serial), repr(parallel))
+
+    def test_cell_parallel_matches_serial(self):
+        serial = run_analysis(self.layout_dir, self.layouts, self.rules, jobs=1)
+        parallel = run_analysis(self.layout_dir, self.layouts, self.rules, jobs=3, granularity="cell")
+        self.assertEqual(repr(serial), repr(parallel))
+
+    def test_stream_reader_matches_gdstk(self):
+        expected = run_analysis(self.layout_dir, self.layouts, self.rules)
+        for jobs, granularity in [(1, "file"), (3, "file"), (3, "cell")]:
+            stats = {}
+            streamed = run_analysis(self.layout_dir, self.layouts, self.rules, jobs=jobs, granularity=granularity, stats=stats, reader="stream")
+            self.assertEqual(repr(streamed), repr(expected))
+            self.assertEqual(stats['cells'], 6)
+
+    def test_oasis_matches_gds(self):
+        expected = run_analysis(self.layout_dir, self.layouts, self.rules)
+        oasis_layouts = []
+        for layout_file in self.layouts:
+            oasis_file = layout_file.replace(".gds", ".oas")
+            gdstk.read_gds(os.path.join(self.layout_dir, layout_file)).write_oas(os.path.join(self.layout_dir, oasis_file))
+            oasis_layouts.append(oasis_file)
+        results = run_analysis(self.layout_dir, oasis_layouts, self.rules)
+        self.assertEqual(repr(results).replace(".oas", ".gds"), repr(expected))
+
+    def test_rule_subset(self):
+        full = run_analysis(self.layout_dir, self.layouts, self.rules)
+        subset = run_analysis(self.layout_dir, self.layouts, self.rules[:1])
+        self.assertEqual(subset, {'check_name': full['check_name']})
+
+    def test_synthetic_layouts(self):
+        synthetic_dir = os.path.join(self.layout_dir, "synthetic")
+        layouts = write_synthetic_layouts(synthetic_dir, n_files=2, cells_per_file=3, n_groups=5, patterns_per_group=6,
+                                          markers_per_pattern=2, polygon_vertices=8, noise_polygons=20)
+        svrf_path = os.path.join(self.layout_dir, "synthetic.svrf")
+        write_synthetic_svrf(svrf_path, [f"RULE_{g}" for g in range(5)])
+        rules = parse_svrf_rules(svrf_path)
+        self.assertEqual(len(rules), 5)
+
+        stats = {}
+        all_results = run_analysis(synthetic_dir, layouts, rules, stats=stats)
+        self.assertEqual(stats['cells'], 6)
+        # Cells only differ by their background noise
+        self.assertEqual(stats['reused_cells'], 5)
+        for rule in rules:
+            for cell_results in all_results[rule['check name']]['files'].values():
+                for result in cell_results.values():
+                    self.assertEqual(result, {'good': {'pass': 2, 'fail': 1}, 'bad': {'pass': 2, 'fail': 1}})
+
+    def test_ambiguities(self):
+        lib = gdstk.Library(unit=1e-6, precision=1e-9)
+        for name in ["AMBIGUOUS_0", "AMBIGUOUS_1"]:
+            cell = lib.new_cell(name)
+            for x0 in (0, 10):
+                cell.add(gdstk.rectangle((x0, 0), (x0 + 5, 5), layer=255, datatype=1))
+                cell.add(gdstk.Label("check_name", (x0 + 3, 3), layer=22, texttype=22))
+        lib.write_gds(os.path.join(self.layout_dir, "ambiguous.gds"))
+        layouts = ["small.gds", "ambiguous.gds"]
+        expected = [
+            {'type': 'groups', 'rule': 'check_name', 'groups': 2, 'cell': cell_name, 'file': "ambiguous.gds"}
+            for cell_name in ["AMBIGUOUS_0", "AMBIGUOUS_1"]
+        ]
+
+        cache = ResultCache(os.path.join(self.layout_dir, "cache"), self.rules, default_layer_map)
+        for jobs, granularity, run_cache in [(1, "file", None), (2, "file", None), (2, "cell", None), (1, "file", cache), (1, "file", cache)]:
+            stats = {}
+            run_analysis(self.layout_dir, layouts, self.rules, jobs=jobs, granularity=granularity, cache=run_cache, stats=stats)
+            self.assertEqual(stats['ambiguities'], expected)
+        self.assertEqual(cache.hits, 2)
+
+    def test_progress(self):
+        for jobs, granularity in [(1, "file"), (3, "file"), (3, "cell")]:
+            events = []
+            run_analysis(self.layout_dir, self.layouts, self.rules, jobs=jobs, granularity=granularity,
+                         progress=lambda *event: events.append(event))
+            files = [event for event in events if event[0] == "file"]
+            self.assertEqual([(done, total) for _, _, done, total in files], [(1, 3), (2, 3), (3, 3)])
+            self.assertEqual(sorted(name for _, name, _, _ in files), sorted(self.layouts))
+            cells = [event for event in events if event[0] == "cell"]
+            self.assertEqual(len(cells), 5 if granularity == "cell" else 0)   # small.gds has a single cell, analyzed serially
+
+    def test_cancel(self):
+        cache_dir = os.path.join(self.layout_dir, "cache")
+        for jobs, granularity in [(1, "file"), (3, "file"), (3, "cell")]:
+            cancel = threading.Event()
+            events = []
+
+            def progress(*event):
+                events.append(event)
+                cancel.set()
+
+            cache = ResultCache(cache_dir, self.rules, default_layer_map)
+            with self.assertRaises(AnalysisCancelled):
+                run_analysis(self.layout_dir, self.layouts, self.rules, jobs=jobs, granularity=granularity, cache=cache, progress=progress, cancel=cancel)
+            self.assertEqual(len(events), 1)
+        # The files done before cancelling were cached
+        cache = ResultCache(cache_dir, self.rules, default_layer_map)
+        run_analysis(self.layout_dir, self.layouts, self.rules, cache=cache)
+        self.assertGreater(cache.hits, 0)
+
+    @unittest.skipUnless(multiprocessing.get_start_method() == "fork", "the patched cell analysis reaches the workers through fork")
+    def test_cancel_running_work(self):
+        analyze_cell = analysis_runner.analyze_cell
+
+        def slow_analyze_cell(*args, **kwargs):
+            time.sleep(60)
+            return analyze_cell(*args, **kwargs)
+
+        # small.gds has a single cell, analyzed in this process with granularity "cell"
+        for granularity, layouts in [("file", self.layouts), ("cell", ["large.gds"])]:
+            cancel = threading.Event()
+            threading.Timer(0.3, cancel.set).start()
+            start = time.perf_counter()
+            with mock.patch("src.analysis_runner.analyze_cell", slow_analyze_cell):
+                with self.assertRaises(AnalysisCancelled):
+                    run_analysis(self.layout_dir, layouts, self.rules, jobs=3, granularity=granularity, cancel=cancel)
+            # The workers are stopped in the middle of their cell
+            self.assertLess(time.perf_counter() - start, 10)
+
+    def test_profile(self):
+        expected = run_analysis(self.layout_dir, self.layouts, self.rules)
+        self.assertEqual(profiler.files, [])
+        self.assertEqual(profiler.counters, {})
+        for jobs, granularity in [(1, "file"), (3, "file"), (3, "cell")]:
+            profiler.enable()
+            stats = {}
+            results = run_analysis(self.layout_dir, self.layouts, self.rules, jobs=jobs, granularity=granularity, dedup=False, stats=stats)
+            self.assertEqual(repr(results), repr(expected))
+            self.assertEqual(set(stats), {'load_time', 'cells', 'reused_cells', 'ambiguities'})
+
+            profile = profiler.build_profile()
+            self.assertEqual([entry['file'] for entry in profile['files']], self.layouts)
+            self.assertEqual(len(profile['cells']), 6)
+            self.assertTrue(all(cell['wall'] > 0 and cell['polygons'] > 0 for cell in profile['cells']))
+            stages = [stage['stage'] for stage in profile['stages']]
+            self.assertEqual(stages, ["layout_load", "cell_index", "association", "marker_index", "validation"])
+            # Counters of the worker processes are merged back: every cell is analyzed
+            self.assertEqual(profile['counters']['polygons_scanned'], sum(cell['polygons'] for cell in profile['cells']))
+            self.assertGreater(profile['counters']['marker_candidates'], 0)
+        profiler.enable(False)
+
+    def tearDown(self):
+        profiler.enable(False)
+        shutil.rmtree(self.layout_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
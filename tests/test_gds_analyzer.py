@@ -9,9 +9,14 @@ Usage:
 """
 
 
+import os
+import tempfile
 import unittest
-from src.gds_analyzer import extract_markers, find_text_labels, find_rule_groups, patterns_in_polygon, associate_rules_to_patterns
-from src.utils.create_gds import create_test_layout_cell
+import gdstk
+import numpy as np
+from src.gds_analyzer import extract_markers, find_text_labels, find_rule_groups, patterns_in_polygon, associate_rules_to_patterns, compute_centroid, CellIndex, pack_polygons, compute_areas_and_centroids, points_in_polygon, PointIndex, parse_layer_map, load_gds_layout, default_layer_map, iter_gds_cells, load_layout, load_oas_layout, is_layout_file, describe_ambiguity
+from src import profiler
+from src.utils.create_gds import create_test_layout_cell, create_synthetic_layout_cell
 
 
 class TestGDSAnalyzer(unittest.TestCase):
@@ -51,6 +56,294 @@ class TestGDSAnalyzer(unittest.TestCase):
         self.assertTrue(rule_name=="check_name", "Incorrect rule name")
         self.assertTrue(layer_no==[255, 255, 255, 255], "Incorrect associated layer numbers")
         self.assertTrue(datatypes==[0, 0, 0, 0], "Incorrect associated datatypes")
+    def test_cell_index(self):
+        index = CellIndex(self.cell)
+        self.assertEqual(index.name, "SQUARES")
+        self.assertEqual(sorted(index.layers), [(0, 0), (0, 1), (100, 0), (255, 0), (255, 1)])
+        self.assertEqual(len(index.layer(1, 2)), 0)
+
+        patterns = index.layer(255, 0)
+        self.assertEqual(len(patterns), 4)
+        self.assertEqual(patterns.offsets.tolist(), [0, 4, 8, 12, 16])
+        for poly, bbox, centroid in zip(patterns.polygons, patterns.bboxes, patterns.centroids):
+            self.assertEqual(bbox.tolist(), [list(corner) for corner in poly.bounding_box()])
+            self.assertEqual(tuple(centroid), compute_centroid(poly))
+
+        # Same answers whether given the cell or its index
+        self.assertEqual(extract_markers(index).keys(), extract_markers(self.cell).keys())
+        self.assertEqual(find_text_labels(index), find_text_labels(self.cell))
+        self.assertEqual(find_rule_groups(index), find_rule_groups(self.cell))
+        self.assertEqual(associate_rules_to_patterns(index), associate_rules_to_patterns(self.cell))
+    def test_compute_areas_and_centroids(self):
+        polygons = [
+            gdstk.rectangle((3.5, -0.5), (4.5, 0.5)),
+            gdstk.Polygon([(0, 0), (3, 0), (0, 3)]),
+            gdstk.Polygon([(0, 0), (1, 1), (2, 2)]),                   # zero area
+            gdstk.rectangle((10000.0, 10000.0), (10000.002, 10000.001)),
+        ]
+        areas, centroids = compute_areas_and_centroids(*pack_polygons(polygons))
+        np.testing.assert_allclose(areas, [1.0, 4.5, 0.0, 2e-6], rtol=1e-6)
+        np.testing.assert_allclose(centroids, [(4, 0), (1, 1), (1, 1), (10000.001, 10000.0005)], rtol=1e-12)
+        self.assertEqual(compute_centroid(polygons[0]), (4.0, 0.0))
+
+        areas, centroids = compute_areas_and_centroids(*pack_polygons([]))
+        self.assertEqual(centroids.shape, (0, 2))
+    def test_points_in_polygon(self):
+        rng = np.random.default_rng(0)
+        points = rng.uniform(-1, 5, size=(500, 2))
+        points[:4] = [(0, 0), (4, 0), (2, 1), (4, 4)]   # vertices and an edge point
+        shapes = [
+            gdstk.rectangle((0, 0), (4, 4)),
+            gdstk.Polygon([(0, 0), (4, 0), (4, 4), (2, 1)]),
+            gdstk.Polygon([(0, 0), (4, 0), (4, 1), (1, 1), (1, 4), (0, 4)]),
+        ]
+        index = PointIndex(points)
+        for shape in shapes:
+            expected = np.array([shape.contain(tuple(p)) for p in points])
+            np.testing.assert_array_equal(points_in_polygon(points, shape), expected)
+            np.testing.assert_array_equal(index.in_polygon(shape), np.flatnonzero(expected))
+    def test_points_in_polygon_two_candidates(self):
+        triangle = gdstk.Polygon([(0, 0), (10, 0), (5, 10)])
+        for n in [1, 2, 3]:
+            np.testing.assert_array_equal(points_in_polygon([(5, 2)] * n + [(9, 9)], triangle), [True] * n + [False])
+        np.testing.assert_array_equal(PointIndex([(5, 2), (1, 8), (5, 3)]).in_polygon(triangle), [0, 2])
+
+        # A non-rectangular rule group holding exactly two patterns
+        cell = gdstk.Cell("TRIANGLE")
+        cell.add(gdstk.Polygon([(0, 0), (10, 0), (5, 10)], layer=255, datatype=1))
+        for x in [4, 6]:
+            cell.add(gdstk.rectangle((x - 0.5, 1.5), (x + 0.5, 2.5), layer=255, datatype=0))
+        cell.add(gdstk.Label("RULE_T", (5, 5), layer=22, texttype=22))
+        self.assertEqual({name: len(patterns) for name, patterns in associate_rules_to_patterns(cell).items()}, {'RULE_T': 2})
+
+    def test_point_index_nearest(self):
+        rng = np.random.default_rng(1)
+        points = rng.integers(0, 50, size=(400, 2)).astype(float)   # many equally near points
+        index = PointIndex(points)
+        for query in list(rng.uniform(-10, 60, size=(200, 2))) + [tuple(p) for p in points[:20]]:
+            dist = ((points - query) ** 2).sum(axis=1)
+            self.assertEqual(index.nearest(query), int(np.flatnonzero(dist == dist.min())[0]))
+        self.assertIsNone(PointIndex([]).nearest((0, 0)))
+
+        # Points on a column, on a row and at a single location
+        column = np.column_stack((np.zeros(300), rng.integers(0, 100, size=300))).astype(float)
+        for points in [column, column[:, ::-1], np.ones((5, 2))]:
+            index = PointIndex(points)
+            for query in rng.uniform(-20, 120, size=(100, 2)):
+                dist = ((points - query) ** 2).sum(axis=1)
+                self.assertEqual(index.nearest(query), int(np.flatnonzero(dist == dist.min())[0]))
+                inside = (np.abs(points - query) <= 10).all(axis=1)
+                np.testing.assert_array_equal(index.in_box((query - 10, query + 10)), np.flatnonzero(inside))
+
+    def test_point_index_nearest_column_scaling(self):
+        # A column of rule name labels, as create_synthetic_layout_cell writes them, searched from beside it
+        def nearest_candidates(n_labels):
+            points = [(0.0, 4.0 * i) for i in range(n_labels)]
+            index = PointIndex(points)
+            profiler.enable()
+            try:
+                for i in range(0, n_labels, n_labels // 2000):
+                    self.assertEqual(index.nearest((10.0, 4.0 * i + 1)), i)
+                candidates = profiler.counters["nearest_candidates"]
+            finally:
+                profiler.enable(False)
+            return candidates
+
+        small = nearest_candidates(4000)
+        large = nearest_candidates(16000)
+        # The same 2000 searches among 4 times the labels look at a few bins around each query either way
+        self.assertLess(small, 32 * 2000)
+        self.assertLess(large, 32 * 2000)
+        self.assertLess(large, 1.25 * small)
+
+    def test_associate_ambiguities(self):
+        cell = gdstk.Cell("AMBIGUOUS")
+        for x0, names in [(0, ["RULE_A", "RULE_B"]), (10, ["RULE_A"]), (20, [])]:
+            cell.add(gdstk.rectangle((x0, 0), (x0 + 5, 5), layer=255, datatype=1))
+            cell.add(gdstk.rectangle((x0 + 1, 1), (x0 + 2, 2), layer=255, datatype=0))
+            for i, name in enumerate(names):
+                cell.add(gdstk.Label(name, (x0 + 3, 1 + i), layer=22, texttype=22))
+        cell.add(gdstk.Label("RULE_C", (27, 4), layer=22, texttype=22))
+
+        ambiguities = []
+        rule_map = associate_rules_to_patterns(cell, ambiguities=ambiguities)
+        # The unlabelled group takes the nearest label, the two RULE_A groups are combined
+        self.assertEqual({name: len(patterns) for name, patterns in rule_map.items()}, {'RULE_A': 2, 'RULE_C': 1})
+        self.assertEqual(ambiguities, [
+            {'type': 'labels', 'rule': 'RULE_A', 'labels': ['RULE_A', 'RULE_B'], 'bbox': [[0.0, 0.0], [5.0, 5.0]]},
+            {'type': 'groups', 'rule': 'RULE_A', 'groups': 2},
+        ])
+        self.assertIn("RULE_B ignored", describe_ambiguity(ambiguities[0]))
+
+    def test_associate_many_groups(self):
+        # Every group is labelled from outside, by its nearest label
+        cell = gdstk.Cell("MANY")
+        for g in range(20000):
+            x, y = (g % 200) * 10.0, (g // 200) * 10.0
+            cell.add(gdstk.rectangle((x, y), (x + 4, y + 4), layer=255, datatype=1))
+            cell.add(gdstk.rectangle((x + 1, y + 1), (x + 2, y + 2), layer=255, datatype=0))
+            cell.add(gdstk.Label(f"RULE_{g}", (x + 5, y + 2), layer=22, texttype=22))
+        profiler.enable()
+        try:
+            rule_map = associate_rules_to_patterns(cell)
+            counters = dict(profiler.counters)
+        finally:
+            profiler.enable(False)
+        self.assertEqual(len(rule_map), 20000)
+        self.assertTrue(all(len(patterns) == 1 for patterns in rule_map.values()))
+        self.assertEqual(counters["nearest_label_searches"], 20000)
+        # Each group box only gathers the few points of the bins it covers, not every label and pattern
+        self.assertLess(counters["box_candidates"], 5 * 20000)
+
+    def test_associate_wide_groups_scaling(self):
+        # Full-width rule group rows: each group box spans the x range of every pattern of the cell
+        def box_candidates(n_groups):
+            cell_index = CellIndex(create_synthetic_layout_cell(n_groups=n_groups, patterns_per_group=20))
+            profiler.enable()
+            try:
+                rule_map = associate_rules_to_patterns(cell_index)
+                candidates = profiler.counters["box_candidates"]
+            finally:
+                profiler.enable(False)
+            self.assertEqual(len(rule_map), n_groups)
+            self.assertTrue(all(len(patterns) == 20 for patterns in rule_map.values()))
+            return candidates
+
+        small = box_candidates(2000)
+        large = box_candidates(8000)
+        # About the group's own 20 patterns and label per group: linear in the groups, where scanning
+        # every pattern for every group would be quadratic
+        self.assertLess(small, 2 * 2000 * 21)
+        self.assertLess(large, 2 * 8000 * 21)
+        self.assertLess(large, 4.5 * small)
+
+    def test_associate_selected_rules(self):
+        self.assertEqual(list(associate_rules_to_patterns(self.cell, rule_names={"check_name"})), ["check_name"])
+        self.assertEqual(associate_rules_to_patterns(self.cell, rule_names={"other_rule"}), {})
+
+    def test_parse_layer_map(self):
+        self.assertEqual(parse_layer_map(None), default_layer_map)
+        layer_map = parse_layer_map("pattern=10.2, result_marker=7")
+        self.assertEqual(layer_map['pattern'], (10, 2))
+        self.assertEqual(layer_map['result_marker'], (7, 0))
+        self.assertEqual(layer_map['rule_group'], (255, 1))
+        with self.assertRaises(ValueError):
+            parse_layer_map("unknown=1.0")
+        with self.assertRaises(ValueError):
+            parse_layer_map("pattern=a.b")
+
+    def test_load_gds_layout_layer_filter(self):
+        lib = gdstk.Library(unit=1e-6, precision=1e-9)
+        lib.add(self.cell)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "test.gds")
+            lib.write_gds(path)
+            filtered = load_gds_layout(path)[0]
+            unfiltered = load_gds_layout(path, layer_filter=False)[0]
+        self.assertEqual(len(unfiltered.polygons), 15)
+        # The pattern layer 100 and error location layer 0.0 are not part of the layer map
+        self.assertEqual(sorted({(p.layer, p.datatype) for p in filtered.polygons}), [(0, 1), (255, 0), (255, 1)])
+        self.assertEqual(associate_rules_to_patterns(filtered).keys(), associate_rules_to_patterns(unfiltered).keys())
+    def test_content_hash(self):
+        copy = self.cell.copy("OTHER_NAME")
+        self.assertEqual(CellIndex(copy).content_hash(), CellIndex(self.cell).content_hash())
+
+        # Geometry on layers outside the layer map does not matter
+        copy.add(gdstk.rectangle((0, 0), (1, 1), layer=5))
+        self.assertEqual(CellIndex(copy).content_hash(), CellIndex(self.cell).content_hash())
+
+        copy.add(gdstk.rectangle((0, 0), (1, 1), layer=0, datatype=1))
+        self.assertNotEqual(CellIndex(copy).content_hash(), CellIndex(self.cell).content_hash())
+
+        renamed = self.cell.copy("RENAMED_LABEL")
+        renamed.remove(*renamed.labels)
+        renamed.add(gdstk.Label("other_check", (0, -0.5), layer=22, texttype=22))
+        self.assertNotEqual(CellIndex(renamed).content_hash(), CellIndex(self.cell).content_hash())
+
+    def test_load_oas_layout(self):
+        cell = self.cell.copy("REPEATED")
+        repeated = gdstk.rectangle((20, 0), (21, 1), layer=255, datatype=0)
+        repeated.repetition = gdstk.Repetition(3, 2, spacing=(2, 2))
+        cell.add(repeated)
+        lib = gdstk.Library(unit=1e-6, precision=1e-9)
+        lib.add(cell)
+        with tempfile.TemporaryDirectory() as tmp:
+            gds_path = os.path.join(tmp, "test.gds")
+            oas_path = os.path.join(tmp, "test.oas")
+            lib.write_gds(gds_path)
+            lib.write_oas(oas_path)
+            from_gds = load_gds_layout(gds_path)[0]
+            from_oas = load_layout(oas_path)[0]
+            unfiltered = load_oas_layout(oas_path, layer_filter=False)[0]
+
+        self.assertEqual(len(unfiltered.polygons), 15 + 6)
+        # Repetitions are expanded and layers outside the layer map are dropped, as for the GDS file
+        key = lambda p: (p.layer, p.datatype, p.points.tobytes())
+        self.assertEqual(sorted(map(key, from_oas.polygons)), sorted(map(key, from_gds.polygons)))
+        self.assertEqual(associate_rules_to_patterns(from_oas).keys(), associate_rules_to_patterns(from_gds).keys())
+
+    def test_is_layout_file(self):
+        self.assertTrue(is_layout_file("a.gds"))
+        self.assertTrue(is_layout_file("B.OAS"))
+        self.assertFalse(is_layout_file("rules.svrf"))
+
+    def test_iter_gds_cells_matches_gdstk(self):
+        top = gdstk.Cell("TOP")
+        top.add(gdstk.Reference(self.cell, (10, 10)))
+        top.add(gdstk.FlexPath([(0, 0), (5, 5)], 0.2, layer=255, datatype=0))
+        top.add(gdstk.Polygon([(0.123456789, 1.987654321), (3.3333333, 0.1), (-2.7182818, 2.1)], layer=255, datatype=1))
+        top.add(gdstk.Label("rotated", (1.1, -2.2), rotation=0.5, magnification=2, layer=22, texttype=22))
+        lib = gdstk.Library(unit=1e-6, precision=1e-9)
+        lib.add(self.cell, top)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "test.gds")
+            lib.write_gds(path)
+            expected = load_gds_layout(path)
+            streamed = list(iter_gds_cells(path))
+
+            empty_path = os.path.join(tmp, "empty.gds")
+            gdstk.Library().write_gds(empty_path)
+            with self.assertRaises(ValueError):
+                list(load_layout(empty_path, reader="stream"))
+
+        self.assertEqual([cell.name for cell in streamed], [cell.name for cell in expected])
+        for cell, streamed_cell in zip(expected, streamed):
+            # Paths and references are not analyzed and are skipped by the streaming reader
+            polygons = [p for p in cell.polygons if (p.layer, p.datatype) in set(default_layer_map.values())]
+            self.assertEqual(len(streamed_cell.polygons), len(polygons))
+            for polygon, streamed_polygon in zip(polygons, streamed_cell.polygons):
+                self.assertEqual((streamed_polygon.layer, streamed_polygon.datatype), (polygon.layer, polygon.datatype))
+                np.testing.assert_array_equal(streamed_polygon.points, polygon.points)
+            labels = [(label.text, label.origin, label.layer, label.texttype) for label in cell.labels]
+            self.assertEqual([(label.text, label.origin, label.layer, label.texttype) for label in streamed_cell.labels], labels)
+            self.assertEqual(CellIndex(streamed_cell).content_hash(), CellIndex(cell).content_hash())
+
+    def test_iter_gds_cells_high_layer_numbers(self):
+        # GDSII layer, datatype and texttype numbers are unsigned 16-bit values
+        layer_map = parse_layer_map("rule_name=65535.32768,rule_group=50000.1,pattern=50000.0,result_marker=40000.40001")
+        cell = gdstk.Cell("HIGH")
+        cell.add(gdstk.rectangle((0, 0), (4, 4), layer=50000, datatype=1))
+        cell.add(gdstk.rectangle((1, 1), (2, 2), layer=50000, datatype=0))
+        cell.add(gdstk.rectangle((1.25, 1.25), (1.75, 1.75), layer=40000, datatype=40001))
+        cell.add(gdstk.Label("HIGH_RULE", (3, 3), layer=65535, texttype=32768))
+        lib = gdstk.Library(unit=1e-6, precision=1e-9)
+        lib.add(cell)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "high.gds")
+            lib.write_gds(path)
+            expected = load_gds_layout(path, layer_map)[0]
+            streamed = list(iter_gds_cells(path, layer_map))[0]
+
+        key = lambda p: (p.layer, p.datatype, p.points.tobytes())
+        self.assertEqual(len(streamed.polygons), 3)
+        self.assertEqual(sorted(map(key, streamed.polygons)), sorted(map(key, expected.polygons)))
+        self.assertEqual([(label.text, label.layer, label.texttype) for label in streamed.labels], [("HIGH_RULE", 65535, 32768)])
+        self.assertEqual([(label.text, label.layer, label.texttype) for label in expected.labels], [("HIGH_RULE", 65535, 32768)])
+        # The label names the rule group and its pattern
+        rule_map = associate_rules_to_patterns(streamed, layer_map)
+        self.assertEqual({name: len(patterns) for name, patterns in rule_map.items()}, {"HIGH_RULE": 1})
+        self.assertEqual(rule_map.keys(), associate_rules_to_patterns(expected, layer_map).keys())
+        self.assertEqual(CellIndex(streamed).content_hash(layer_map), CellIndex(expected).content_hash(layer_map))
 
 if __name__ == "__main__":
     unittest.main()
@@ -9,8 +9,12 @@ Usage:
 """
 
 
+import random
 import unittest
-from src.pattern_validator import validate_patterns
+import gdstk
+import numpy as np
+from src import profiler
+from src.pattern_validator import validate_patterns, polygons_overlap, manhattan_rectangles, MarkerIndex, overlapping_box_pairs
 from src.utils.create_gds import create_test_layout_cell
 from src.gds_analyzer import extract_markers, find_text_labels,associate_rules_to_patterns
 
@@ -29,7 +33,97 @@ class TestPatternValidator(unittest.TestCase):
         self.assertEqual(result["bad"]["pass"], 1)
         self.assertEqual(result["bad"]["fail"], 1)
 
+        indexed = validate_patterns(rule_name, patterns_for_rule, MarkerIndex(markers))
+        self.assertEqual(indexed, result)
 
+    def test_marker_index_candidates(self):
+        rng = random.Random(1)
+        markers = []
+        for _ in range(300):
+            x, y = rng.uniform(-50, 50), rng.uniform(-50, 50)
+            w, h = rng.uniform(0.1, 2), rng.uniform(0.1, 2)
+            markers.append(gdstk.rectangle((x, y), (x + w, y + h)))
+        # One marker spanning most of the area
+        markers.append(gdstk.rectangle((-40, -40), (40, 40)))
+        index = MarkerIndex(markers)
+
+        for _ in range(100):
+            x, y = rng.uniform(-55, 55), rng.uniform(-55, 55)
+            pattern = gdstk.rectangle((x, y), (x + 1, y + 1))
+            expected = [m for m in markers if polygons_overlap(pattern, m)]
+            found = [m for m in index.candidates(pattern.bounding_box()) if polygons_overlap(pattern, m)]
+            self.assertEqual(found, expected)
+
+
+    def test_polygons_overlap_edge_touching(self):
+        square = gdstk.rectangle((0, 0), (1, 1))
+        self.assertTrue(polygons_overlap(square, gdstk.rectangle((0.5, 0.5), (2, 2))))
+        self.assertFalse(polygons_overlap(square, gdstk.rectangle((1, 0), (2, 1))))   # shared edge
+        self.assertFalse(polygons_overlap(square, gdstk.rectangle((1, 1), (2, 2))))   # shared corner
+        self.assertFalse(polygons_overlap(square, gdstk.rectangle((3, 3), (4, 4))))
+
+    def test_manhattan_rectangles(self):
+        l_shape = gdstk.Polygon([(0, 0), (4, 0), (4, 1), (1, 1), (1, 4), (0, 4)])
+        rects = manhattan_rectangles(l_shape.points)
+        self.assertEqual(rects.tolist(), [[0, 0, 4, 1], [0, 1, 1, 4]])
+        self.assertIsNone(manhattan_rectangles(gdstk.Polygon([(0, 0), (2, 0), (1, 2)]).points))
+
+    def test_polygons_overlap_matches_boolean(self):
+        rng = random.Random(2)
+
+        def random_shape():
+            x, y = rng.randint(0, 8) / 2, rng.randint(0, 8) / 2
+            kind = rng.choice(["rectangle", "manhattan", "general"])
+            if kind == "rectangle":
+                return gdstk.rectangle((x, y), (x + rng.randint(1, 4) / 2, y + rng.randint(1, 4) / 2))
+            if kind == "manhattan":
+                return gdstk.Polygon([(x, y), (x + 2, y), (x + 2, y + 0.5), (x + 0.5, y + 0.5), (x + 0.5, y + 2), (x, y + 2)])
+            return gdstk.Polygon([(x, y), (x + 2, y + 0.5), (x + 1, y + 2)])
+
+        for _ in range(500):
+            poly1, poly2 = random_shape(), random_shape()
+            expected = len(gdstk.boolean(poly1, poly2, "and")) > 0
+            self.assertEqual(polygons_overlap(poly1, poly2), expected)
+            self.assertEqual(MarkerIndex([poly2]).overlaps(poly1), expected)
+
+    def test_overlaps_many_matches_overlaps(self):
+        rng = random.Random(3)
+
+        def triangle(x, y, size):
+            return gdstk.Polygon([(x, y), (x + size, y + size / 4), (x + size / 2, y + size)])
+
+        # Non-Manhattan patterns and markers on a coarse grid, so that patterns touch, overlap or repeat
+        patterns = [triangle(rng.randint(0, 40) / 2, rng.randint(0, 40) / 2, rng.choice([1, 2])) for _ in range(300)]
+        patterns += patterns[:20]
+        patterns += [gdstk.rectangle((x, 0), (x + 1, 1)) for x in range(5)]
+        markers = [triangle(rng.randint(0, 40) / 2, rng.randint(0, 40) / 2, 1) for _ in range(150)]
+        markers += [gdstk.rectangle((0, 0), (2, 0.5))]
+        expected = [any(polygons_overlap(pattern, marker) for marker in markers) for pattern in patterns]
+        self.assertTrue(any(expected) and not all(expected))
+
+        index = MarkerIndex(markers)
+        profiler.enable()
+        try:
+            self.assertEqual(index.overlaps_many(patterns), expected)
+            self.assertEqual(profiler.counters["boolean_calls"] - profiler.counters.get("batch_fallbacks", 0), 2)
+        finally:
+            profiler.enable(False)
+
+        index.boolean_batch_size = 16
+        bboxes = [pattern.bounding_box() for pattern in patterns]
+        self.assertEqual(index.overlaps_many(patterns, bboxes, [False] * len(patterns)), expected)
+        self.assertEqual(index.overlaps_many([]), [])
+
+    def test_overlapping_box_pairs(self):
+        rng = np.random.default_rng(4)
+        corners = rng.integers(0, 40, size=(200, 2)) / 2
+        boxes = np.stack([corners, corners + rng.integers(1, 4, size=(200, 2)) / 2], axis=1)
+        boxes[0] = [[-5, -5], [30, 30]]   # kept out of the grid
+        queries = boxes[rng.permutation(200)[:120]] + 0.25
+        query_ids, box_ids = overlapping_box_pairs(queries, boxes)
+        q, b = queries[:, None], boxes[None, :]
+        strict = (b[..., 0, 0] < q[..., 1, 0]) & (q[..., 0, 0] < b[..., 1, 0]) & (b[..., 0, 1] < q[..., 1, 1]) & (q[..., 0, 1] < b[..., 1, 1])
+        self.assertEqual(list(zip(query_ids.tolist(), box_ids.tolist())), [tuple(pair) for pair in np.argwhere(strict).tolist()])
 
 if __name__ == "__main__":
     unittest.main()
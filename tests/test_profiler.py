@@ -0,0 +1,63 @@
+"""
+Unit tests for profiler.
+
+Usage:
+    python -m unittest test_profiler.py
+"""
+
+
+import unittest
+from src import profiler
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_disabled_records_nothing(self):
+        with profiler.timed("stage"):
+            pass
+        self.assertEqual(profiler.timers, {})
+
+    def test_timed_and_counters(self):
+        profiler.enable()
+        with profiler.timed("stage"):
+            sum(range(100000))
+        with profiler.timed("stage"):
+            pass
+        profiler.count("tests", 3)
+        profiler.count("tests")
+        wall, cpu = profiler.timers["stage"]
+        self.assertGreater(wall, 0)
+        self.assertGreaterEqual(cpu, 0)
+        self.assertEqual(profiler.counters, {'tests': 4})
+
+    def test_take_and_merge(self):
+        profiler.enable()
+        profiler.add_time("stage", 1.0, 0.5)
+        profiler.count("tests", 2)
+        snapshot = profiler.take()
+        self.assertEqual(profiler.timers, {})
+        self.assertEqual(snapshot, {'timers': {'stage': [1.0, 0.5]}, 'counters': {'tests': 2}})
+
+        profiler.add_time("stage", 1.0, 0.5)
+        profiler.merge(snapshot)
+        self.assertEqual(profiler.timers, {'stage': [2.0, 1.0]})
+        self.assertEqual(profiler.counters, {'tests': 2})
+
+    def test_build_profile(self):
+        profiler.enable()
+        profiler.add_time("validation", 1.0, 1.0)
+        profiler.add_time("custom", 1.0, 1.0)
+        profiler.add_time("svrf_parse", 1.0, 1.0)
+        profiler.files.append({'file': "a.gds", 'cached': False, 'wall': 2.0, 'cpu': 2.0, 'load_wall': 1.0, 'cell_count': 1,
+                               'cells': [{'cell': "TOP", 'polygons': 4, 'wall': 1.0, 'cpu': 1.0}]})
+        profile = profiler.build_profile()
+        self.assertEqual([stage['stage'] for stage in profile['stages']], ["svrf_parse", "validation", "custom"])
+        self.assertNotIn('cells', profile['files'][0])
+        self.assertEqual(profile['cells'], [{'cell': "TOP", 'polygons': 4, 'wall': 1.0, 'cpu': 1.0, 'file': "a.gds"}])
+
+    def tearDown(self):
+        profiler.enable(False)
+
+
+if __name__ == "__main__":
+    unittest.main()
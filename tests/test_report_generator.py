@@ -2,7 +2,8 @@ import os
 import unittest
 from pathlib import Path
 import pandas as pd
-from src.report_generator import generate_reports
+import json
+from src.report_generator import generate_reports, write_html_report, write_excel_report, write_csv_report, write_columnar_report, parse_report_types, pyarrow_available
 
 
 class TestGenerateReports(unittest.TestCase):
@@ -68,6 +69,94 @@ class TestGenerateReports(unittest.TestCase):
         else:
             pass
 
+    def test_html_data_block(self):
+        details = [dict(self.details[0], **{"Rule Name": f"Rule{i}", "Rule Comment": "</script> \"quoted\""}) for i in range(25)]
+        html_path = os.path.join(self.output_dir, "data_block.html")
+        write_html_report(html_path, self.summary, details, chunk_rows=10)
+
+        with open(html_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        # Rows are embedded as JSON data, not as table rows
+        self.assertNotIn("<td>Rule0</td>", content)
+        self.assertEqual(content.count("</script>"), content.count("<script"))
+        data = content.split("const resultsData = ", 1)[1].split(";\n</script>", 1)[0]
+        rows = json.loads(data.replace("<\\/", "</"))
+        self.assertEqual(rows, [list(row.values()) for row in details])
+
+    def test_html_timing_section(self):
+        profile = {
+            'stages': [{'stage': "analysis", 'wall': 1.5, 'cpu': 1.25}],
+            'counters': {'boolean_calls': 42},
+            'files': [{'file': "slow.gds", 'cached': False, 'wall': 1.0, 'cpu': 1.0, 'load_wall': 0.5, 'cell_count': 2},
+                      {'file': "cached.gds", 'cached': True, 'wall': 0.0, 'cpu': 0.0, 'load_wall': 0.0, 'cell_count': 1}],
+            'cells': [{'file': "slow.gds", 'cell': "TOP<1>", 'polygons': 10, 'wall': 0.75, 'cpu': 0.75}],
+        }
+        html_path = os.path.join(self.output_dir, "timing.html")
+        write_html_report(html_path, self.summary, self.details, profile=profile)
+        with open(html_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        self.assertIn("<h2>Timing</h2>", content)
+        self.assertIn("<td>analysis</td><td>1.500</td><td>1.250</td>", content)
+        self.assertIn("<td>boolean_calls</td><td>42</td>", content)
+        self.assertIn("TOP&lt;1&gt;", content)
+        self.assertNotIn("cached.gds", content)
+
+        write_html_report(html_path, self.summary, self.details)
+        with open(html_path, 'r', encoding='utf-8') as f:
+            self.assertNotIn("Timing", f.read())
+
+    def test_excel_sheet_rollover(self):
+        details = [dict(self.details[0], **{"Rule Name": f"Rule{i}", "Failed Bad": i}) for i in range(7)]
+        excel_path = os.path.join(self.output_dir, "rollover.xlsx")
+        write_excel_report(excel_path, self.summary, details, max_rows=4)
+
+        df = pd.read_excel(excel_path, sheet_name=None)
+        self.assertEqual(list(df), ["Summary", "Detailed Results", "Detailed Results 2", "Detailed Results 3"])
+        self.assertEqual([len(df[name]) for name in list(df)[1:]], [3, 3, 1])
+        combined = pd.concat([df[name] for name in list(df)[1:]], ignore_index=True)
+        self.assertEqual(list(combined.columns), list(details[0].keys()))
+        self.assertEqual(combined["Rule Name"].tolist(), [row["Rule Name"] for row in details])
+        self.assertEqual(combined["Failed Bad"].tolist(), list(range(7)))
+
+    def test_parse_report_types(self):
+        self.assertEqual(parse_report_types("both"), ["html", "excel"])
+        self.assertEqual(parse_report_types("html, parquet,csv"), ["html", "parquet", "csv"])
+        with self.assertRaises(ValueError):
+            parse_report_types("pdf")
+
+    def test_csv_export(self):
+        details = [dict(self.details[0], **{"Rule Name": f"Rule{i}", "Fail Pattern Location": f"file.gds / Cell{i}"}) for i in range(5)]
+        csv_path = os.path.join(self.output_dir, "details.csv")
+        write_csv_report(csv_path, details, chunk_rows=2)
+
+        df = pd.read_csv(csv_path)
+        self.assertEqual(len(df), 5)
+        self.assertNotIn("Fail Pattern Location", df.columns)
+        self.assertEqual(df["Cell Name"].tolist(), [f"Cell{i}" for i in range(5)])
+        self.assertEqual(df["Layout File"].unique().tolist(), ["file.gds"])
+        self.assertEqual(df["Failed Bad"].tolist(), [5] * 5)
+
+    @unittest.skipUnless(pyarrow_available(), "pyarrow is not installed")
+    def test_columnar_exports(self):
+        import pyarrow as pa
+        import pyarrow.feather as feather
+        import pyarrow.parquet as pq
+
+        details = [dict(self.details[0], **{"Rule Name": f"Rule{i % 3}", "Failed Good": i, "Fail Pattern Location": f"file.gds / Cell{i}"}) for i in range(7)]
+        for report_format, read_table in [("parquet", pq.read_table), ("feather", feather.read_table)]:
+            path = os.path.join(self.output_dir, f"details.{report_format}")
+            write_columnar_report(path, self.summary, details, report_format, chunk_rows=3)
+
+            table = read_table(path)
+            self.assertEqual(table.num_rows, 7)
+            self.assertEqual(table.schema.field("Failed Good").type, pa.int32())
+            self.assertTrue(pa.types.is_dictionary(table.schema.field("Rule Name").type))
+            self.assertTrue(pa.types.is_dictionary(table.schema.field("Cell Name").type))
+            self.assertEqual(table.column("Rule Name").to_pylist(), [f"Rule{i % 3}" for i in range(7)])
+            self.assertEqual(table.column("Failed Good").to_pylist(), list(range(7)))
+            self.assertEqual(table.column("Cell Name").to_pylist(), [f"Cell{i}" for i in range(7)])
+            self.assertEqual(table.schema.metadata[b"Host Name"], b"unit-test-host")
+
     def tearDown(self):
         # Clean generated test files
         for file in os.listdir(self.output_dir):
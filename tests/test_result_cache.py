@@ -0,0 +1,92 @@
+"""
+Unit tests for result_cache.
+
+This file uses Python's built-in unittest framework to test the functionality of the result_cache module.
+Each test case ensures that individual functions and components behave as expected.
+
+Usage:
+    python -m unittest test_result_cache.py
+"""
+
+
+import os
+import shutil
+import tempfile
+import unittest
+import gdstk
+from src.analysis_runner import run_analysis
+from src.gds_analyzer import default_layer_map, parse_layer_map
+from src.result_cache import ResultCache, prune_cache, parse_size
+from src.utils.create_gds import create_test_layout_cell
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.layout_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.rules = [{'check name': 'check_name', 'comment': 'Test rule'}]
+        self.layouts = ["a.gds", "b.gds"]
+        self.write_layout("a.gds", "SQUARES_A")
+        self.write_layout("b.gds", "SQUARES_B")
+
+    def write_layout(self, file_name, cell_name):
+        lib = gdstk.Library(unit=1e-6, precision=1e-9)
+        cell = create_test_layout_cell()
+        cell.name = cell_name
+        lib.add(cell)
+        lib.write_gds(os.path.join(self.layout_dir, file_name))
+
+    def run_cached(self, rules=None, layer_map=None):
+        rules = rules or self.rules
+        cache = ResultCache(self.cache_dir, rules, layer_map or default_layer_map)
+        stats = {}
+        results = run_analysis(self.layout_dir, self.layouts, rules, cache=cache, stats=stats)
+        return results, stats
+
+    def test_hits_and_misses(self):
+        first, stats = self.run_cached()
+        self.assertEqual((stats['cache_hits'], stats['cache_misses']), (0, 2))
+
+        second, stats = self.run_cached()
+        self.assertEqual((stats['cache_hits'], stats['cache_misses']), (2, 0))
+        self.assertEqual(second, first)
+        self.assertEqual(second, run_analysis(self.layout_dir, self.layouts, self.rules))
+
+        # A modified layout is analyzed again, the unchanged one is still served from the cache
+        self.write_layout("b.gds", "RENAMED")
+        third, stats = self.run_cached()
+        self.assertEqual((stats['cache_hits'], stats['cache_misses']), (1, 1))
+        self.assertIn("RENAMED", third['check_name']['files']['b.gds'])
+
+    def test_configuration_is_part_of_the_key(self):
+        self.run_cached()
+        _, stats = self.run_cached(rules=self.rules + [{'check name': 'other', 'comment': 'Other rule'}])
+        self.assertEqual(stats['cache_misses'], 2)
+        _, stats = self.run_cached(layer_map=parse_layer_map("result_marker=0.2"))
+        self.assertEqual(stats['cache_misses'], 2)
+
+    def test_prune_cache(self):
+        self.run_cached()
+        removed, remaining = prune_cache(self.cache_dir, parse_size("1M"))
+        self.assertEqual(removed, 0)
+        removed, remaining = prune_cache(self.cache_dir, 0)
+        self.assertEqual((removed, remaining), (2, 0))
+        _, stats = self.run_cached()
+        self.assertEqual(stats['cache_misses'], 2)
+
+    def test_parse_size(self):
+        self.assertEqual(parse_size("1048576"), 1048576)
+        self.assertEqual(parse_size("64k"), 64 * 1024)
+        self.assertEqual(parse_size("1.5G"), int(1.5 * 1024 ** 3))
+        self.assertEqual(parse_size("500MB"), 500 * 1024 ** 2)
+        with self.assertRaises(ValueError):
+            parse_size("lots")
+
+    def tearDown(self):
+        shutil.rmtree(self.layout_dir)
+        shutil.rmtree(self.cache_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+"""
+Unit tests for the setup.py command line entry point.
+
+This file uses Python's built-in unittest framework to check the cold-start behaviour of setup.py:
+the heavy modules must only be imported by the stages that need them (see benchmarks/bench_startup.py
+for the timings).
+
+Usage:
+    python -m unittest test_setup.py
+"""
+
+
+import os
+import subprocess
+import sys
+import unittest
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+heavy_modules = ("gdstk", "numpy", "tqdm", "xlsxwriter", "pandas", "openpyxl", "pyarrow")
+
+
+def imported_modules(code):
+    """Heavy modules imported after running code in a fresh interpreter."""
+    check = f"{code}\nimport sys\nprint('imported:' + ','.join(m for m in {heavy_modules!r} if m in sys.modules))"
+    proc = subprocess.run([sys.executable, "-c", check], cwd=repo_dir, capture_output=True, text=True, check=True)
+    return [m for m in proc.stdout.splitlines()[-1][len("imported:"):].split(",") if m]
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_import_setup_is_light(self):
+        self.assertEqual(imported_modules("import setup"), [])
+
+    def test_help(self):
+        proc = subprocess.run([sys.executable, "setup.py", "--help"], cwd=repo_dir, capture_output=True, text=True)
+        self.assertEqual(proc.returncode, 0)
+        self.assertIn("--layout_dir", proc.stdout)
+
+    def test_html_report_without_excel_writer(self):
+        code = "\n".join([
+            "import tempfile",
+            "from src.report_generator import generate_reports",
+            "rows = [{'Rule Name': 'R', 'Good Patterns': 1, 'Bad Patterns': 0, 'Passed Good': 1, 'Failed Good': 0,",
+            "         'Passed Bad': 0, 'Failed Bad': 0, 'Rule Comment': '', 'Fail Pattern Location': 'a.gds / TOP'}]",
+            "with tempfile.TemporaryDirectory() as output_dir:",
+            "    generate_reports({'Host Name': 'test'}, rows, output_dir, 'html', 'report')",
+        ])
+        self.assertEqual(imported_modules(code), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Unit tests for sharding.
+
+This file uses Python's built-in unittest framework to test the functionality of the sharding module.
+Each test case ensures that individual functions and components behave as expected.
+
+Usage:
+    python -m unittest test_sharding.py
+"""
+
+
+import os
+import shutil
+import tempfile
+import unittest
+from src.analysis_runner import run_analysis
+from src.gds_analyzer import default_layer_map
+from src.sharding import (parse_shard, assign_shards, shard_layouts, CellShard, partial_path, write_partial, read_partial,
+                          merge_partials)
+from src.svrf_parser import parse_svrf_rules
+from src.utils.create_gds import write_synthetic_layouts, write_synthetic_svrf
+
+
+class TestSharding(unittest.TestCase):
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.layout_dir = os.path.join(self.work_dir, "layouts")
+        self.layouts = write_synthetic_layouts(self.layout_dir, n_files=5, cells_per_file=4, n_groups=3, patterns_per_group=4,
+                                               markers_per_pattern=1, noise_polygons=10)
+        self.svrf_path = os.path.join(self.work_dir, "rules.svrf")
+        write_synthetic_svrf(self.svrf_path, [f"RULE_{g}" for g in range(3)])
+        self.rules = parse_svrf_rules(self.svrf_path)
+
+    def run_shards(self, shards, shard_by):
+        partials = []
+        for shard in range(1, shards + 1):
+            layouts, cell_filter = self.layouts, None
+            if shard_by == "file":
+                layouts = shard_layouts(self.layout_dir, self.layouts, shard, shards)
+            else:
+                cell_filter = CellShard(shard, shards)
+            stats = {}
+            file_results = {}
+            run_analysis(self.layout_dir, layouts, self.rules, stats=stats, cell_filter=cell_filter, file_results=file_results)
+            run = {'shard': shard, 'shards': shards, 'shard_by': shard_by, 'svrf_file': self.svrf_path, 'layouts': self.layouts,
+                   'settings': {}, 'cache_dir': None, 'cache_hits': None, 'cache_misses': None, 'peak_memory': None}
+            path = partial_path(self.work_dir, "None", shard, shards)
+            write_partial(path, run, self.rules, default_layer_map, file_results)
+            partials.append(read_partial(path))
+        return partials
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/8"), (2, 8))
+        self.assertEqual(parse_shard(" 1 / 1 "), (1, 1))
+        for text in ["0/4", "5/4", "1", "a/b", "-1/4"]:
+            with self.assertRaises(ValueError):
+                parse_shard(text)
+
+    def test_assign_shards(self):
+        with open(os.path.join(self.layout_dir, self.layouts[0]), "ab") as f:
+            f.write(b"\0" * 100000)
+        assignment = assign_shards(self.layout_dir, self.layouts, 3)
+        self.assertEqual(assignment, assign_shards(self.layout_dir, list(reversed(self.layouts)), 3))
+        # The largest file gets a shard of its own
+        self.assertEqual([f for f in self.layouts if assignment[f] == assignment[self.layouts[0]]], [self.layouts[0]])
+
+        shards = [shard_layouts(self.layout_dir, self.layouts, shard, 3) for shard in range(1, 4)]
+        self.assertEqual(sorted(f for files in shards for f in files), sorted(self.layouts))
+        self.assertTrue(all(files for files in shards))
+
+    def test_merge_matches_single_run(self):
+        stats = {}
+        expected = run_analysis(self.layout_dir, self.layouts, self.rules, stats=stats)
+        for shard_by in ["file", "cell"]:
+            partials = self.run_shards(3, shard_by)
+            all_results, run_stats, run = merge_partials(list(reversed(partials)))
+            self.assertEqual(all_results, expected)
+            self.assertEqual(list(all_results['RULE_0']['files']), self.layouts)
+            self.assertEqual(run_stats['cells'], stats['cells'])
+            self.assertEqual(run['shard_by'], shard_by)
+
+    def test_cell_shards_split_cells(self):
+        partials = self.run_shards(2, "cell")
+        analyzed = [sum(results is not None for entry in partial['files'] for _, results in entry['cells']) for partial in partials]
+        self.assertEqual(sum(analyzed), 5 * 4)
+        self.assertTrue(all(analyzed))
+
+    def test_merge_errors(self):
+        partials = self.run_shards(3, "file")
+        with self.assertRaisesRegex(ValueError, "Missing partial results of shard 2"):
+            merge_partials([partials[0], partials[2]])
+        with self.assertRaisesRegex(ValueError, "Duplicate"):
+            merge_partials(partials + [partials[1]])
+        other = dict(partials[1], rules=self.rules[:1])
+        with self.assertRaisesRegex(ValueError, "different runs"):
+            merge_partials([partials[0], other, partials[2]])
+        bad_path = os.path.join(self.work_dir, "not_partial.json.gz")
+        with open(bad_path, "w") as f:
+            f.write("{}")
+        with self.assertRaises(ValueError):
+            read_partial(bad_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
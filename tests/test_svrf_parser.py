@@ -9,8 +9,11 @@ Usage:
 """
 
 
+import os
+import shutil
 import unittest
-from src.svrf_parser import parse_svrf_rules
+from unittest import mock
+from src.svrf_parser import parse_svrf_rules, iter_svrf_rules, select_rules, read_rule_patterns
 import tempfile
 
 class TestSVRFParser(unittest.TestCase):
@@ -70,6 +73,140 @@ class TestSVRFParser(unittest.TestCase):
         self.assertEqual(rules[3]["check name"], "M.S.1")
         self.assertIn("Minimum spacing between M >= 0.100", rules[3]["comment"])
 
-        
+
+
+class TestSVRFTokenizer(unittest.TestCase):
+    def setUp(self):
+        self.deck_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+
+    def write(self, name, text):
+        path = os.path.join(self.deck_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_nested_braces_and_comments(self):
+        path = self.write("rules.svrf", """
+            // A { commented } block
+            /* RULE.X {
+               @ not a rule
+            } */
+            DENSITY.1 {
+                @ Density of M between 20% and 80%
+                @ checked in {windows}
+                d = DENSITY M < 0.2 WINDOW 100 [
+                    AREA(M) / AREA()
+                ] { // nested braces
+                }
+            }
+            NO.COMMENT { INT L < 0.1 }
+            SAME.LINE { @ comment on the brace line
+            }
+            NEXT.LINE
+            {
+                // leading comment line
+                @ name on the previous line
+                EXT L < "}" 0.1
+            }
+            """)
+        rules = parse_svrf_rules(path)
+        self.assertEqual([r['check name'] for r in rules], ["DENSITY.1", "SAME.LINE", "NEXT.LINE"])
+        self.assertEqual(rules[0]['comment'], "Density of M between 20% and 80% checked in {windows}")
+        self.assertEqual(rules[1]['comment'], "comment on the brace line")
+
+    def test_include(self):
+        self.write("common/layers.svrf", """
+            LAYER M 6
+            M.W.1 {
+                @ Minimum width of M
+                INT M < 0.2
+            }
+            """)
+        self.write("common/spacing.svrf", """
+            M.S.1 {
+                @ Minimum spacing of M
+                EXT M < 0.1
+            }
+            """)
+        path = self.write("rules.svrf", """
+            L.W.1 {
+                @ Minimum width of L
+                INT L < 0.2
+            }
+            INCLUDE "common/layers.svrf"
+            INCLUDE common/spacing.svrf
+            """)
+        included = []
+        rules = iter_svrf_rules(path, included)
+        # Rules are yielded as the deck is read
+        self.assertEqual(next(rules)['check name'], "L.W.1")
+        self.assertEqual(len(included), 1)
+        self.assertEqual([r['check name'] for r in rules], ["M.W.1", "M.S.1"])
+        self.assertEqual(len(included), 3)
+
+        self.write("common/spacing.svrf", 'INCLUDE "../rules.svrf"\n')
+        with self.assertRaises(ValueError):
+            parse_svrf_rules(path)
+        self.write("common/spacing.svrf", 'INCLUDE missing.svrf\n')
+        with self.assertRaises(FileNotFoundError):
+            parse_svrf_rules(path)
+
+    def test_deck_cache(self):
+        include = self.write("spacing.svrf", "M.S.1 {\n @ Minimum spacing of M\n EXT M < 0.1\n}\n")
+        path = self.write("rules.svrf", 'INCLUDE "spacing.svrf"\n')
+        rules = parse_svrf_rules(path, cache_dir=self.cache_dir)
+        self.assertEqual(rules, parse_svrf_rules(path))
+
+        with mock.patch("src.svrf_parser.iter_svrf_rules") as parse:
+            included = []
+            self.assertEqual(parse_svrf_rules(path, cache_dir=self.cache_dir, included_files=included), rules)
+            # Files of a cached deck are listed without reading it
+            self.assertEqual(included, [os.path.realpath(path), os.path.realpath(include)])
+            # Touched without a content change
+            os.utime(include, ns=(1, 1))
+            self.assertEqual(parse_svrf_rules(path, cache_dir=self.cache_dir), rules)
+            parse.assert_not_called()
+
+        # A modified included file is parsed again
+        self.write("spacing.svrf", "M.S.2 {\n @ Changed\n EXT M < 0.1\n}\n")
+        self.assertEqual(parse_svrf_rules(path, cache_dir=self.cache_dir), [{'check name': 'M.S.2', 'comment': 'Changed'}])
+
+    def test_deck_cache_include_environment(self):
+        for pdk, rule in [("pdk_a", "RA"), ("pdk_b", "RB")]:
+            self.write(os.path.join(pdk, "r.svrf"), f"{rule} {{\n @ Rule of {pdk}\n EXT M < 0.1\n}}\n")
+        path = self.write("rules.svrf", "INCLUDE $PDK/r.svrf\n")
+
+        names = lambda rules: [rule['check name'] for rule in rules]
+        with mock.patch.dict(os.environ, {"PDK": os.path.join(self.deck_dir, "pdk_a")}):
+            self.assertEqual(names(parse_svrf_rules(path, cache_dir=self.cache_dir)), ["RA"])
+        # The INCLUDE now resolves to another file: the cached rules are not used
+        with mock.patch.dict(os.environ, {"PDK": os.path.join(self.deck_dir, "pdk_b")}):
+            self.assertEqual(names(parse_svrf_rules(path)), ["RB"])
+            self.assertEqual(names(parse_svrf_rules(path, cache_dir=self.cache_dir)), ["RB"])
+            with mock.patch("src.svrf_parser.iter_svrf_rules") as parse:
+                self.assertEqual(names(parse_svrf_rules(path, cache_dir=self.cache_dir)), ["RB"])
+                parse.assert_not_called()
+
+    def test_select_rules(self):
+        rules = [{'check name': name, 'comment': ''} for name in ["L.S.1", "L.W.1", "M.S.1", "M.S.10", "M.A.1"]]
+        names = lambda selected: [rule['check name'] for rule in selected]
+        self.assertEqual(names(select_rules(rules, ["M.S.?"])), ["M.S.1"])
+        self.assertEqual(names(select_rules(rules, ["M.A.1", "L.*"])), ["L.S.1", "L.W.1", "M.A.1"])
+        self.assertEqual(names(select_rules(rules, [r"re:\.S\.\d+$"])), ["L.S.1", "M.S.1", "M.S.10"])
+        self.assertEqual(select_rules(rules, ["X.*"]), [])
+        with self.assertRaises(ValueError):
+            select_rules(rules, ["re:("])
+
+        path = self.write("selection.txt", "# spacing rules\nM.S.*\n\nre:^L\\.W\n")
+        self.assertEqual(read_rule_patterns(path), ["M.S.*", r"re:^L\.W"])
+        self.assertEqual(names(select_rules(rules, read_rule_patterns(path))), ["L.W.1", "M.S.1", "M.S.10"])
+
+    def tearDown(self):
+        shutil.rmtree(self.deck_dir)
+        shutil.rmtree(self.cache_dir)
+
+
 if __name__ == "__main__":
     unittest.main()
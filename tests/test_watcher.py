@@ -0,0 +1,73 @@
+"""
+Unit tests for watcher.
+
+This file uses Python's built-in unittest framework to test the functionality of the watcher module.
+Each test case ensures that individual functions and components behave as expected.
+
+Usage:
+    python -m unittest test_watcher.py
+"""
+
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from src.watcher import file_stamp, layout_stamps, deck_stamps, wait_for_change
+
+
+class TestWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.watch_dir = tempfile.mkdtemp()
+
+    def write(self, name, data=b"\0"):
+        path = os.path.join(self.watch_dir, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_stamps(self):
+        layout = self.write("a.gds", b"\0" * 10)
+        self.write("notes.txt")
+        self.write("b.oas")
+        stamps = layout_stamps(self.watch_dir)
+        self.assertEqual(sorted(stamps), ["a.gds", "b.oas"])
+        self.assertEqual(stamps["a.gds"], file_stamp(layout))
+        self.assertEqual(stamps["a.gds"][0], 10)
+
+        missing = os.path.join(self.watch_dir, "missing.svrf")
+        self.assertEqual(deck_stamps([layout, missing]), {layout: file_stamp(layout), missing: None})
+
+    def test_wait_for_change_debounces(self):
+        reads = []
+        states = iter([0, 0, 1, 2, 2, 2, 2, 2, 2, 2, 2, 2])
+
+        def read_state():
+            reads.append(time.monotonic())
+            return next(states)
+
+        self.assertEqual(wait_for_change(read_state, 0, interval=0.01, debounce=0.05), 2)
+        # The burst of changes 1, 2 is reported once, after the state settled
+        self.assertGreaterEqual(len(reads), 4)
+
+    def test_wait_for_change_stop(self):
+        stop = threading.Event()
+        threading.Timer(0.05, stop.set).start()
+        self.assertIsNone(wait_for_change(lambda: 0, 0, interval=0.01, debounce=0.01, stop=stop))
+
+    def test_wait_for_layout_change(self):
+        self.write("a.gds")
+        state = layout_stamps(self.watch_dir)
+        threading.Timer(0.05, self.write, args=("b.gds",)).start()
+        new_state = wait_for_change(lambda: layout_stamps(self.watch_dir), state, interval=0.01, debounce=0.05)
+        self.assertEqual(sorted(new_state), ["a.gds", "b.gds"])
+
+    def tearDown(self):
+        shutil.rmtree(self.watch_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()